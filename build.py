@@ -42,6 +42,28 @@ class CubaseToolsBuilder:
             print("   Install from: https://github.com/UB-Mannheim/tesseract/wiki")
             return False
 
+    def build_template_atlas(self):
+        """Đóng gói tất cả templates (pixels, masks, bản scale, metadata) vào templates/templates.atlas"""
+        print("🗂 Building template atlas...")
+        
+        original_cwd = os.getcwd()
+        os.chdir(self.project_dir)  # config dùng đường dẫn templates/ tương đối
+        sys.path.insert(0, str(self.project_dir))
+        try:
+            import config
+            from utils.template_atlas import TemplateAtlas
+            
+            count = TemplateAtlas.build()
+            atlas_size = os.path.getsize(config.TEMPLATE_ATLAS_FILE)
+            print(f"✅ Template atlas: {count} templates, {atlas_size / 1024:.0f} KB -> {config.TEMPLATE_ATLAS_FILE}")
+            return True
+        except Exception as e:
+            print(f"❌ Error building template atlas: {e}")
+            return False
+        finally:
+            sys.path.remove(str(self.project_dir))
+            os.chdir(original_cwd)
+
     def build_exe(self):
         """Build exe bằng PyInstaller"""
         print("🔨 Building executable with PyInstaller...")
@@ -215,21 +237,26 @@ nhac_tre:+2:45:35:30:40"""
             self.clean_build_dirs()
             print()
             
-            # Step 2: Build exe
+            # Step 2: Build template atlas (đóng gói cùng thư mục templates)
+            if not self.build_template_atlas():
+                return False
+            print()
+            
+            # Step 3: Build exe
             if not self.build_exe():
                 return False
             print()
             
-            # Step 3: Prepare config
+            # Step 4: Prepare config
             if not self.prepare_config_directory():
                 return False
             print()
             
-            # Step 4: Copy directories
+            # Step 5: Copy directories
             self.copy_required_directories()
             print()
             
-            # Step 5: Create README
+            # Step 6: Create README
             self.create_readme()
             print()
             
@@ -253,6 +280,9 @@ def main():
         builder.clean_build_dirs()
         return
     
+    if len(sys.argv) > 1 and sys.argv[1] == "--atlas-only":
+        sys.exit(0 if builder.build_template_atlas() else 1)
+    
     success = builder.build_all()
     sys.exit(0 if success else 1)
 
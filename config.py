@@ -44,6 +44,11 @@ SETTINGS_FILE = ExternalConfigManager.get_external_config_path("settings.json")
 DEFAULT_VALUES_FILE = ExternalConfigManager.get_external_config_path("default_values.txt")
 MUSIC_PRESETS_FILE = ExternalConfigManager.get_external_config_path("music_presets.txt")
 
+# Learned runtime data (kích thước cửa sổ tham chiếu của template, ...)
+LEARNED_TEMPLATE_METADATA_FILE = os.path.join(DATA_DIR, "template_metadata.json")
+PLUGIN_LAYOUTS_FILE = os.path.join(DATA_DIR, "plugin_layouts.json")  # Offset control so với anchor (học khi chạy)
+LOCATION_CACHE_FILE = os.path.join(DATA_DIR, "location_cache.json")  # Vị trí control đã tìm được (giữ qua các lần mở app)
+
 # OCR Config
 OCR_CONFIG = r"--oem 3 --psm 6"
 
@@ -63,17 +68,144 @@ THREAD_JOIN_TIMEOUT = 2.0
 AUTO_DETECT_RESPONSIVE_DELAY = 0.5
 AUTO_DETECT_TIMEOUT_SHORT = 10
 
+# Bỏ qua OCR của auto-detect khi vùng AUTO-KEY không đổi (xem utils/region_change_detector.py)
+REGION_CHANGE_DETECTION_ENABLED = True
+REGION_CHANGE_DOWNSAMPLE = 2  # Thu nhỏ vùng crop N lần (INTER_AREA) trước khi so sánh
+REGION_CHANGE_PIXEL_DELTA = 12  # Độ lệch gray để coi một pixel (sau thu nhỏ) là thay đổi
+REGION_CHANGE_MIN_PIXELS = 2  # Số pixel thay đổi tối thiểu để chạy lại OCR
+REGION_CHANGE_MAX_SKIP_SECONDS = 30.0  # Bắt buộc OCR lại sau khoảng này dù vùng không đổi
+
+# Screen capture backend (xem utils/screen_capture.py)
+CAPTURE_BACKEND = 'pyautogui'  # 'pyautogui', 'win32' (opt-in, chưa kiểm tra trên màn hình scale), 'auto' (win32 nếu có pywin32), 'replay', 'fake'
+CAPTURE_REPLAY_DIR = os.path.join(DATA_DIR, "replay")  # Thư mục frame cho backend 'replay'
+FRAME_CACHE_ENABLED = True  # Dùng chung frame của cửa sổ trong một thao tác (FrameCache.session)
+FRAME_CACHE_MAX_AGE = 2.0  # Giây - frame cũ hơn thì chụp lại dù chưa có input
+FRAME_BUFFER_POOL_ENABLED = True  # Dùng lại buffer chụp/convert theo kích thước (utils/buffer_pool.py)
+
 # Template matching settings
 TEMPLATE_MATCH_THRESHOLD = 0.65  # Lowered from 0.7 to handle slight UI variations
 VALUE_CLICK_OFFSET_X_RATIO = 0.5  # 50% from left (center horizontally)
 VALUE_CLICK_OFFSET_Y_RATIO = 0.6  # 60% from top (slightly below center)
 
+# Điểm click của từng control, theo tỉ lệ kích thước template (đã scale) tính từ góc trên trái.
+# Được đóng gói vào template atlas cùng pixels; key thiếu thì click vào tâm template.
+#   x_ratio / y_ratio: điểm click chính
+#   input_y_ratio: ô nhập giá trị (double click sau khi click control)
+#   value_y_ratio: dòng giá trị Bass/Treble (x lấy theo chữ LOW/HIGH từ OCR)
+TEMPLATE_CLICK_POINTS = {
+    'return_speed_template': {'y_ratio': 0.9},  # Ô giá trị dưới knob
+    'flex_tune_template': {'y_ratio': 0.9},
+    'natural_vibrato_template': {'y_ratio': 0.9},
+    'humanize_template': {'y_ratio': 0.9},
+    'transpose_template': {'y_ratio': VALUE_CLICK_OFFSET_Y_RATIO},  # Số semitone giữa 2 mũi tên
+    'soundshifter_pitch_template': {'y_ratio': 0.4},  # Ô giá trị Semitones
+    'comp_template': {'input_y_ratio': 0.13},  # Ô nhập giá trị sát mép trên knob
+    'reverb_template': {'input_y_ratio': 0.07},
+    'tone_mic_template': {'value_y_ratio': 0.35},
+}
+
 # Multi-scale template matching settings
 MULTI_SCALE_ENABLED = True
 SCALE_RANGE = (0.6, 1.4)  # Scale from 60% to 140%
 SCALE_STEP = 0.1  # Step size for scaling
-MAX_SCALE_ATTEMPTS = 8  # Maximum number of scale attempts
+MAX_SCALE_ATTEMPTS = 9  # Số scale tối đa mỗi sweep, gần 1.0 trước (9 = đủ SCALE_RANGE, kể cả 0.6 và 1.4)
 SCALE_CONFIDENCE_BOOST = 0.02  # Boost confidence for scaled matches
+SCALE_REFINE_ENABLED = False  # Nội suy parabol quanh scale thắng (chỉ match ROI nhỏ, tùy chọn)
+SCALE_COARSE_STEP = 0.1  # Bước scale của lưới thưa trước khi nội suy
+SCALE_REFINE_ITERATIONS = 2  # Số lần nội suy (mỗi lần thêm một lần match)
+SCALE_REFINE_PRECISION = 0.01  # Làm tròn scale nội suy (giới hạn số bản resize được cache)
+
+# Parallel matching (cv2.matchTemplate/resize nhả GIL)
+PARALLEL_MATCHING_ENABLED = False  # Match các scale + Edge-Based trên thread pool
+MATCH_THREAD_WORKERS = max(1, min(8, (os.cpu_count() or 1) - 1))  # Chừa một core cho GUI/Cubase
+
+# Adaptive matching cascade (strategy rẻ chạy trước, dừng sớm khi đủ chắc chắn)
+MATCH_CASCADE_ENABLED = True
+MATCH_CERTAIN_THRESHOLD = 0.95  # Confidence đủ "chắc chắn" để bỏ qua các strategy còn lại
+MATCH_CASCADE_ORDER = ['Standard', 'Edge-Based', 'Multi-Scale']  # Thứ tự mặc định (rẻ -> đắt)
+MATCH_CASCADE_ADAPTIVE = True  # Tự sắp xếp lại theo strategy thắng nhiều nhất cho từng template
+MATCH_CASCADE_MIN_SAMPLES = 5  # Số lần match tối thiểu trước khi sắp xếp lại
+MATCH_CASCADE_SKIP_ENABLED = True  # Bỏ qua strategy chưa từng thắng cho template (vẫn chạy khi các strategy khác thất bại)
+MATCH_CASCADE_SKIP_MIN_SAMPLES = 20  # Số lần match tối thiểu trước khi bỏ qua strategy
+MATCH_LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)  # Cận trên các bucket latency histogram
+MATCH_TELEMETRY_SCALE_BIN = 0.05  # Độ rộng bin của phân bố scale
+
+# Scale prior settings (suy ra scale từ kích thước cửa sổ plugin)
+SCALE_PRIOR_ENABLED = True
+SCALE_PRIOR_STEP = 0.05  # Bước scale trong dải hẹp
+SCALE_PRIOR_BANDS = (0.05, 0.15)  # Nửa độ rộng dải, nới dần khi confidence thấp
+
+# Last-known-location (ROI) search settings
+ROI_SEARCH_ENABLED = True  # Tìm quanh vị trí lần trước trước khi search toàn cửa sổ
+ROI_SEARCH_PADDING = 24  # Padding (px) quanh vị trí lần trước
+LOCATION_CACHE_ENABLED = True  # Lưu vị trí đã tìm ra đĩa, load lại khi khởi động (verify bằng ROI trước khi dùng)
+
+# Template masks (bỏ qua vùng hiển thị giá trị thay đổi khi so khớp)
+# Ưu tiên file `<tên template>_mask.png` cạnh template (trắng = so khớp, đen = bỏ qua),
+# nếu không có thì dùng vùng bỏ qua dưới đây: (x0, y0, x1, y1) theo tỉ lệ kích thước template
+# Sweep (Standard/Multi-Scale/Edge-Based) luôn chạy không mask, mask chỉ dùng khi xác nhận ứng viên trong vùng nhỏ
+TEMPLATE_MASKS_ENABLED = True
+MASK_CONFIRM_PADDING = 4  # Padding (px) quanh ứng viên khi chấm lại bằng masked matchTemplate
+TEMPLATE_MASK_REGIONS = {
+    'return_speed_template': [(0.15, 0.82, 0.85, 1.0)],  # Số giá trị dưới knob
+    'flex_tune_template': [(0.15, 0.82, 0.85, 1.0)],
+    'natural_vibrato_template': [(0.15, 0.82, 0.85, 1.0)],
+    'humanize_template': [(0.15, 0.82, 0.85, 1.0)],
+    'transpose_template': [(0.15, 0.5, 0.85, 0.78)],  # Số semitone giữa 2 mũi tên
+    'soundshifter_pitch_template': [(0.2, 0.45, 0.8, 1.0)],  # Ô giá trị Semitones
+}
+
+# Pixel signature settings (kiểm tra nhanh vị trí đã nhớ bằng vài pixel mẫu, không cần matchTemplate)
+SIGNATURE_CHECK_ENABLED = True
+SIGNATURE_PROBE_COUNT = 16  # Số pixel mẫu mỗi template
+SIGNATURE_GRID_SIZE = 8  # Lưới 8x8 ô để chọn điểm mẫu trải đều template
+SIGNATURE_FLAT_STD = 12  # Chỉ lấy mẫu ở vùng phẳng (độ lệch chuẩn 3x3 <= 12)
+SIGNATURE_MIN_CONTRAST = 20  # Template có chênh lệch sáng/tối nhỏ hơn thì không dùng signature
+SIGNATURE_TOLERANCE = 24  # Sai lệch cường độ tối đa mỗi pixel (0-255), giới hạn thêm bởi 1/3 contrast
+SIGNATURE_MIN_MATCH_RATIO = 0.9  # Tỉ lệ pixel mẫu phải khớp
+SIGNATURE_RESCORE_ENABLED = False  # True = signature khớp thì tính lại confidence bằng matchTemplate tại vị trí (chậm hơn)
+
+# Pyramid (coarse-to-fine) search settings
+PYRAMID_SEARCH_ENABLED = True  # Tìm ứng viên trên ảnh thu nhỏ rồi refine ở full resolution
+PYRAMID_DOWNSAMPLE = 0.5  # Tỉ lệ thu nhỏ screenshot (0.5 hoặc 0.25)
+PYRAMID_MIN_FRAME_PIXELS = 300000  # Chỉ dùng pyramid cho cửa sổ lớn (~ 640x480 trở lên)
+PYRAMID_MIN_TEMPLATE_SIZE = 12  # Template sau khi thu nhỏ phải >= 12px mỗi chiều
+PYRAMID_TOP_PEAKS = 3  # Số đỉnh ứng viên được refine
+PYRAMID_REFINE_MARGIN = 6  # Padding (px, full resolution) quanh mỗi ứng viên
+
+# Variance prefilter (loại vùng nền phẳng trước khi correlation, chỉ áp dụng cho template khai báo dưới đây)
+# Cửa sổ có độ lệch chuẩn < tỉ lệ * độ lệch chuẩn template thì không thể là template (UI không đổi contrast)
+VARIANCE_PREFILTER_ENABLED = True
+VARIANCE_PREFILTER_TEMPLATES = {
+    'return_speed_template': 0.5,  # Template id -> tỉ lệ độ lệch chuẩn tối thiểu
+    'flex_tune_template': 0.5,
+    'natural_vibrato_template': 0.5,
+    'humanize_template': 0.5,
+}
+VARIANCE_PREFILTER_MIN_FRAME_PIXELS = 100000  # Chỉ dùng cho cửa sổ đủ lớn (~ 400x250 trở lên)
+VARIANCE_PREFILTER_TILE = 32  # Kích thước ô (px) khi gom vùng còn lại để correlation
+VARIANCE_PREFILTER_MAX_COVERAGE = 0.6  # Vùng còn lại lớn hơn tỉ lệ này của frame thì match toàn frame
+
+# Plugin layout settings (locate anchor rồi suy ra vị trí các control khác)
+PLUGIN_LAYOUT_ENABLED = True
+PLUGIN_LAYOUTS = {
+    'autotune': ['return_speed_template', 'flex_tune_template'],  # Anchor template ids, thử theo thứ tự (match_many chỉ đưa các id này qua layout)
+}
+PLUGIN_LAYOUT_VERIFY_PADDING = 8  # Padding (px) khi verify vị trí tính từ anchor
+PLUGIN_LAYOUT_LEARN_THRESHOLD = 0.8  # Chỉ học offset khi cả anchor và control match chắc chắn
+PLUGIN_LAYOUT_NO_LEARN_METHODS = ('Edge-Based', 'Multi-Scale')  # Kết quả fallback dễ khớp nhầm -> không học offset
+
+# Multi-instance detection (find_all)
+FIND_ALL_MAX_RESULTS = 10  # Số ứng viên tối đa
+FIND_ALL_NMS_OVERLAP = 0.3  # IoU tối đa giữa 2 ứng viên được giữ lại
+FIND_ALL_SCORE_MARGIN = 0.05  # Ứng viên kém tốt nhất quá mức này thì không được chọn
+
+# Frame-side pyramid (match nhiều template trên cùng frame: resize frame một lần cho mỗi scale)
+FRAME_PYRAMID_ENABLED = True
+FRAME_PYRAMID_MIN_TEMPLATES = 2  # Chỉ bật khi match từ 2 template trở lên trên cùng một frame
+
+# Template cache settings
+TEMPLATE_CACHE_MAX_ENTRIES = 32  # LRU limit cho template đã decode + scaled variants
 
 # GUI Theme settings
 GUI_THEMES = ["dark", "light"]
@@ -137,6 +269,13 @@ TEMPLATE_PATHS = {
     'soundshifter_pitch_template': get_template_path('soundshifter_pitch_template.png')
 }
 
+# Template metadata đóng gói cùng templates (tùy chọn - reference window size, ...)
+TEMPLATE_METADATA_FILE = get_template_path('template_metadata.json')
+
+# Template atlas: một file chứa pixels, masks, các bản scale và metadata của mọi template (build.py tạo ra)
+TEMPLATE_ATLAS_ENABLED = True
+TEMPLATE_ATLAS_FILE = get_template_path('templates.atlas')
+
 # UI Settings
 UI_SETTINGS = {
     'window_size': '1200x700',
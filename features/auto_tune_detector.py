@@ -1,12 +1,14 @@
+import os
 import time
 import cv2
-import numpy as np
 import pyautogui
 
 import config
 from features.base_feature import BaseFeature
 from utils.helpers import ImageHelper, MessageHelper, ConfigHelper, MouseHelper
 from utils.process_finder import CubaseProcessFinder
+from utils.shared_screenshot_helper import SharedScreenshotHelper
+from utils.template_metadata import TemplateMetadata
 from utils.window_manager import WindowManager
 
 
@@ -22,8 +24,10 @@ class AutoTuneDetector(BaseFeature):
         """
         super().__init__()
         self.feature_name = feature_name
-        self.template_path = f"templates/{template_filename}"
+        self.template_path = config.get_template_path(template_filename)
         self.config_prefix = config_prefix
+        self.plugin_key = 'autotune'  # Key cho location memory (xem TemplateLocator)
+        self.template_key = os.path.splitext(template_filename)[0]  # Key điểm click (config.TEMPLATE_CLICK_POINTS)
         
         # Load giá trị mặc định từ config
         self.default_values = ConfigHelper.load_default_values()
@@ -101,63 +105,67 @@ class AutoTuneDetector(BaseFeature):
     def _find_template_match(self, plugin_win):
         """Tìm template match trong cửa sổ plugin với adaptive multi-scale matching."""
         from utils.helpers import TemplateHelper
+        from utils.template_locator import TemplateLocator
         
         # Chụp ảnh màn hình vùng plugin
-        x, y, w, h = plugin_win.left, plugin_win.top, plugin_win.width, plugin_win.height
-        screenshot = pyautogui.screenshot(region=(x, y, w, h))
-        screenshot_np = np.array(screenshot)
-        screenshot_gray = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2GRAY)
+        x, y, w, h, screenshot_np, screenshot_gray = SharedScreenshotHelper.capture_plugin_region(plugin_win)
 
         print(f"📐 Plugin window size: {w}x{h}")
 
-        # Load template
-        template = cv2.imread(self.template_path, cv2.IMREAD_GRAYSCALE)
-        if template is None:
+        # Load template (cached)
+        template_entry = TemplateHelper.load_template(self.template_path)
+        if template_entry is None:
             print(f"❌ Không thể load template: {self.template_path}")
             return None, 0
+        template = template_entry.image
 
         template_h, template_w = template.shape[:2]
         print(f"📐 Template size: {template_w}x{template_h}")
 
         # Adaptive template matching với multi-scale support
-        best_result = TemplateHelper.adaptive_template_match(screenshot_gray, template)
+        best_result = TemplateLocator.locate(
+            self.plugin_key, screenshot_gray, template_entry, window_size=(w, h), window_origin=(x, y)
+        )
         
-        print(f"🏆 Best method: {best_result['method']}")
-        print(f"🔍 Confidence: {best_result['confidence']:.3f}")
-        print(f"📏 Scale: {best_result['scale']:.2f}")
-        print(f"📐 Template size used: {best_result['template_size']}")
+        print(f"🏆 Best method: {best_result.method}")
+        print(f"🔍 Confidence: {best_result.confidence:.3f}")
+        print(f"📏 Scale: {best_result.scale:.2f}")
+        print(f"📐 Template size used: {best_result.template_size}")
 
         # Save debug image với adaptive result
         debug_filename = f"{self.config_prefix}_adaptive_debug.png"
         
         # Create debug template for visualization
-        if best_result['scale'] != 1.0:
+        if best_result.scale != 1.0:
             # Use scaled template for debug
-            scaled_w, scaled_h = best_result['template_size']
+            scaled_w, scaled_h = best_result.template_size
             debug_template = cv2.resize(template, (scaled_w, scaled_h))
         else:
             debug_template = template
         
         debug_path = ImageHelper.save_template_debug_image(
-            screenshot_np, debug_template, best_result['location'], 
-            best_result['confidence'], debug_filename
+            screenshot_np, debug_template, best_result.location, 
+            best_result.confidence, debug_filename
         )
         print(f"🖼 Adaptive template debug saved -> {debug_path}")
 
-        if best_result['confidence'] < config.TEMPLATE_MATCH_THRESHOLD:
-            print(f"❌ Template not found for {self.feature_name.lower()}. Best confidence: {best_result['confidence']:.3f}")
-            print(f"💡 Try updating template or adjusting threshold. Current scale: {best_result['scale']:.2f}")
-            return None, best_result['confidence']
+        if best_result.confidence < config.TEMPLATE_MATCH_THRESHOLD:
+            print(f"❌ Template not found for {self.feature_name.lower()}. Best confidence: {best_result.confidence:.3f}")
+            print(f"💡 Try updating template or adjusting threshold. Current scale: {best_result.scale:.2f}")
+            return None, best_result.confidence
 
         # Tính toán vị trí click với scaled template size
-        scaled_w, scaled_h = best_result['template_size']
-        click_x = x + best_result['location'][0] + scaled_w // 2
-        click_y = y + best_result['location'][1] + int(scaled_h * 0.9)
+        click_x, click_y = self._click_position(x, y, best_result)
+
+        print(f"✅ Template found for {self.feature_name.lower()} with confidence: {best_result.confidence:.3f}")
+        print(f"🎯 {self.feature_name} click position: ({click_x}, {click_y}) [Scale: {best_result.scale:.2f}]")
 
-        print(f"✅ Template found for {self.feature_name.lower()} with confidence: {best_result['confidence']:.3f}")
-        print(f"🎯 {self.feature_name} click position: ({click_x}, {click_y}) [Scale: {best_result['scale']:.2f}]")
+        return (click_x, click_y), best_result.confidence
 
-        return (click_x, click_y), best_result['confidence']
+    def _click_position(self, x, y, best_result):
+        """Tính vị trí click (tọa độ màn hình) từ kết quả match trong cửa sổ plugin tại (x, y)."""
+        point = TemplateMetadata.get_click_point(self.template_key)
+        return best_result.center(x, y, y_ratio=point['y_ratio'], x_ratio=point['x_ratio'])
 
     def _process_value_input(self, click_pos, value):
         """Xử lý việc click và nhập giá trị."""
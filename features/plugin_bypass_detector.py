@@ -17,9 +17,11 @@ class PluginBypassDetector(AutoTuneDetector):
         )
         self.plugin_name = plugin_name
         
-        # Template paths cho cả 2 trạng thái
-        self.off_template_path = config.TEMPLATE_PATHS['bypass_off']
-        self.on_template_path = config.TEMPLATE_PATHS['bypass_on']
+        # Template cho cả 2 trạng thái
+        self.off_template_id = 'bypass_off'
+        self.on_template_id = 'bypass_on'
+        self.off_template_path = config.TEMPLATE_PATHS[self.off_template_id]
+        self.on_template_path = config.TEMPLATE_PATHS[self.on_template_id]
         
         # Override để không validate range vì đây là toggle
         self.is_toggle = True
@@ -44,9 +46,10 @@ class PluginBypassDetector(AutoTuneDetector):
             if not plugin_win:
                 return None
 
-            # 3. Thử match cả 2 template để xác định trạng thái
-            off_pos, off_conf = self._find_template_match_by_path(plugin_win, self.off_template_path, silent)
-            on_pos, on_conf = self._find_template_match_by_path(plugin_win, self.on_template_path, silent)
+            # 3. Chụp một lần, match cả 2 template để xác định trạng thái
+            matches = self._find_state_matches(plugin_win, silent)
+            off_pos, off_conf = matches[self.off_template_id]
+            on_pos, on_conf = matches[self.on_template_id]
             
             if not silent:
                 DebugHelper.print_template_debug(f"🔍 OFF template confidence: {off_conf:.2f}")
@@ -100,83 +103,172 @@ class PluginBypassDetector(AutoTuneDetector):
             print(f"❌ Error in plugin bypass toggle: {e}")
             return False
     
+    def _find_state_matches(self, plugin_win, silent=False):
+        """
+        Chụp cửa sổ plugin một lần và match cả 2 template trạng thái (OFF/ON).
+        
+        Returns:
+            dict: template_id -> (click_pos, confidence)
+        """
+        from utils.helpers import TemplateHelper
+        from utils.template_cache import TemplateCache
+        from utils.template_locator import TemplateLocator
+        
+        template_ids = [self.off_template_id, self.on_template_id]
+        try:
+            x, y, w, h, screenshot_np, screenshot_gray = SharedScreenshotHelper.capture_plugin_region(plugin_win)
+            if not silent:
+                DebugHelper.print_template_debug(f"🎯 Bypass plugin window size: {w}x{h} - Testing: {', '.join(template_ids)}")
+            
+            # Vị trí lần trước (trước khi locate ghi đè) để chọn đúng nút khi có nhiều instance
+            entries = {template_id: TemplateCache.get_by_id(template_id) for template_id in template_ids}
+            previous = {
+                template_id: TemplateLocator.recall(self._get_plugin_key(), entry.key)
+                for template_id, entry in entries.items() if entry is not None
+            }
+            
+            results = TemplateHelper.match_many(
+                screenshot_gray, template_ids, window_size=(w, h), plugin_key=self._get_plugin_key(),
+                window_origin=(x, y)
+            )
+            
+            matches = {}
+            for template_id in template_ids:
+                template_path = config.TEMPLATE_PATHS[template_id]
+                best_result = results.get(template_id)
+                if best_result is None:
+                    if not silent:
+                        DebugHelper.print_always(f"❌ Không thể load template: {template_path}")
+                    matches[template_id] = (None, 0)
+                    continue
+                best_result = self._pick_bypass_instance(
+                    screenshot_gray, entries[template_id], best_result, previous.get(template_id), (w, h), silent
+                )
+                matches[template_id] = self._resolve_bypass_match(
+                    template_path, best_result, x, y, screenshot_np, silent
+                )
+            return matches
+            
+        except Exception as e:
+            if not silent:
+                DebugHelper.print_always(f"❌ Error finding bypass templates: {e}")
+            return {template_id: (None, 0) for template_id in template_ids}
+    
     def _find_template_match_by_path(self, plugin_win, template_path, silent=False):
         """Tìm template match với đường dẫn template cụ thể và adaptive matching."""
-        import cv2
-        import numpy as np
-        import pyautogui
-        import config
-        from utils.helpers import ImageHelper, TemplateHelper
-        import os
+        from utils.helpers import TemplateHelper
+        from utils.template_locator import TemplateLocator
         
         try:
             # Chụp ảnh màn hình vùng plugin
-            x, y, w, h = plugin_win.left, plugin_win.top, plugin_win.width, plugin_win.height
-            screenshot = pyautogui.screenshot(region=(x, y, w, h))
-            screenshot_np = np.array(screenshot)
-            screenshot_gray = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2GRAY)
+            x, y, w, h, screenshot_np, screenshot_gray = SharedScreenshotHelper.capture_plugin_region(plugin_win)
 
-            template_name = os.path.splitext(os.path.basename(template_path))[0]
             if not silent:
-                DebugHelper.print_template_debug(f"🎯 Bypass plugin window size: {w}x{h} - Testing: {template_name}")
+                DebugHelper.print_template_debug(f"🎯 Bypass plugin window size: {w}x{h}")
 
-            # Load template với đường dẫn cụ thể
-            template = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
-            if template is None:
+            # Load template với đường dẫn cụ thể (cached)
+            template_entry = TemplateHelper.load_template(template_path)
+            if template_entry is None:
                 if not silent:
                     DebugHelper.print_always(f"❌ Không thể load template: {template_path}")
                 return None, 0
 
-            template_h, template_w = template.shape[:2]
-            if not silent:
-                DebugHelper.print_template_debug(f"🎯 Bypass template size: {template_w}x{template_h}")
-
             # Adaptive template matching
-            best_result = TemplateHelper.adaptive_template_match(screenshot_gray, template)
+            previous = TemplateLocator.recall(self._get_plugin_key(), template_entry.key)
+            best_result = TemplateLocator.locate(
+                self._get_plugin_key(), screenshot_gray, template_entry, window_size=(w, h), window_origin=(x, y)
+            )
+            best_result = self._pick_bypass_instance(
+                screenshot_gray, template_entry, best_result, previous, (w, h), silent
+            )
+            return self._resolve_bypass_match(template_path, best_result, x, y, screenshot_np, silent)
             
+        except Exception as e:
             if not silent:
-                DebugHelper.print_template_debug(f"🏆 Bypass {template_name} best method: {best_result['method']}")
-                DebugHelper.print_template_debug(f"🔍 Bypass {template_name} confidence: {best_result['confidence']:.3f}")
-                DebugHelper.print_template_debug(f"📏 Bypass {template_name} scale: {best_result['scale']:.2f}")
+                DebugHelper.print_always(f"❌ Error finding bypass template {template_path}: {e}")
+            return None, 0
+    
+    def _pick_bypass_instance(self, screenshot_gray, template_entry, best_result, previous, window_size,
+                              silent=False):
+        """
+        Khi full search tìm thấy nút, kiểm tra có nhiều nút giống nhau không (find_all)
+        và chọn xác định: gần vị trí lần trước nhất, nếu không có thì ứng viên xếp hạng đầu.
+        Kết quả từ location memory (ROI/Signature/Layout) được giữ nguyên.
+        """
+        from utils.helpers import TemplateHelper
+        from utils.template_locator import TemplateLocator
+        
+        if (best_result.location is None or best_result.method in ('ROI', 'Signature', 'Layout')
+                or best_result.confidence < config.TEMPLATE_MATCH_THRESHOLD):
+            return best_result
+        
+        candidates = TemplateHelper.find_all(
+            screenshot_gray, template_entry.image, scale=best_result.scale, template_entry=template_entry
+        )
+        if len(candidates) < 2:
+            return best_result
+        
+        expected_location = previous['location'] if previous else None
+        picked = TemplateHelper.pick_candidate(candidates, expected_location)
+        if not silent:
+            DebugHelper.print_template_debug(
+                f"👥 {len(candidates)} bypass candidates for {template_entry.key} -> "
+                f"picked {picked.location} (confidence: {picked.confidence:.3f})"
+            )
+        if picked.location != tuple(best_result.location):
+            TemplateLocator.remember(
+                self._get_plugin_key(), template_entry.key, picked, window_size, template_hash=template_entry.hash
+            )
+        return picked
+    
+    def _resolve_bypass_match(self, template_path, best_result, x, y, screenshot_np, silent=False):
+        """Log/debug kết quả match và tính vị trí click ở giữa scaled template."""
+        import cv2
+        from utils.helpers import ImageHelper, TemplateHelper
+        
+        template_entry = TemplateHelper.load_template(template_path)
+        template = template_entry.image
+        template_name = template_entry.key
+        
+        if not silent:
+            template_w, template_h = template_entry.size
+            DebugHelper.print_template_debug(f"🎯 Bypass template size: {template_w}x{template_h}")
+            DebugHelper.print_template_debug(f"🏆 Bypass {template_name} best method: {best_result.method}")
+            DebugHelper.print_template_debug(f"🔍 Bypass {template_name} confidence: {best_result.confidence:.3f}")
+            DebugHelper.print_template_debug(f"📏 Bypass {template_name} scale: {best_result.scale:.2f}")
 
-            # Save debug image với adaptive result
+        # Save debug image only if not silent and debug is enabled
+        if not silent and DebugHelper.should_save_debug_images():
             debug_filename = f"bypass_{template_name}_adaptive_debug.png"
             
             # Create scaled template for debug visualization
-            if best_result['scale'] != 1.0:
-                scaled_w, scaled_h = best_result['template_size']
+            if best_result.scale != 1.0:
+                scaled_w, scaled_h = best_result.template_size
                 debug_template = cv2.resize(template, (scaled_w, scaled_h))
             else:
                 debug_template = template
             
-            # Save debug image only if not silent and debug is enabled
-            if not silent and DebugHelper.should_save_debug_images():
-                debug_path = ImageHelper.save_template_debug_image(
-                    screenshot_np, debug_template, best_result['location'], 
-                    best_result['confidence'], debug_filename
-                )
-                DebugHelper.print_template_debug(f"🖼 Bypass {template_name} adaptive debug saved -> {debug_path}")
+            debug_path = ImageHelper.save_template_debug_image(
+                screenshot_np, debug_template, best_result.location, 
+                best_result.confidence, debug_filename
+            )
+            DebugHelper.print_template_debug(f"🖼 Bypass {template_name} adaptive debug saved -> {debug_path}")
 
-            if best_result['confidence'] < config.TEMPLATE_MATCH_THRESHOLD:
-                if not silent:
-                    DebugHelper.print_template_debug(f"❌ Bypass template not found: {template_name}. Confidence: {best_result['confidence']:.3f}")
-                return None, best_result['confidence']
+        if best_result.confidence < config.TEMPLATE_MATCH_THRESHOLD:
+            if not silent:
+                DebugHelper.print_template_debug(f"❌ Bypass template not found: {template_name}. Confidence: {best_result.confidence:.3f}")
+            return None, best_result.confidence
 
-            # Tính toán vị trí click ở giữa scaled template
-            scaled_w, scaled_h = best_result['template_size']
-            click_x = x + best_result['location'][0] + scaled_w // 2
-            click_y = y + best_result['location'][1] + scaled_h // 2
+        # Tính toán vị trí click ở giữa scaled template
+        click_x, click_y = SharedScreenshotHelper.calculate_click_position(
+            x, y, best_result.location, best_result.template_size
+        )
 
-            if not silent:
-                DebugHelper.print_template_debug(f"✅ Bypass template found: {template_name} with confidence: {best_result['confidence']:.3f}")
-                DebugHelper.print_template_debug(f"🎯 Bypass click position: ({click_x}, {click_y}) [Scale: {best_result['scale']:.2f}]")
+        if not silent:
+            DebugHelper.print_template_debug(f"✅ Bypass template found: {template_name} with confidence: {best_result.confidence:.3f}")
+            DebugHelper.print_template_debug(f"🎯 Bypass click position: ({click_x}, {click_y}) [Scale: {best_result.scale:.2f}]")
 
-            return (click_x, click_y), best_result['confidence']
-            
-        except Exception as e:
-            if not silent:
-                DebugHelper.print_always(f"❌ Error finding bypass template {template_path}: {e}")
-            return None, 0
+        return (click_x, click_y), best_result.confidence
     
     def _find_cubase_process_silent(self):
         """Tìm tiến trình Cubase mà không hiển thị popup error."""
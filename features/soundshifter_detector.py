@@ -13,6 +13,7 @@ class SoundShifterDetector(AutoTuneDetector):
             config_prefix="soundshifter_pitch"
         )
         self.plugin_name = "SoundShifter Pitch Stereo"
+        self.plugin_key = 'soundshifter'
         self.current_value = 0  # Giá trị hiện tại (-4 to +4)
         
     def raise_tone(self, num_tones=1):
@@ -178,62 +179,60 @@ class SoundShifterDetector(AutoTuneDetector):
     def _find_template_match(self, plugin_win):
         """Override để sử dụng vị trí click 40% từ trên xuống với adaptive matching."""
         import cv2
-        import numpy as np
-        import pyautogui
         import config
         from utils.helpers import ImageHelper, TemplateHelper
+        from utils.shared_screenshot_helper import SharedScreenshotHelper
+        from utils.template_locator import TemplateLocator
         
         # Chụp ảnh màn hình vùng plugin
-        x, y, w, h = plugin_win.left, plugin_win.top, plugin_win.width, plugin_win.height
-        screenshot = pyautogui.screenshot(region=(x, y, w, h))
-        screenshot_np = np.array(screenshot)
-        screenshot_gray = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2GRAY)
+        x, y, w, h, screenshot_np, screenshot_gray = SharedScreenshotHelper.capture_plugin_region(plugin_win)
 
         print(f"📜 SoundShifter plugin window size: {w}x{h}")
 
-        # Load template
-        template = cv2.imread(self.template_path, cv2.IMREAD_GRAYSCALE)
-        if template is None:
+        # Load template (cached)
+        template_entry = TemplateHelper.load_template(self.template_path)
+        if template_entry is None:
             print(f"❌ Không thể load template: {self.template_path}")
             return None, 0
+        template = template_entry.image
 
         template_h, template_w = template.shape[:2]
         print(f"📜 SoundShifter template size: {template_w}x{template_h}")
 
         # Adaptive template matching
-        best_result = TemplateHelper.adaptive_template_match(screenshot_gray, template)
+        best_result = TemplateLocator.locate(
+            self.plugin_key, screenshot_gray, template_entry, window_size=(w, h), window_origin=(x, y)
+        )
         
-        print(f"🏆 SoundShifter best method: {best_result['method']}")
-        print(f"🔍 SoundShifter confidence: {best_result['confidence']:.3f}")
-        print(f"📏 SoundShifter scale: {best_result['scale']:.2f}")
+        print(f"🏆 SoundShifter best method: {best_result.method}")
+        print(f"🔍 SoundShifter confidence: {best_result.confidence:.3f}")
+        print(f"📏 SoundShifter scale: {best_result.scale:.2f}")
 
         # Save debug image với adaptive result
         debug_filename = f"{self.config_prefix}_adaptive_debug.png"
         
         # Create scaled template for debug visualization
-        if best_result['scale'] != 1.0:
-            scaled_w, scaled_h = best_result['template_size']
+        if best_result.scale != 1.0:
+            scaled_w, scaled_h = best_result.template_size
             debug_template = cv2.resize(template, (scaled_w, scaled_h))
         else:
             debug_template = template
         
         debug_path = ImageHelper.save_template_debug_image(
-            screenshot_np, debug_template, best_result['location'], 
-            best_result['confidence'], debug_filename
+            screenshot_np, debug_template, best_result.location, 
+            best_result.confidence, debug_filename
         )
         print(f"🖼 SoundShifter adaptive debug saved -> {debug_path}")
 
-        if best_result['confidence'] < config.TEMPLATE_MATCH_THRESHOLD:
-            print(f"❌ SoundShifter template not found. Confidence: {best_result['confidence']:.3f}")
+        if best_result.confidence < config.TEMPLATE_MATCH_THRESHOLD:
+            print(f"❌ SoundShifter template not found. Confidence: {best_result.confidence:.3f}")
             print(f"💡 Try resizing SoundShifter plugin window or update template")
-            return None, best_result['confidence']
+            return None, best_result.confidence
 
         # Tính toán vị trí click (40% từ top của scaled template)
-        scaled_w, scaled_h = best_result['template_size']
-        click_x = x + best_result['location'][0] + scaled_w // 2
-        click_y = y + best_result['location'][1] + int(scaled_h * 0.4)  # 40% từ trên xuống
+        click_x, click_y = self._click_position(x, y, best_result)
 
-        print(f"✅ SoundShifter template found with confidence: {best_result['confidence']:.3f}")
-        print(f"🎯 SoundShifter click position: ({click_x}, {click_y}) - 40% from top [Scale: {best_result['scale']:.2f}]")
+        print(f"✅ SoundShifter template found with confidence: {best_result.confidence:.3f}")
+        print(f"🎯 SoundShifter click position: ({click_x}, {click_y}) - 40% from top [Scale: {best_result.scale:.2f}]")
 
-        return (click_x, click_y), best_result['confidence']
\ No newline at end of file
+        return (click_x, click_y), best_result.confidence
\ No newline at end of file
@@ -2,12 +2,14 @@ import re
 import time
 import threading
 
-import pyautogui
+from PIL import Image
 
 import config
 from features.base_feature import BaseFeature
 from utils.helpers import OCRHelper, ImageHelper, MessageHelper, MouseHelper
 from utils.process_finder import CubaseProcessFinder
+from utils.region_change_detector import RegionChangeDetector
+from utils.shared_screenshot_helper import SharedScreenshotHelper
 from utils.window_manager import WindowManager
 
 
@@ -23,6 +25,8 @@ class ToneDetector(BaseFeature):
         self.auto_detect_thread = None  # Thread cho auto-detect
         self.tone_callback = None  # Callback để update UI
         self.current_tone_getter = None  # Getter để lấy current tone
+        self._region_change = RegionChangeDetector("AUTO-KEY")  # Bỏ qua OCR khi vùng plugin không đổi
+        self._last_checked_tone = None  # Tone của lần OCR gần nhất trong auto-detect
     
     def pause_auto_detect(self):
         """Tạm dừng auto-detect cho các chức năng khác."""
@@ -48,16 +52,33 @@ class ToneDetector(BaseFeature):
             win_h * (margin_ratio - 1) // margin_ratio   # y2
         )
     
-    def _screenshot_and_crop_plugin(self, plugin_win):
-        """Screenshot plugin window và crop theo margin."""
-        left, top, right, bottom = plugin_win.left, plugin_win.top, plugin_win.right, plugin_win.bottom
-        full = pyautogui.screenshot(region=(left, top, right - left, bottom - top))
+    def _capture_crop(self, plugin_win):
+        """
+        Screenshot plugin window và crop theo margin (numpy RGB cho OCR + view grayscale).
+        Frame và vùng crop nằm trong buffer của FrameBufferPool nên vòng auto-detect không cấp phát
+        ảnh mới mỗi lần chụp - ảnh trả về chỉ dùng được đến lần chụp tiếp theo.
+        
+        Returns:
+            tuple: (cropped_rgb, cropped_gray, (left, top, crop_box)) - OCR chạy trên bản RGB như trước,
+            bản grayscale (view vào frame) chỉ dùng để phát hiện vùng có thay đổi không
+        """
+        from utils.buffer_pool import FrameBufferPool
+        
+        left, top, win_w, win_h, screenshot_np, screenshot_gray = SharedScreenshotHelper.capture_plugin_region(
+            plugin_win, pooled=True
+        )
         
-        win_w, win_h = right - left, bottom - top
         crop_box = self._calculate_crop_box(win_w, win_h)
-        cropped = full.crop(crop_box)
+        x1, y1, x2, y2 = crop_box
+        # Copy vùng crop vào buffer liền bộ nhớ -> PIL image dùng chung buffer đó (không copy thêm)
+        cropped = FrameBufferPool.copy('ocr_crop', screenshot_np[y1:y2, x1:x2])
         
-        return cropped, (left, top, crop_box)
+        return cropped, screenshot_gray[y1:y2, x1:x2], (left, top, crop_box)
+    
+    def _screenshot_and_crop_plugin(self, plugin_win):
+        """Screenshot plugin window và crop theo margin (PIL image RGB cho OCR)."""
+        cropped, _, (left, top, crop_box) = self._capture_crop(plugin_win)
+        return Image.fromarray(cropped), (left, top, crop_box)
 
     def execute(self, tone_callback=None, fast_mode=False):
         """Thực thi tính năng dò tone."""
@@ -126,7 +147,7 @@ class ToneDetector(BaseFeature):
 
         # OCR
         data_crop = OCRHelper.extract_text_data(cropped)
-        words_crop = OCRHelper.get_text_words(data_crop)
+        words_crop = data_crop.words()
         print("📜 OCR text:", words_crop)
 
         # Trích xuất và hiển thị tone hiện tại
@@ -163,21 +184,16 @@ class ToneDetector(BaseFeature):
                 print("⏰ Timeout waiting for listening to complete")
                 return False
         
-        for i, txt in enumerate(ocr_data["text"]):
-            if txt and txt.strip() in ("Major", "Minor"):
-                note = ocr_data["text"][i-1].strip() if i > 0 else ""
-                found = f"{note} {txt.strip()}".strip()
+        i = ocr_data.first(ocr_data.equals(("Major", "Minor")))
+        if i is not None:
+            note = str(ocr_data.stripped[i - 1]) if i > 0 else ""
+            found = f"{note} {ocr_data.stripped[i]}".strip()
 
-                click_x = left + \
-                    crop_box[0] + ocr_data["left"][i] + \
-                    ocr_data["width"][i] // 2
-                click_y = top + \
-                    crop_box[1] + ocr_data["top"][i] + \
-                    ocr_data["height"][i] // 2
+            click_x, click_y = ocr_data.center(i, left + crop_box[0], top + crop_box[1])
 
-                MouseHelper.safe_click(click_x, click_y)
-                print(f"🎹 Click key: {found}")
-                return True
+            MouseHelper.safe_click(click_x, click_y)
+            print(f"🎹 Click key: {found}")
+            return True
 
         print("⚠️ Không tìm thấy 'Major' hoặc 'Minor'")
         return False
@@ -185,18 +201,11 @@ class ToneDetector(BaseFeature):
     def _is_listening(self, ocr_data):
         """Kiểm tra xem plugin có đang ở trạng thái Listening không."""
         try:
-            # Kiểm tra các từ trong OCR data
-            for txt in ocr_data["text"]:
-                if txt and txt.strip():
-                    txt_clean = txt.strip().lower()
-                    # Kiểm tra các biến thể của "Listening"
-                    if any(keyword in txt_clean for keyword in [
-                        "listening", "listen", "analyzing", "processing", 
-                        "detecting", "analysis", "wait", "processing..."
-                    ]):
-                        return True
-            
-            return False
+            # Kiểm tra các biến thể của "Listening" trong OCR data
+            return bool(ocr_data.contains([
+                "listening", "listen", "analyzing", "processing", 
+                "detecting", "analysis", "wait", "processing..."
+            ]).any())
             
         except Exception as e:
             print(f"❌ Error checking listening state: {e}")
@@ -216,14 +225,7 @@ class ToneDetector(BaseFeature):
                     return False
                 
                 # Screenshot và OCR để kiểm tra trạng thái
-                left, top, right, bottom = plugin_win.left, plugin_win.top, plugin_win.right, plugin_win.bottom
-                full = pyautogui.screenshot(
-                    region=(left, top, right - left, bottom - top))
-                
-                # Crop
-                win_w, win_h = right - left, bottom - top
-                crop_box = self._calculate_crop_box(win_w, win_h)
-                cropped = full.crop(crop_box)
+                cropped, _ = self._screenshot_and_crop_plugin(plugin_win)
                 
                 # OCR
                 data_crop = OCRHelper.extract_text_data(cropped)
@@ -250,19 +252,13 @@ class ToneDetector(BaseFeature):
 
     def _find_and_click_send_button(self, ocr_data, left, top, crop_box):
         """Tìm và click nút Send."""
-        for i, txt in enumerate(ocr_data["text"]):
-            txt_clean = txt.strip() if txt else ""
-            if txt_clean.lower() in ("send", "send to auto-tune™", "auto-tune"):
-                click_x = left + \
-                    crop_box[0] + ocr_data["left"][i] + \
-                    ocr_data["width"][i] // 2
-                click_y = top + \
-                    crop_box[1] + ocr_data["top"][i] + \
-                    ocr_data["height"][i] // 2
+        i = ocr_data.first(ocr_data.equals(("send", "send to auto-tune™", "auto-tune"), case_sensitive=False))
+        if i is not None:
+            click_x, click_y = ocr_data.center(i, left + crop_box[0], top + crop_box[1])
 
-                MouseHelper.safe_click(click_x, click_y)
-                print(f"✅ Clicked '{txt_clean}' button")
-                return True
+            MouseHelper.safe_click(click_x, click_y)
+            print(f"✅ Clicked '{ocr_data.stripped[i]}' button")
+            return True
 
         print("⚠️ Không tìm thấy nút 'Send to Auto-Tune'")
         return False
@@ -339,6 +335,8 @@ class ToneDetector(BaseFeature):
         self.tone_callback = tone_callback
         self.current_tone_getter = current_tone_getter
         self.auto_detect_active = True
+        self._region_change = RegionChangeDetector("AUTO-KEY")
+        self._last_checked_tone = None
         
         # Tạo thread để chạy auto detect
         self.auto_detect_thread = threading.Thread(target=self._auto_detect_loop, daemon=True)
@@ -355,7 +353,9 @@ class ToneDetector(BaseFeature):
         if self.auto_detect_thread:
             self.auto_detect_thread.join(timeout=config.THREAD_JOIN_TIMEOUT)
         
-        print("⏹️ Auto detect đã dừng")
+        stats = self._region_change.get_stats()
+        print(f"⏹️ Auto detect đã dừng (OCR skipped {stats['skipped']}/{stats['checks']} polls, "
+              f"{stats['skip_rate']:.0%} - display unchanged)")
     
     def _auto_detect_loop(self):
         """Loop chính của auto detect."""
@@ -413,22 +413,21 @@ class ToneDetector(BaseFeature):
             if not plugin_win:
                 return None
             
-            # Screenshot và OCR
-            left, top, right, bottom = plugin_win.left, plugin_win.top, plugin_win.right, plugin_win.bottom
-            full = pyautogui.screenshot(
-                region=(left, top, right - left, bottom - top))
+            # Screenshot
+            cropped, cropped_gray, _ = self._capture_crop(plugin_win)
             
-            # Crop
-            win_w, win_h = right - left, bottom - top
-            crop_box = self._calculate_crop_box(win_w, win_h)
-            cropped = full.crop(crop_box)
+            # Vùng hiển thị không đổi so với lần OCR trước -> dùng lại tone đã đọc, không OCR
+            if not self._region_change.has_changed(cropped_gray):
+                return self._last_checked_tone
             
             # OCR
             data_crop = OCRHelper.extract_text_data(cropped)
-            words_crop = OCRHelper.get_text_words(data_crop)
+            words_crop = data_crop.words()
             
             # Trích xuất tone
-            return self._extract_current_tone(words_crop)
+            self._last_checked_tone = self._extract_current_tone(words_crop)
+            self._region_change.mark_processed(cropped_gray)
+            return self._last_checked_tone
             
         except Exception as e:
             print(f"❌ Error checking current tone: {e}")
@@ -443,14 +442,7 @@ class ToneDetector(BaseFeature):
                 return False
             
             # Screenshot và OCR
-            left, top, right, bottom = plugin_win.left, plugin_win.top, plugin_win.right, plugin_win.bottom
-            full = pyautogui.screenshot(
-                region=(left, top, right - left, bottom - top))
-            
-            # Crop
-            win_w, win_h = right - left, bottom - top
-            crop_box = self._calculate_crop_box(win_w, win_h)
-            cropped = full.crop(crop_box)
+            cropped, (left, top, crop_box) = self._screenshot_and_crop_plugin(plugin_win)
             
             # OCR
             data_crop = OCRHelper.extract_text_data(cropped)
@@ -5,11 +5,13 @@ Bao gồm: COMP, Reverb, Bass (LOW), Treble (HIGH)
 import time
 import pyautogui
 import cv2
-import numpy as np
 
 import config
 from features.base_feature import BaseFeature
 from utils.helpers import ImageHelper, TemplateHelper, MessageHelper, MouseHelper, OCRHelper, ConfigHelper
+from utils.shared_screenshot_helper import SharedScreenshotHelper
+from utils.template_locator import TemplateLocator
+from utils.template_metadata import TemplateMetadata
 
 class XVoxDetector(BaseFeature):
     """Tính năng điều chỉnh tất cả controls của XVox plugin."""
@@ -17,6 +19,7 @@ class XVoxDetector(BaseFeature):
     def __init__(self):
         super().__init__()
         self.feature_name = "XVox Controls"
+        self.plugin_key = 'xvox'  # Key cho location memory (xem TemplateLocator)
         
         # Setup Tesseract for OCR (like original)
         OCRHelper.setup_tesseract()
@@ -112,57 +115,58 @@ class XVoxDetector(BaseFeature):
     def _find_template_match(self, plugin_win, template_path, control_name):
         """Tìm template match cho control cụ thể."""
         # Chụ ảnh màn hình vùng plugin
-        x, y, w, h = plugin_win.left, plugin_win.top, plugin_win.width, plugin_win.height
-        screenshot = pyautogui.screenshot(region=(x, y, w, h))
-        screenshot_np = np.array(screenshot)
-        screenshot_gray = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2GRAY)
+        x, y, w, h, screenshot_np, screenshot_gray = SharedScreenshotHelper.capture_plugin_region(plugin_win)
 
         print(f"📐 XVox plugin window size: {w}x{h}")
 
-        # Load template
-        template = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
-        if template is None:
+        # Load template (cached)
+        template_entry = TemplateHelper.load_template(template_path)
+        if template_entry is None:
             print(f"❌ Không thể load template: {template_path}")
             return None, 0
+        template = template_entry.image
 
         template_h, template_w = template.shape[:2]
         print(f"📐 {control_name} template size: {template_w}x{template_h}")
 
         # Adaptive template matching
-        best_result = TemplateHelper.adaptive_template_match(screenshot_gray, template)
+        best_result = TemplateLocator.locate(
+            self.plugin_key, screenshot_gray, template_entry, window_size=(w, h), window_origin=(x, y)
+        )
         
-        print(f"🏆 {control_name} best method: {best_result['method']}")
-        print(f"🔍 {control_name} confidence: {best_result['confidence']:.3f}")
-        print(f"📏 {control_name} scale: {best_result['scale']:.2f}")
+        print(f"🏆 {control_name} best method: {best_result.method}")
+        print(f"🔍 {control_name} confidence: {best_result.confidence:.3f}")
+        print(f"📏 {control_name} scale: {best_result.scale:.2f}")
 
         # Save debug image
         debug_filename = f"{control_name.lower()}_adaptive_debug.png"
         
-        if best_result['scale'] != 1.0:
-            scaled_w, scaled_h = best_result['template_size']
+        if best_result.scale != 1.0:
+            scaled_w, scaled_h = best_result.template_size
             debug_template = cv2.resize(template, (scaled_w, scaled_h))
         else:
             debug_template = template
         
         debug_path = ImageHelper.save_template_debug_image(
-            screenshot_np, debug_template, best_result['location'], 
-            best_result['confidence'], debug_filename
+            screenshot_np, debug_template, best_result.location, 
+            best_result.confidence, debug_filename
         )
         print(f"🖼 {control_name} debug saved -> {debug_path}")
 
-        if best_result['confidence'] < config.TEMPLATE_MATCH_THRESHOLD:
-            print(f"❌ {control_name} template not found. Confidence: {best_result['confidence']:.3f}")
-            return None, best_result['confidence']
+        if best_result.confidence < config.TEMPLATE_MATCH_THRESHOLD:
+            print(f"❌ {control_name} template not found. Confidence: {best_result.confidence:.3f}")
+            return None, best_result.confidence
 
-        # Tính toán vị trí click
-        scaled_w, scaled_h = best_result['template_size']
-        click_x = x + best_result['location'][0] + scaled_w // 2
-        click_y = y + best_result['location'][1] + scaled_h // 2
+        # Tính toán vị trí click (control + ô nhập giá trị theo config.TEMPLATE_CLICK_POINTS)
+        point = TemplateMetadata.get_click_point(template_entry.key)
+        click_x, click_y = best_result.center(x, y, y_ratio=point['y_ratio'], x_ratio=point['x_ratio'])
+        input_pos = best_result.center(x, y, y_ratio=point.get('input_y_ratio'), x_ratio=point['x_ratio'])
 
-        print(f"✅ {control_name} template found with confidence: {best_result['confidence']:.3f}")
-        print(f"🎯 {control_name} click position: ({click_x}, {click_y}) [Scale: {best_result['scale']:.2f}]")
+        print(f"✅ {control_name} template found with confidence: {best_result.confidence:.3f}")
+        print(f"🎯 {control_name} click position: ({click_x}, {click_y}) [Scale: {best_result.scale:.2f}]")
 
-        return {'click_pos': (click_x, click_y), 'template_match': best_result}, best_result['confidence']
+        return {'click_pos': (click_x, click_y), 'input_pos': input_pos, 'template_match': best_result}, \
+            best_result.confidence
     
     # ==================== COMP METHODS ====================
     
@@ -210,12 +214,10 @@ class XVoxDetector(BaseFeature):
             print("⏰ Waiting 0.2s...")  # Giảm từ 0.5s xuống 0.2s
             time.sleep(0.2)
             
-            # Click above template for input field
-            estimated_template_height = 100
-            template_top_y = click_y - (estimated_template_height // 2)
-            top_click_y = template_top_y - 15
-            print(f"👆 Double clicking above template: ({click_x}, {top_click_y})")
-            pyautogui.doubleClick(click_x, top_click_y)
+            # Double click ô nhập giá trị (vị trí theo config.TEMPLATE_CLICK_POINTS)
+            input_x, input_y = result_data['input_pos']
+            print(f"👆 Double clicking input field: ({input_x}, {input_y})")
+            pyautogui.doubleClick(input_x, input_y)
             time.sleep(0.1)  # Giảm từ 0.2 xuống 0.1
             
             print(f"⌨️ Typing COMP value: {value}")
@@ -280,11 +282,10 @@ class XVoxDetector(BaseFeature):
             print("⏰ Waiting 0.2s...")  # Giảm từ 0.5s xuống 0.2s
             time.sleep(0.2)
             
-            estimated_template_height = 100
-            template_top_y = click_y - (estimated_template_height // 2)
-            top_click_y = template_top_y - 15
-            print(f"👆 Double clicking above template: ({click_x}, {top_click_y})")
-            pyautogui.doubleClick(click_x, top_click_y)
+            # Double click ô nhập giá trị (vị trí theo config.TEMPLATE_CLICK_POINTS)
+            input_x, input_y = result_data['input_pos']
+            print(f"👆 Double clicking input field: ({input_x}, {input_y})")
+            pyautogui.doubleClick(input_x, input_y)
             time.sleep(0.1)  # Giảm từ 0.2 xuống 0.1
             
             print(f"⌨️ Typing Reverb value: {value}")
@@ -347,18 +348,15 @@ class XVoxDetector(BaseFeature):
             time.sleep(0.05)  # Giảm từ 0.2 xuống 0.05
             print(f"🖱 Clicked on LOW text at {low_pos}")
             
-            # 6. Click ở vị trí chiều dọc 35% từ trên xuống (convert to absolute coordinates)
+            # 6. Click vào dòng giá trị (value_y_ratio trong config.TEMPLATE_CLICK_POINTS, convert to absolute coordinates)
             template_match = result['template_match']
-            template_top = template_match['location'][1]  # Relative Y in plugin window
-            template_height = template_match['template_size'][1]
-            
-            # Convert to absolute screen coordinates
-            click_y = plugin_win.top + template_top + (template_height * 0.35)
+            value_y_ratio = TemplateMetadata.get_click_point('tone_mic_template')['value_y_ratio']
+            _, click_y = template_match.center(plugin_win.left, plugin_win.top, y_ratio=value_y_ratio)
             click_x = low_pos[0]
             
             pyautogui.click(click_x, click_y)
             time.sleep(0.05)  # Giảm từ 0.2 xuống 0.05
-            print(f"🖱 Clicked at 35% position: ({click_x}, {click_y})")
+            print(f"🖱 Clicked at value row: ({click_x}, {click_y})")
             
             # 7. Select text and input value
             pyautogui.tripleClick(click_x, click_y)
@@ -423,18 +421,15 @@ class XVoxDetector(BaseFeature):
             time.sleep(0.05)  # Giảm từ 0.2 xuống 0.05
             print(f"🖱 Clicked on HIGH text at {high_pos}")
             
-            # 6. Click ở vị trí chiều dọc 35% từ trên xuống (convert to absolute coordinates)
+            # 6. Click vào dòng giá trị (value_y_ratio trong config.TEMPLATE_CLICK_POINTS, convert to absolute coordinates)
             template_match = result['template_match']
-            template_top = template_match['location'][1]  # Relative Y in plugin window
-            template_height = template_match['template_size'][1]
-            
-            # Convert to absolute screen coordinates
-            click_y = plugin_win.top + template_top + (template_height * 0.35)
+            value_y_ratio = TemplateMetadata.get_click_point('tone_mic_template')['value_y_ratio']
+            _, click_y = template_match.center(plugin_win.left, plugin_win.top, y_ratio=value_y_ratio)
             click_x = high_pos[0]
             
             pyautogui.click(click_x, click_y)
             time.sleep(0.05)  # Giảm từ 0.2 xuống 0.05
-            print(f"🖱 Clicked at 35% position: ({click_x}, {click_y})")
+            print(f"🖱 Clicked at value row: ({click_x}, {click_y})")
             
             # 7. Select text and input value
             pyautogui.tripleClick(click_x, click_y)
@@ -468,35 +463,36 @@ class XVoxDetector(BaseFeature):
             print(f"📐 XVox window: {x}, {y}, {w}x{h}")
             
             # Screenshot XVox window
-            screenshot = pyautogui.screenshot(region=(x, y, w, h))
-            screenshot_np = np.array(screenshot)
-            screenshot_gray = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2GRAY)
+            x, y, w, h, screenshot_np, screenshot_gray = SharedScreenshotHelper.capture_plugin_region(xvox_window)
             
             print(f"📐 XVox screenshot size: {w}x{h}")
             
-            # Load template
-            template = cv2.imread(self.tone_mic_template_path, cv2.IMREAD_GRAYSCALE)
-            if template is None:
+            # Load template (cached)
+            template_entry = TemplateHelper.load_template(self.tone_mic_template_path)
+            if template_entry is None:
                 print(f"❌ Cannot load tone mic template: {self.tone_mic_template_path}")
                 return None
+            template = template_entry.image
                 
             template_h, template_w = template.shape[:2]
             print(f"📐 Tone Mic template size: {template_w}x{template_h}")
             
             # Adaptive template matching
-            best_result = TemplateHelper.adaptive_template_match(screenshot_gray, template)
+            best_result = TemplateLocator.locate(
+                self.plugin_key, screenshot_gray, template_entry, window_size=(w, h), window_origin=(x, y)
+            )
             
-            print(f"🏆 Tone Mic best method: {best_result['method']}")
-            print(f"🔍 Tone Mic confidence: {best_result['confidence']:.3f}")
-            print(f"📏 Tone Mic scale: {best_result['scale']:.2f}")
+            print(f"🏆 Tone Mic best method: {best_result.method}")
+            print(f"🔍 Tone Mic confidence: {best_result.confidence:.3f}")
+            print(f"📏 Tone Mic scale: {best_result.scale:.2f}")
             
-            if best_result['confidence'] < config.TEMPLATE_MATCH_THRESHOLD:
-                print(f"❌ Tone Mic template confidence too low: {best_result['confidence']:.3f}")
+            if best_result.confidence < config.TEMPLATE_MATCH_THRESHOLD:
+                print(f"❌ Tone Mic template confidence too low: {best_result.confidence:.3f}")
                 return None
             
             # Template match coordinates
-            match_x, match_y = best_result['location']
-            scaled_w, scaled_h = best_result['template_size']
+            match_x, match_y = best_result.location
+            scaled_w, scaled_h = best_result.template_size
             
             print(f"✅ Tone Mic template found at: ({match_x}, {match_y}) with size {scaled_w}x{scaled_h}")
             
@@ -506,72 +502,45 @@ class XVoxDetector(BaseFeature):
             
             print(f"📖 OCR region: ({ocr_x}, {ocr_y}, {ocr_w}x{ocr_h})")
             
-            # Direct capture OCR region
-            absolute_ocr_x = x + ocr_x
-            absolute_ocr_y = y + ocr_y
-            ocr_region_pil = pyautogui.screenshot(region=(absolute_ocr_x, absolute_ocr_y, ocr_w, ocr_h))
-            
-            # Convert OCR region to grayscale
-            print("📖 Converting OCR region to grayscale...")
-            ocr_region_np = np.array(ocr_region_pil)
-            ocr_region_gray = cv2.cvtColor(ocr_region_np, cv2.COLOR_RGB2GRAY)
-            
-            # Convert back to PIL for OCR
-            from PIL import Image
-            ocr_region_gray_pil = Image.fromarray(ocr_region_gray, mode='L')
+            # OCR region = view vào screenshot grayscale đã chụp (không chụp/convert lại)
+            ocr_region_gray = SharedScreenshotHelper.region_view(screenshot_gray, (ocr_x, ocr_y), (ocr_w, ocr_h))
             
             print("📖 OCR on grayscale region...")
-            ocr_data = OCRHelper.extract_text_data(ocr_region_gray_pil)
-            words = OCRHelper.get_text_words(ocr_data)
+            ocr_data = OCRHelper.extract_text_data(ocr_region_gray)
+            words = ocr_data.words()
             print(f"📜 OCR text in tone mic region: {words}")
             
             # Tìm vị trí LOW và HIGH
             low_pos = None
             high_pos = None
-            low_index = -1  # Lưu index của LOW để tìm HIGH
             
             # Bước 1: Tìm vị trí LOW
-            for i, text in enumerate(ocr_data["text"]):
-                if text and text.strip():
-                    text_clean = text.strip().upper()
-                    
-                    if "LOW" in text_clean:
-                        # Tính vị trí absolute của LOW
-                        low_x = x + ocr_x + ocr_data["left"][i] + ocr_data["width"][i] // 2
-                        low_y = y + ocr_y + ocr_data["top"][i] + ocr_data["height"][i] // 2
-                        low_pos = (low_x, low_y)
-                        low_index = i
-                        print(f"🔉 Found LOW at index {i}: ({low_x}, {low_y})")
-                        break
+            low_index = ocr_data.first(ocr_data.contains("LOW"))
+            if low_index is not None:
+                # Tính vị trí absolute của LOW
+                low_pos = ocr_data.center(low_index, x + ocr_x, y + ocr_y)
+                print(f"🔉 Found LOW at index {low_index}: {low_pos}")
             
             # Bước 2: Tìm vị trí HIGH
             # 2a. Thử tìm trực tiếp từ OCR
-            for i, text in enumerate(ocr_data["text"]):
-                if text and text.strip():
-                    text_clean = text.strip().upper()
-                    
-                    if "HIGH" in text_clean:
-                        # Tính vị trí absolute của HIGH
-                        high_x = x + ocr_x + ocr_data["left"][i] + ocr_data["width"][i] // 2
-                        high_y = y + ocr_y + ocr_data["top"][i] + ocr_data["height"][i] // 2
-                        high_pos = (high_x, high_y)
-                        print(f"🔊 Found HIGH at index {i}: ({high_x}, {high_y})")
-                        break
+            high_index = ocr_data.first(ocr_data.contains("HIGH"))
+            if high_index is not None:
+                # Tính vị trí absolute của HIGH
+                high_pos = ocr_data.center(high_index, x + ocr_x, y + ocr_y)
+                print(f"🔊 Found HIGH at index {high_index}: {high_pos}")
             
             # 2b. Nếu không tìm thấy HIGH, sử dụng vị trí cách LOW hai đơn vị
-            if not high_pos and low_index >= 0:
+            if not high_pos and low_index is not None:
                 # Theo log của bạn, HIGH cách LOW 2 đơn vị trong mảng
                 high_index = low_index + 2  # Vị trí cách LOW hai đơn vị
                 
                 # Kiểm tra xem index có hợp lệ không
-                if high_index < len(ocr_data["text"]):
-                    high_text = ocr_data["text"][high_index]
-                    if high_text and high_text.strip():
+                if high_index < len(ocr_data):
+                    high_text = ocr_data.text[high_index]
+                    if ocr_data.stripped[high_index]:
                         # Tính vị trí absolute của HIGH (dựa vào vị trí cách LOW hai đơn vị)
-                        high_x = x + ocr_x + ocr_data["left"][high_index] + ocr_data["width"][high_index] // 2
-                        high_y = y + ocr_y + ocr_data["top"][high_index] + ocr_data["height"][high_index] // 2
-                        high_pos = (high_x, high_y)
-                        print(f"🔊 Found HIGH at index {high_index} (text: '{high_text}'): ({high_x}, {high_y})")
+                        high_pos = ocr_data.center(high_index, x + ocr_x, y + ocr_y)
+                        print(f"🔊 Found HIGH at index {high_index} (text: '{high_text}'): {high_pos}")
                     else:
                         print(f"⚠️ Text at position {high_index} is empty")
                 else:
@@ -582,44 +551,27 @@ class XVoxDetector(BaseFeature):
                 print("⚠️ Sử dụng phương pháp dựa trên vị trí (fallback)...")
                 
                 # Lọc ra các text có content
-                valid_texts = []
-                for i, text in enumerate(ocr_data["text"]):
-                    if text and text.strip():
-                        text_info = {
-                            'text': text.strip(),
-                            'index': i,
-                            'left': ocr_data["left"][i],
-                            'top': ocr_data["top"][i],
-                            'width': ocr_data["width"][i],
-                            'height': ocr_data["height"][i]
-                        }
-                        valid_texts.append(text_info)
+                valid_indices = ocr_data.indices(ocr_data.non_empty())
                 
-                print(f"📝 Valid OCR texts: {[t['text'] for t in valid_texts]}")
+                print(f"📝 Valid OCR texts: {words}")
                 
                 # Nếu có ít nhất 3 elements
-                if len(valid_texts) >= 3:
+                if len(valid_indices) >= 3:
                     # Element đầu tiên = LOW
                     if not low_pos:
-                        low_info = valid_texts[0]
-                        low_x = x + ocr_x + low_info['left'] + low_info['width'] // 2
-                        low_y = y + ocr_y + low_info['top'] + low_info['height'] // 2
-                        low_pos = (low_x, low_y)
-                        print(f"🔉 Fallback LOW ('{low_info['text']}') at: ({low_x}, {low_y})")
+                        low_pos = ocr_data.center(valid_indices[0], x + ocr_x, y + ocr_y)
+                        print(f"🔉 Fallback LOW ('{ocr_data.stripped[valid_indices[0]]}') at: {low_pos}")
                     
                     # Element thứ 3 = HIGH  
                     if not high_pos:
-                        high_info = valid_texts[2]
-                        high_x = x + ocr_x + high_info['left'] + high_info['width'] // 2
-                        high_y = y + ocr_y + high_info['top'] + high_info['height'] // 2
-                        high_pos = (high_x, high_y)
-                        print(f"🔊 Fallback HIGH ('{high_info['text']}') at: ({high_x}, {high_y})")
+                        high_pos = ocr_data.center(valid_indices[2], x + ocr_x, y + ocr_y)
+                        print(f"🔊 Fallback HIGH ('{ocr_data.stripped[valid_indices[2]]}') at: {high_pos}")
             
             # Save debug image 
             debug_filename = "tone_mic_ocr_debug.png"
             debug_path = ImageHelper.save_template_debug_image(
                 screenshot_np, template, (match_x, match_y), 
-                best_result['confidence'], debug_filename
+                best_result.confidence, debug_filename
             )
             print(f"🖼 Tone mic OCR debug saved -> {debug_path}")
             
@@ -636,10 +588,7 @@ class XVoxDetector(BaseFeature):
             
     def _perform_ocr_workflow(self, plugin_win, template_match, target_text, value, control_name):
         """Thực hiện OCR workflow cho Bass/Treble."""
-        x, y, w, h = plugin_win.left, plugin_win.top, plugin_win.width, plugin_win.height
-        screenshot = pyautogui.screenshot(region=(x, y, w, h))
-        screenshot_np = np.array(screenshot)
-        screenshot_gray = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2GRAY)
+        x, y, w, h, screenshot_np, screenshot_gray = SharedScreenshotHelper.capture_plugin_region(plugin_win)
         
         # Convert to PIL for OCR (like the original code)
         from PIL import Image
@@ -648,44 +597,35 @@ class XVoxDetector(BaseFeature):
         # OCR to find LOW/HIGH text
         print("📖 OCR on grayscale region...")
         ocr_data = OCRHelper.extract_text_data(screenshot_pil)
-        words = OCRHelper.get_text_words(ocr_data)
+        words = ocr_data.words()
         print(f"📜 OCR text in tone mic region: {words}")
         
         target_pos = None
         
         # Look for exact target text first (like original code)
-        for i, text in enumerate(ocr_data["text"]):
-            if text and text.strip():
-                text_clean = text.strip().upper()
-                
-                if target_text in text_clean:
-                    # Calculate absolute position (like original)
-                    target_x = x + ocr_data["left"][i] + ocr_data["width"][i] // 2
-                    target_y = y + ocr_data["top"][i] + ocr_data["height"][i] // 2
-                    target_pos = (target_x, target_y)
-                    print(f"   ✅ Found {target_text} text at position {i}: {target_pos}")
-                    break
+        i = ocr_data.first(ocr_data.contains(target_text))
+        if i is not None:
+            # Calculate absolute position (like original)
+            target_pos = ocr_data.center(i, x, y)
+            print(f"   ✅ Found {target_text} text at position {i}: {target_pos}")
         
         # Fallback: use position-based detection (like original)
-        if not target_pos and len(ocr_data["text"]) >= 3:
+        if not target_pos and len(ocr_data) >= 3:
             if target_text == "LOW":
                 i = 0  # First element
             else:  # HIGH
                 i = 2  # Third element
             
-            if i < len(ocr_data["text"]):
-                target_x = x + ocr_data["left"][i] + ocr_data["width"][i] // 2
-                target_y = y + ocr_data["top"][i] + ocr_data["height"][i] // 2
-                target_pos = (target_x, target_y)
-                print(f"   🔄 Using fallback position for {target_text}: {target_pos}")
+            target_pos = ocr_data.center(i, x, y)
+            print(f"   🔄 Using fallback position for {target_text}: {target_pos}")
         
         if not target_pos:
             print(f"❌ Could not find {target_text} position")
             return False
         
         # Calculate click position (40% down from template top)
-        template_top = template_match['location'][1]
-        template_height = template_match['template_size'][1]
+        template_top = template_match.location[1]
+        template_height = template_match.template_size[1]
         
         click_y = template_top + (template_height * 0.40)
         click_x = target_pos[0]
@@ -163,13 +163,17 @@ class Footer(BaseComponent):
             
             # Screenshot toàn bộ cửa sổ XVox một lần
             import pyautogui
-            import cv2
-            import numpy as np
-            from PIL import Image
+            from utils.helpers import TemplateHelper
+            from utils.shared_screenshot_helper import SharedScreenshotHelper
+            from utils.template_metadata import TemplateMetadata
             
-            screenshot = pyautogui.screenshot(region=(x, y, w, h))
-            screenshot_np = np.array(screenshot)
-            screenshot_gray = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2GRAY)
+            x, y, w, h, screenshot_np, screenshot_gray = SharedScreenshotHelper.capture_plugin_region(xvox_win, gray_only=True)
+            
+            # Match COMP, Reverb và tone mic một lượt trên cùng screenshot
+            matches = TemplateHelper.match_many(
+                screenshot_gray, ['comp_template', 'reverb_template', 'tone_mic_template'],
+                window_size=(w, h), plugin_key='xvox', window_origin=(x, y)
+            )
             
             # Chuẩn bị các giá trị mặc định
             xvox_volume_default = default_values.get('xvox_volume_default', 40)
@@ -180,34 +184,27 @@ class Footer(BaseComponent):
             # Reset Volume Mic (COMP)
             print(f"🔄 Resetting Volume Mic to {xvox_volume_default}...")
             try:
-                # Load template
-                comp_template = cv2.imread(config.TEMPLATE_PATHS['comp_template'], cv2.IMREAD_GRAYSCALE)
-                if comp_template is None:
+                # Template matching (đã match ở trên)
+                best_result = matches['comp_template']
+                if best_result is None:
                     print(f"❌ Cannot load COMP template")
                     return False
                 
-                # Template matching
-                from utils.helpers import TemplateHelper
-                best_result = TemplateHelper.adaptive_template_match(screenshot_gray, comp_template)
-                
-                if best_result['confidence'] < config.TEMPLATE_MATCH_THRESHOLD:
-                    print(f"❌ COMP template confidence too low: {best_result['confidence']:.3f}")
+                if best_result.confidence < config.TEMPLATE_MATCH_THRESHOLD:
+                    print(f"❌ COMP template confidence too low: {best_result.confidence:.3f}")
                     return False
                 
-                # Tính toán vị trí click
-                scaled_w, scaled_h = best_result['template_size']
-                click_x = x + best_result['location'][0] + scaled_w // 2
-                click_y = y + best_result['location'][1] + scaled_h // 2
+                # Tính toán vị trí click (control + ô nhập giá trị theo config.TEMPLATE_CLICK_POINTS)
+                point = TemplateMetadata.get_click_point('comp_template')
+                click_x, click_y = best_result.center(x, y, y_ratio=point['y_ratio'], x_ratio=point['x_ratio'])
+                input_x, input_y = best_result.center(x, y, y_ratio=point.get('input_y_ratio'), x_ratio=point['x_ratio'])
                 
                 # Thực hiện click và nhập giá trị - GIẢM DELAY
                 pyautogui.click(click_x, click_y)
                 time.sleep(0.05)  # Giảm từ 0.1 xuống 0.05
                 time.sleep(0.1)  # Giảm từ 0.5 xuống 0.1
                 
-                estimated_template_height = 100
-                template_top_y = click_y - (estimated_template_height // 2)
-                top_click_y = template_top_y - 15
-                pyautogui.doubleClick(click_x, top_click_y)
+                pyautogui.doubleClick(input_x, input_y)
                 time.sleep(0.05)  # Giảm từ 0.2 xuống 0.05
                 
                 pyautogui.typewrite(str(xvox_volume_default))
@@ -227,33 +224,27 @@ class Footer(BaseComponent):
             # Reset Reverb
             print(f"🔄 Resetting Reverb to {reverb_default}...")
             try:
-                # Load template
-                reverb_template = cv2.imread(config.TEMPLATE_PATHS['reverb_template'], cv2.IMREAD_GRAYSCALE)
-                if reverb_template is None:
+                # Template matching (đã match ở trên)
+                best_result = matches['reverb_template']
+                if best_result is None:
                     print(f"❌ Cannot load Reverb template")
                     return False
                 
-                # Template matching
-                best_result = TemplateHelper.adaptive_template_match(screenshot_gray, reverb_template)
-                
-                if best_result['confidence'] < config.TEMPLATE_MATCH_THRESHOLD:
-                    print(f"❌ Reverb template confidence too low: {best_result['confidence']:.3f}")
+                if best_result.confidence < config.TEMPLATE_MATCH_THRESHOLD:
+                    print(f"❌ Reverb template confidence too low: {best_result.confidence:.3f}")
                     return False
                 
-                # Tính toán vị trí click
-                scaled_w, scaled_h = best_result['template_size']
-                click_x = x + best_result['location'][0] + scaled_w // 2
-                click_y = y + best_result['location'][1] + scaled_h // 2
+                # Tính toán vị trí click (control + ô nhập giá trị theo config.TEMPLATE_CLICK_POINTS)
+                point = TemplateMetadata.get_click_point('reverb_template')
+                click_x, click_y = best_result.center(x, y, y_ratio=point['y_ratio'], x_ratio=point['x_ratio'])
+                input_x, input_y = best_result.center(x, y, y_ratio=point.get('input_y_ratio'), x_ratio=point['x_ratio'])
                 
                 # Thực hiện click và nhập giá trị - GIẢM DELAY
                 pyautogui.click(click_x, click_y)
                 time.sleep(0.05)  # Giảm từ 0.1 xuống 0.05
                 time.sleep(0.1)  # Giảm từ 0.5 xuống 0.1
                 
-                estimated_template_height = 100
-                template_top_y = click_y - (estimated_template_height // 2)
-                top_click_y = template_top_y - 15
-                pyautogui.doubleClick(click_x, top_click_y)
+                pyautogui.doubleClick(input_x, input_y)
                 time.sleep(0.05)  # Giảm từ 0.2 xuống 0.05
                 
                 pyautogui.typewrite(str(reverb_default))
@@ -273,91 +264,62 @@ class Footer(BaseComponent):
             # Reset Bass và Treble bằng OCR một lần
             print(f"🔄 Resetting Bass to {bass_default} and Treble to {treble_default}...")
             try:
-                # Load template
-                tone_mic_template = cv2.imread(config.TEMPLATE_PATHS['tone_mic_template'], cv2.IMREAD_GRAYSCALE)
-                if tone_mic_template is None:
+                # Template matching (đã match ở trên)
+                best_result = matches['tone_mic_template']
+                if best_result is None:
                     print(f"❌ Cannot load tone mic template")
                     return False
                 
-                # Template matching
-                best_result = TemplateHelper.adaptive_template_match(screenshot_gray, tone_mic_template)
-                
-                if best_result['confidence'] < config.TEMPLATE_MATCH_THRESHOLD:
-                    print(f"❌ Tone mic template confidence too low: {best_result['confidence']:.3f}")
+                if best_result.confidence < config.TEMPLATE_MATCH_THRESHOLD:
+                    print(f"❌ Tone mic template confidence too low: {best_result.confidence:.3f}")
                     return False
                 
                 # Template match coordinates
-                match_x, match_y = best_result['location']
-                scaled_w, scaled_h = best_result['template_size']
+                match_x, match_y = best_result.location
+                scaled_w, scaled_h = best_result.template_size
+                value_y_ratio = TemplateMetadata.get_click_point('tone_mic_template')['value_y_ratio']
                 
                 # Define OCR region
                 ocr_x, ocr_y = match_x, match_y
                 ocr_w, ocr_h = scaled_w, scaled_h
                 
-                # Direct capture OCR region
-                absolute_ocr_x = x + ocr_x
-                absolute_ocr_y = y + ocr_y
-                ocr_region_pil = pyautogui.screenshot(region=(absolute_ocr_x, absolute_ocr_y, ocr_w, ocr_h))
-                
-                # Convert OCR region to grayscale
-                ocr_region_np = np.array(ocr_region_pil)
-                ocr_region_gray = cv2.cvtColor(ocr_region_np, cv2.COLOR_RGB2GRAY)
-                
-                # Convert back to PIL for OCR
-                ocr_region_gray_pil = Image.fromarray(ocr_region_gray, mode='L')
+                # OCR region = view vào screenshot grayscale đã chụp ở trên (không chụp/convert lại)
+                ocr_region_gray = SharedScreenshotHelper.region_view(screenshot_gray, (ocr_x, ocr_y), (ocr_w, ocr_h))
                 
                 # OCR
                 from utils.helpers import OCRHelper
-                ocr_data = OCRHelper.extract_text_data(ocr_region_gray_pil)
-                words = OCRHelper.get_text_words(ocr_data)
+                ocr_data = OCRHelper.extract_text_data(ocr_region_gray)
+                words = ocr_data.words()
                 print(f"📜 OCR text in tone mic region: {words}")
                 
                 # Tìm vị trí LOW và HIGH
                 low_pos = None
                 high_pos = None
-                low_index = -1
                 
                 # Tìm vị trí LOW
-                for i, text in enumerate(ocr_data["text"]):
-                    if text and text.strip():
-                        text_clean = text.strip().upper()
-                        
-                        if "LOW" in text_clean:
-                            # Tính vị trí absolute của LOW
-                            low_x = x + ocr_x + ocr_data["left"][i] + ocr_data["width"][i] // 2
-                            low_y = y + ocr_y + ocr_data["top"][i] + ocr_data["height"][i] // 2
-                            low_pos = (low_x, low_y)
-                            low_index = i
-                            print(f"🔉 Found LOW at index {i}: ({low_x}, {low_y})")
-                            break
+                low_index = ocr_data.first(ocr_data.contains("LOW"))
+                if low_index is not None:
+                    # Tính vị trí absolute của LOW
+                    low_pos = ocr_data.center(low_index, x + ocr_x, y + ocr_y)
+                    print(f"🔉 Found LOW at index {low_index}: {low_pos}")
                 
                 # Tìm vị trí HIGH
                 # Thử tìm trực tiếp từ OCR
-                for i, text in enumerate(ocr_data["text"]):
-                    if text and text.strip():
-                        text_clean = text.strip().upper()
-                        
-                        if "HIGH" in text_clean:
-                            # Tính vị trí absolute của HIGH
-                            high_x = x + ocr_x + ocr_data["left"][i] + ocr_data["width"][i] // 2
-                            high_y = y + ocr_y + ocr_data["top"][i] + ocr_data["height"][i] // 2
-                            high_pos = (high_x, high_y)
-                            print(f"🔊 Found HIGH at index {i}: ({high_x}, {high_y})")
-                            break
+                high_index = ocr_data.first(ocr_data.contains("HIGH"))
+                if high_index is not None:
+                    # Tính vị trí absolute của HIGH
+                    high_pos = ocr_data.center(high_index, x + ocr_x, y + ocr_y)
+                    print(f"🔊 Found HIGH at index {high_index}: {high_pos}")
                 
                 # Nếu không tìm thấy HIGH, sử dụng vị trí cách LOW hai đơn vị
-                if not high_pos and low_index >= 0:
+                if not high_pos and low_index is not None:
                     high_index = low_index + 2
                     
                     # Kiểm tra xem index có hợp lệ không
-                    if high_index < len(ocr_data["text"]):
-                        high_text = ocr_data["text"][high_index]
-                        if high_text and high_text.strip():
-                            # Tính vị trí absolute của HIGH
-                            high_x = x + ocr_x + ocr_data["left"][high_index] + ocr_data["width"][high_index] // 2
-                            high_y = y + ocr_y + ocr_data["top"][high_index] + ocr_data["height"][high_index] // 2
-                            high_pos = (high_x, high_y)
-                            print(f"🔊 Found HIGH at index {high_index} (text: '{high_text}'): ({high_x}, {high_y})")
+                    if high_index < len(ocr_data) and ocr_data.stripped[high_index]:
+                        # Tính vị trí absolute của HIGH
+                        high_pos = ocr_data.center(high_index, x + ocr_x, y + ocr_y)
+                        print(f"🔊 Found HIGH at index {high_index} (text: '{ocr_data.text[high_index]}'): {high_pos}")
                 
                 # Reset Bass - GIẢM DELAY
                 if low_pos:
@@ -365,11 +327,8 @@ class Footer(BaseComponent):
                     pyautogui.click(low_pos[0], low_pos[1])
                     time.sleep(0.05)  # Giảm từ 0.2 xuống 0.05
                     
-                    # Click ở vị trí chiều dọc 35% từ trên xuống
-                    template_top = match_y
-                    template_height = scaled_h
-                    
-                    click_y = y + template_top + (template_height * 0.35)
+                    # Click vào dòng giá trị (value_y_ratio trong config.TEMPLATE_CLICK_POINTS)
+                    click_y = y + match_y + int(scaled_h * value_y_ratio)
                     click_x = low_pos[0]
                     
                     pyautogui.click(click_x, click_y)
@@ -397,11 +356,8 @@ class Footer(BaseComponent):
                     pyautogui.click(high_pos[0], high_pos[1])
                     time.sleep(0.05)  # Giảm từ 0.2 xuống 0.05
                     
-                    # Click ở vị trí chiều dọc 35% từ trên xuống
-                    template_top = match_y
-                    template_height = scaled_h
-                    
-                    click_y = y + template_top + (template_height * 0.35)
+                    # Click vào dòng giá trị (value_y_ratio trong config.TEMPLATE_CLICK_POINTS)
+                    click_y = y + match_y + int(scaled_h * value_y_ratio)
                     click_x = high_pos[0]
                     
                     pyautogui.click(click_x, click_y)
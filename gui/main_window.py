@@ -23,6 +23,9 @@ from utils.music_presets_manager import MusicPresetsManager
 from utils.debug_window import DebugWindow
 from utils.fast_batch_processor import FastBatchProcessor
 from utils.ultra_fast_processor import UltraFastAutoTuneProcessor
+from utils.template_cache import TemplateCache
+from utils.template_locator import TemplateLocator
+from utils.template_metadata import TemplateMetadata
 
 # Import components
 from gui.components.autotune_section import AutoTuneSection
@@ -74,6 +77,11 @@ class MainWindow:
         self.proq3_bypass_detector = ProQ3BypassDetector()
         self.xvox_detector = XVoxDetector()
 
+        # Decode trước tất cả templates (cache dùng chung cho mọi detector)
+        TemplateCache.preload()
+        # Vị trí control đã tìm ở các lần chạy trước (verify bằng ROI trước khi dùng)
+        TemplateLocator.load()
+
         # System Volume Detector (Windows Audio Session)
         app_name = self.default_values.get(
             'system_volume_app_name', 'chrome.exe')
@@ -361,7 +369,11 @@ class MainWindow:
 
     def run(self):
         """Start the application main loop."""
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            # Reference window học được trong phiên (atexit cũng flush, đây là đường đóng app bình thường)
+            TemplateMetadata.flush()
 
     # ==================== TONE DETECTION ====================
 
@@ -0,0 +1,88 @@
+"""
+Pyramid (coarse-to-fine) search phải cho cùng kết quả với sweep full resolution
+(cùng frame, cùng template, multi_scale_template_match với pyramid=True/False).
+"""
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import config
+from utils.helpers import TemplateHelper
+from utils.template_cache import CachedTemplate
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+FRAME_SIZE = (960, 720)  # (w, h) - lớn hơn PYRAMID_MIN_FRAME_PIXELS để pyramid thật sự chạy
+BACKGROUND = 45
+CONFIDENCE_TOLERANCE = 1e-4
+DISTRACTORS = ('flex_tune_template', 'humanize_template', 'natural_vibrato_template')
+
+
+@pytest.fixture(autouse=True)
+def pyramid_config(monkeypatch):
+    """Chỉ so sánh pyramid: tắt prefilter, nội suy scale và thread pool."""
+    monkeypatch.setattr(config, 'VARIANCE_PREFILTER_ENABLED', False)
+    monkeypatch.setattr(config, 'SCALE_REFINE_ENABLED', False)
+    monkeypatch.setattr(config, 'PARALLEL_MATCHING_ENABLED', False)
+
+
+def _load(name):
+    path = os.path.join(TEMPLATES_DIR, f'{name}.png')
+    image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    assert image is not None, f"missing template {path}"
+    return CachedTemplate(path, None, image)
+
+
+def _frame(entry, scale, location, seed=0):
+    """Frame nền tối có nhiễu nhẹ, vài control khác ở dải dưới và template đã scale ở `location`."""
+    width, height = FRAME_SIZE
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width), BACKGROUND, dtype=np.uint8)
+    frame += rng.integers(0, 4, size=frame.shape, dtype=np.uint8)
+    for index, name in enumerate(DISTRACTORS):
+        if name == entry.key:
+            continue
+        distractor = _load(name).image
+        x, y = 20 + index * 200, height - distractor.shape[0] - 10
+        frame[y:y + distractor.shape[0], x:x + distractor.shape[1]] = distractor
+    template_w, template_h = entry.size
+    scaled = cv2.resize(entry.image, (int(template_w * scale), int(template_h * scale)))
+    x, y = location
+    frame[y:y + scaled.shape[0], x:x + scaled.shape[1]] = scaled
+    return frame
+
+
+def _multi_scale(frame, entry, pyramid):
+    return TemplateHelper.multi_scale_template_match(
+        frame, entry.image, config.SCALE_RANGE, config.SCALE_STEP, template_entry=entry, pyramid=pyramid
+    )
+
+
+@pytest.mark.parametrize('name', ['return_speed_template', 'flex_tune_template', 'transpose_template',
+                                  'soundshifter_pitch_template', 'reverb_template', 'bypass_on_template'])
+@pytest.mark.parametrize('scale, location', [(0.8, (610, 40)), (1.0, (130, 210)), (1.15, (7, 5)),
+                                             (1.32, (480, 300))])
+def test_pyramid_matches_full_resolution(name, scale, location):
+    entry = _load(name)
+    frame = _frame(entry, scale, location, seed=int(scale * 100))
+    assert TemplateHelper._should_use_pyramid(frame, True)
+
+    pyramid = _multi_scale(frame, entry, pyramid=True)
+    full = _multi_scale(frame, entry, pyramid=False)
+
+    assert full[1] is not None and pyramid[1] is not None
+    assert abs(pyramid[1][0] - full[1][0]) <= 1
+    assert abs(pyramid[1][1] - full[1][1]) <= 1
+    assert pyramid[0] == pytest.approx(full[0], abs=CONFIDENCE_TOLERANCE)
+    assert (pyramid[2], pyramid[3]) == (full[2], full[3])  # cùng scale, cùng template_size
+    assert full[0] >= config.TEMPLATE_MATCH_THRESHOLD
+
+
+def test_pyramid_engages_for_downsampled_candidates():
+    """pyramid_template_match thật sự trả về kết quả coarse-to-fine (không rơi về sweep full resolution)."""
+    entry = _load('return_speed_template')
+    frame = _frame(entry, 1.0, (300, 200))
+    confidence, location = TemplateHelper.pyramid_template_match(frame, entry.image)
+    assert location == (300, 200)
+    assert confidence == pytest.approx(1.0, abs=1e-3)
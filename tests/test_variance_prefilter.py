@@ -0,0 +1,154 @@
+"""
+Variance prefilter phải cho cùng kết quả với correlation toàn frame trên frame tổng hợp
+(cùng frame, cùng template, chỉ bật/tắt VARIANCE_PREFILTER_ENABLED).
+"""
+import cv2
+import numpy as np
+import pytest
+
+import config
+from utils.frame_features import FrameFeatures
+from utils.helpers import TemplateHelper
+from utils.template_cache import CachedTemplate
+
+TEMPLATE_KEY = 'synthetic_prefilter_template'
+FRAME_SIZE = (640, 400)  # (w, h) - đủ lớn cho prefilter, nhỏ hơn ngưỡng pyramid
+BACKGROUND = 45
+CONFIDENCE_TOLERANCE = 1e-4
+
+
+@pytest.fixture(autouse=True)
+def prefilter_config(monkeypatch):
+    """Opt-in template tổng hợp vào prefilter, tắt các nhánh khác (pyramid, frame-side pyramid)."""
+    monkeypatch.setattr(config, 'VARIANCE_PREFILTER_TEMPLATES', {TEMPLATE_KEY: 0.5})
+    monkeypatch.setattr(config, 'PYRAMID_SEARCH_ENABLED', False)
+    FrameFeatures.invalidate()
+    yield
+    FrameFeatures.invalidate()
+
+
+def _knob(label, size=(64, 40), seed=0):
+    """Template kiểu knob của plugin: vòng tròn + vạch chỉ + chữ, nền hơi nhiễu."""
+    width, height = size
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width), BACKGROUND, dtype=np.uint8)
+    image += rng.integers(0, 4, size=image.shape, dtype=np.uint8)
+    cv2.circle(image, (16, height // 2), 12, 200, 2)
+    cv2.line(image, (16, height // 2), (22, height // 2 - 9), 230, 2)
+    cv2.putText(image, label, (32, height // 2 + 5), cv2.FONT_HERSHEY_SIMPLEX, 0.4, 220, 1)
+    return image
+
+
+def _flat_button(size=(60, 24)):
+    """Template phần lớn là vùng phẳng (nút bấm chỉ có viền mảnh và một vạch)."""
+    width, height = size
+    image = np.full((height, width), 70, dtype=np.uint8)
+    cv2.rectangle(image, (0, 0), (width - 1, height - 1), 110, 1)
+    cv2.line(image, (8, height // 2), (20, height // 2), 120, 1)
+    return image
+
+
+def _template_entry(image):
+    return CachedTemplate(f'/tmp/{TEMPLATE_KEY}.png', None, image)
+
+
+def _frame(template, location, seed=0, distractors=True, background_noise=0):
+    """Frame nền phẳng (plugin UI tối) có template ở `location` và vài control gây nhiễu."""
+    width, height = FRAME_SIZE
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width), BACKGROUND, dtype=np.uint8)
+    if background_noise:
+        frame += rng.integers(0, background_noise + 1, size=frame.shape, dtype=np.uint8)
+    if distractors:
+        for index, (x, y) in enumerate([(40, 300), (420, 60), (500, 300)]):
+            knob = _knob(f'D{index}', seed=seed + index + 1)
+            frame[y:y + knob.shape[0], x:x + knob.shape[1]] = knob
+    x, y = location
+    frame[y:y + template.shape[0], x:x + template.shape[1]] = template
+    return frame
+
+
+def _run_standard(monkeypatch, frame, entry, enabled):
+    monkeypatch.setattr(config, 'VARIANCE_PREFILTER_ENABLED', enabled)
+    features = FrameFeatures.for_frame(frame, frame_pyramid=False)
+    return TemplateHelper._run_strategy('Standard', frame, entry.image, entry, features)
+
+
+def _run_single_scale(monkeypatch, frame, entry, scale, enabled):
+    monkeypatch.setattr(config, 'VARIANCE_PREFILTER_ENABLED', enabled)
+    features = FrameFeatures.for_frame(frame, frame_pyramid=False)
+    return TemplateHelper._match_single_scale(frame, entry.image, scale, entry, frame_features=features)
+
+
+def _assert_prefilter_engaged(frame, template):
+    """Prefilter thật sự chạy (không rơi về match toàn frame vì vùng còn lại quá lớn)."""
+    features = FrameFeatures.for_frame(frame, frame_pyramid=False)
+    assert TemplateHelper.variance_prefiltered_match(features, template, None, 0.5) is not None
+
+
+def _assert_same_match(filtered, unfiltered):
+    filtered_confidence, filtered_location = filtered
+    unfiltered_confidence, unfiltered_location = unfiltered
+    assert abs(filtered_location[0] - unfiltered_location[0]) <= 1
+    assert abs(filtered_location[1] - unfiltered_location[1]) <= 1
+    assert filtered_confidence == pytest.approx(unfiltered_confidence, abs=CONFIDENCE_TOLERANCE)
+
+
+@pytest.mark.parametrize('seed, location', [(0, (120, 80)), (1, (300, 220)), (2, (7, 5)), (3, (570, 355))])
+def test_standard_strategy_matches_unfiltered(monkeypatch, seed, location):
+    template = _knob('VIB', seed=seed)
+    entry = _template_entry(template)
+    frame = _frame(template, location, seed=seed)
+    _assert_prefilter_engaged(frame, template)
+
+    filtered = _run_standard(monkeypatch, frame, entry, enabled=True)
+    unfiltered = _run_standard(monkeypatch, frame, entry, enabled=False)
+
+    _assert_same_match((filtered.confidence, filtered.location), (unfiltered.confidence, unfiltered.location))
+    assert unfiltered.location == location
+    assert filtered.confidence >= config.TEMPLATE_MATCH_THRESHOLD
+
+
+@pytest.mark.parametrize('scale', [0.8, 1.0, 1.2])
+def test_single_scale_matches_unfiltered(monkeypatch, scale):
+    base = _knob('HUM', seed=4)
+    entry = _template_entry(base)
+    scaled = cv2.resize(base, (int(base.shape[1] * scale), int(base.shape[0] * scale)))
+    frame = _frame(scaled, (250, 150), seed=4)
+    _assert_prefilter_engaged(frame, entry.get_scaled(scale))
+
+    filtered = _run_single_scale(monkeypatch, frame, entry, scale, enabled=True)
+    unfiltered = _run_single_scale(monkeypatch, frame, entry, scale, enabled=False)
+
+    assert filtered[2:] == unfiltered[2:]  # cùng scale, cùng template_size
+    _assert_same_match(filtered[:2], unfiltered[:2])
+
+
+def test_low_variance_template_on_flat_region(monkeypatch):
+    """Template phần lớn phẳng đặt giữa vùng nền phẳng có nhiễu nhẹ: kết quả vẫn giống match toàn frame."""
+    template = _flat_button()
+    entry = _template_entry(template)
+    frame = _frame(template, (330, 170), seed=5, background_noise=2)
+    _assert_prefilter_engaged(frame, template)
+
+    filtered = _run_standard(monkeypatch, frame, entry, enabled=True)
+    unfiltered = _run_standard(monkeypatch, frame, entry, enabled=False)
+
+    _assert_same_match((filtered.confidence, filtered.location), (unfiltered.confidence, unfiltered.location))
+    assert unfiltered.location == (330, 170)
+
+
+def test_flat_frame_is_not_a_match_either_way(monkeypatch):
+    """Frame toàn nền phẳng (không có template): cả hai cách đều không nhận là tìm thấy."""
+    template = _knob('FLX', seed=6)
+    entry = _template_entry(template)
+    width, height = FRAME_SIZE
+    frame = np.full((height, width), BACKGROUND, dtype=np.uint8)
+    frame += np.random.default_rng(6).integers(0, 3, size=frame.shape, dtype=np.uint8)
+
+    filtered = _run_standard(monkeypatch, frame, entry, enabled=True)
+    unfiltered = _run_standard(monkeypatch, frame, entry, enabled=False)
+
+    assert filtered.location is None
+    assert filtered.confidence < config.TEMPLATE_MATCH_THRESHOLD
+    assert unfiltered.confidence < config.TEMPLATE_MATCH_THRESHOLD
@@ -0,0 +1,82 @@
+"""
+Frame buffer pool - buffer NumPy dùng lại giữa các lần chụp/convert cùng kích thước.
+Vòng auto-detect chụp cửa sổ AUTO-KEY liên tục hàng giờ: thay vì cấp phát mảng RGB/gray mới
+mỗi lần, capture và OCR ghi thẳng vào buffer của pool (cv2.cvtColor(..., dst=buffer), np.copyto).
+
+Buffer là của riêng từng thread và chỉ có một buffer cho mỗi tag: frame lấy từ pool chỉ hợp lệ
+đến lần lấy tiếp theo cùng tag trên cùng thread (không được giữ lại lâu hơn).
+"""
+import threading
+
+import numpy as np
+
+import config
+
+
+class FrameBufferPool:
+    """Buffer dùng lại theo (tag, shape, dtype) cho từng thread."""
+
+    _local = threading.local()  # buffers: tag -> ndarray của thread này
+    _lock = threading.Lock()
+    _stats = {'reuses': 0, 'allocations': 0}
+
+    @staticmethod
+    def get(tag, shape, dtype=np.uint8):
+        """
+        Lấy buffer cho tag (cùng shape/dtype với lần trước thì dùng lại, khác thì cấp phát mới
+        và bỏ buffer cũ của tag - mỗi tag giữ tối đa một buffer).
+
+        Args:
+            tag: Tên buffer ('capture_gray', 'ocr_crop', ...)
+            shape: Shape của buffer
+            dtype: Kiểu dữ liệu
+
+        Returns:
+            numpy array C-contiguous (nội dung chưa khởi tạo)
+        """
+        shape = tuple(int(size) for size in shape)
+        if not config.FRAME_BUFFER_POOL_ENABLED:
+            return np.empty(shape, dtype=dtype)
+
+        buffers = getattr(FrameBufferPool._local, 'buffers', None)
+        if buffers is None:
+            buffers = FrameBufferPool._local.buffers = {}
+
+        buffer = buffers.get(tag)
+        if buffer is not None and buffer.shape == shape and buffer.dtype == dtype:
+            FrameBufferPool._count('reuses')
+            return buffer
+
+        buffer = np.empty(shape, dtype=dtype)
+        buffers[tag] = buffer
+        FrameBufferPool._count('allocations')
+        return buffer
+
+    @staticmethod
+    def copy(tag, array):
+        """Copy array vào buffer của tag (ví dụ để có vùng crop liền bộ nhớ cho OCR)."""
+        buffer = FrameBufferPool.get(tag, array.shape, array.dtype)
+        np.copyto(buffer, array)
+        return buffer
+
+    @staticmethod
+    def clear():
+        """Bỏ mọi buffer của thread hiện tại."""
+        FrameBufferPool._local.buffers = {}
+
+    @staticmethod
+    def _count(name):
+        with FrameBufferPool._lock:
+            FrameBufferPool._stats[name] += 1
+
+    @staticmethod
+    def get_stats():
+        """Thống kê số lần dùng lại / cấp phát buffer."""
+        with FrameBufferPool._lock:
+            stats = dict(FrameBufferPool._stats)
+        total = stats['reuses'] + stats['allocations']
+        stats['reuse_rate'] = stats['reuses'] / total if total else 0.0
+        stats['thread_bytes'] = sum(
+            buffer.nbytes for buffer in getattr(FrameBufferPool._local, 'buffers', {}).values()
+        )
+        return stats
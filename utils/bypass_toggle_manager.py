@@ -225,7 +225,10 @@ class BypassToggleManager:
             self.update_bypass_ui(toggle_id, True)
     
     def initialize_all_toggles(self):
-        """Khởi tạo tất cả toggle states."""
-        for toggle_id in self.toggles:
-            if self.toggles[toggle_id]['detector'] is not None:
-                self.initialize_toggle_state(toggle_id)
\ No newline at end of file
+        """Khởi tạo tất cả toggle states (các detector cùng cửa sổ plugin dùng chung một frame)."""
+        from utils.frame_cache import FrameCache
+        
+        with FrameCache.session():
+            for toggle_id in self.toggles:
+                if self.toggles[toggle_id]['detector'] is not None:
+                    self.initialize_toggle_state(toggle_id)
\ No newline at end of file
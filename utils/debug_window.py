@@ -83,7 +83,19 @@ class DebugWindow:
                 fg_color="#4CAF50",
                 hover_color="#45A049"
             )
-            export_btn.pack(side="left")
+            export_btn.pack(side="left", padx=(0, 10))
+            
+            # Match stats button
+            match_stats_btn = CTK.CTkButton(
+                controls_frame,
+                text="Match Stats",
+                command=self._show_match_stats,
+                width=100,
+                height=30,
+                fg_color="#2196F3",
+                hover_color="#1976D2"
+            )
+            match_stats_btn.pack(side="left")
             
             # Stats label
             self.stats_label = CTK.CTkLabel(
@@ -230,6 +242,13 @@ class DebugWindow:
         except Exception as e:
             print(f"❌ Error exporting logs: {e}")
     
+    def _show_match_stats(self):
+        """Ghi thống kê template matching (strategy thắng, latency, scale) vào log."""
+        from utils.match_telemetry import MatchTelemetry
+        
+        for line in MatchTelemetry.format_report():
+            self.add_log(line, "DEBUG")
+    
     def _update_stats(self):
         """Cập nhật statistics."""
         if self.stats_label:
@@ -0,0 +1,127 @@
+"""
+Frame cache theo thao tác - trong một session (một thao tác hoặc batch), mọi detector chụp
+cùng một cửa sổ plugin dùng chung một frame thay vì chụp lại.
+Frame bị bỏ ngay khi có input (click/phím) hoặc quá FRAME_CACHE_MAX_AGE giây.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+
+class FrameCache:
+    """
+    Cache frame key theo (hwnd, x, y, w, h) của cửa sổ, chỉ có hiệu lực trong FrameCache.session()
+    của thread hiện tại.
+    """
+
+    _local = threading.local()  # depth, frames, generation của session trên thread này
+    _generation = 0  # Tăng mỗi lần invalidate() (input từ MouseHelper)
+    _lock = threading.Lock()
+    _stats = {'hits': 0, 'misses': 0, 'input_invalidations': 0}
+
+    @staticmethod
+    @contextmanager
+    def session():
+        """
+        Phạm vi dùng chung frame (lồng nhau được, frame bị bỏ khi session ngoài cùng kết thúc).
+
+        Ví dụ:
+            with FrameCache.session():
+                detector_a._find_template_match(plugin_win)
+                detector_b._find_template_match(plugin_win)  # Không chụp lại
+        """
+        local = FrameCache._local
+        local.depth = getattr(local, 'depth', 0) + 1
+        if local.depth == 1:
+            local.frames = {}
+        try:
+            yield
+        finally:
+            local.depth -= 1
+            if local.depth == 0:
+                local.frames = {}
+
+    @staticmethod
+    def active():
+        """Thread hiện tại có đang trong session không."""
+        return config.FRAME_CACHE_ENABLED and getattr(FrameCache._local, 'depth', 0) > 0
+
+    @staticmethod
+    def _key(plugin_win, region):
+        hwnd = getattr(plugin_win, '_hWnd', None) or id(plugin_win)
+        return (hwnd,) + tuple(region)
+
+    @staticmethod
+    def _input_marker():
+        """
+        Mốc input hiện tại: (số lần invalidate, tick của input gần nhất trên hệ thống).
+        GetLastInputInfo đổi với mọi input kể cả input giả lập bởi pyautogui.
+        """
+        try:
+            import win32api
+            last_input = win32api.GetLastInputInfo()
+        except (ImportError, AttributeError, OSError):
+            last_input = None
+        return FrameCache._generation, last_input
+
+    @staticmethod
+    def get(plugin_win, region, need_rgb=True):
+        """
+        Lấy frame đã chụp của cửa sổ trong session hiện tại.
+
+        Args:
+            plugin_win: Window object (pygetwindow)
+            region: (x, y, w, h) của cửa sổ lúc chụp
+            need_rgb: Cần cả bản RGB (frame chụp gray-only không dùng được)
+
+        Returns:
+            tuple (screenshot_np, screenshot_gray) hoặc None nếu không có frame hợp lệ
+        """
+        if not FrameCache.active():
+            return None
+        frames = FrameCache._local.frames
+        key = FrameCache._key(plugin_win, region)
+        entry = frames.get(key)
+        if entry is not None:
+            marker, captured_at, screenshot_np, screenshot_gray = entry
+            if marker != FrameCache._input_marker():
+                del frames[key]
+                FrameCache._count('input_invalidations')
+            elif time.perf_counter() - captured_at > config.FRAME_CACHE_MAX_AGE:
+                del frames[key]
+            elif screenshot_np is not None or not need_rgb:
+                FrameCache._count('hits')
+                return screenshot_np, screenshot_gray
+        FrameCache._count('misses')
+        return None
+
+    @staticmethod
+    def put(plugin_win, region, screenshot_np, screenshot_gray):
+        """Lưu frame vừa chụp (chỉ khi đang trong session)."""
+        if not FrameCache.active():
+            return
+        FrameCache._local.frames[FrameCache._key(plugin_win, region)] = (
+            FrameCache._input_marker(), time.perf_counter(), screenshot_np, screenshot_gray
+        )
+
+    @staticmethod
+    def invalidate():
+        """Bỏ mọi frame đã cache (gọi sau mỗi thao tác click/nhập phím)."""
+        with FrameCache._lock:
+            FrameCache._generation += 1
+
+    @staticmethod
+    def _count(name):
+        with FrameCache._lock:
+            FrameCache._stats[name] += 1
+
+    @staticmethod
+    def get_stats():
+        """Thống kê hit/miss của frame cache."""
+        with FrameCache._lock:
+            stats = dict(FrameCache._stats)
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / total if total else 0.0
+        return stats
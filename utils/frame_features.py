@@ -0,0 +1,121 @@
+"""
+Frame features - các đặc trưng tính từ một screenshot grayscale,
+dùng chung khi match nhiều template trên cùng một frame.
+Features của frame vừa chụp được giữ lại (FrameFeatures.for_frame) cho đến lần chụp tiếp theo.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+import config
+
+
+class FrameFeatures:
+    """Edge map, integral images và các bản resize của một frame, tính lazy và chỉ một lần."""
+
+    _current = None  # FrameFeatures của frame chụp gần nhất
+    _lock = threading.Lock()
+
+    def __init__(self, screenshot_gray, frame_pyramid=False):
+        """
+        Args:
+            screenshot_gray: Screenshot grayscale
+            frame_pyramid: True = multi-scale matching resize frame (dùng chung cho mọi template)
+                thay vì resize từng template theo từng scale
+        """
+        self.gray = screenshot_gray
+        self.frame_pyramid = frame_pyramid
+        self._edges = None
+        self._integrals = None
+        self._window_variance = {}
+        self._resized = {}
+
+    @property
+    def edges(self):
+        """Canny edge map của frame (cùng tham số với Edge-Based matching)."""
+        if self._edges is None:
+            self._edges = cv2.Canny(self.gray, 50, 150)
+        return self._edges
+
+    @property
+    def integrals(self):
+        """(sum, sqsum) integral images của frame (float64, tính một lần)."""
+        if self._integrals is None:
+            self._integrals = cv2.integral2(self.gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        return self._integrals
+
+    def get_window_variance(self, width, height):
+        """
+        Phương sai cường độ của mọi cửa sổ width x height trong frame (từ integral images),
+        cùng kích thước với kết quả cv2.matchTemplate của template width x height. Cache theo kích thước.
+        """
+        key = (int(width), int(height))
+        variance = self._window_variance.get(key)
+        if variance is None:
+            width, height = key
+            total, squared = self.integrals
+
+            def window_mean(integral):
+                result = integral[height:, width:] - integral[:-height, width:]
+                result -= integral[height:, :-width]
+                result += integral[:-height, :-width]
+                result *= 1.0 / (width * height)
+                return result
+
+            mean = window_mean(total)
+            variance = window_mean(squared)
+            mean *= mean
+            variance -= mean
+            np.maximum(variance, 0.0, out=variance)
+            self._window_variance[key] = variance
+        return variance
+
+    def get_resized(self, factor):
+        """Frame resize theo factor (INTER_AREA khi thu nhỏ, INTER_LINEAR khi phóng to), cache theo factor."""
+        factor_key = round(float(factor), 3)
+        if factor_key == 1.0:
+            return self.gray
+        resized = self._resized.get(factor_key)
+        if resized is None:
+            interpolation = cv2.INTER_AREA if factor_key < 1.0 else cv2.INTER_LINEAR
+            resized = cv2.resize(self.gray, None, fx=factor_key, fy=factor_key,
+                                 interpolation=interpolation)
+            self._resized[factor_key] = resized
+        return resized
+
+    def get_downsampled(self, factor):
+        """Frame thu nhỏ theo factor (INTER_AREA), cache theo factor."""
+        return self.get_resized(factor)
+
+    @staticmethod
+    def for_frame(screenshot_gray, frame_pyramid=None):
+        """
+        Lấy FrameFeatures của frame, dùng lại nếu đúng frame (cùng object) đã tính trước đó.
+
+        Args:
+            screenshot_gray: Screenshot grayscale
+            frame_pyramid: True/False để đặt chế độ frame-side pyramid, None = giữ nguyên
+
+        Returns:
+            FrameFeatures
+        """
+        with FrameFeatures._lock:
+            features = FrameFeatures._current
+            if features is None or features.gray is not screenshot_gray:
+                features = FrameFeatures(screenshot_gray)
+                FrameFeatures._current = features
+        if frame_pyramid is not None:
+            features.frame_pyramid = frame_pyramid
+        return features
+
+    @staticmethod
+    def invalidate():
+        """Bỏ features của frame cũ (gọi mỗi khi chụp frame mới)."""
+        with FrameFeatures._lock:
+            FrameFeatures._current = None
+
+    @staticmethod
+    def use_frame_pyramid(template_count):
+        """Có nên bật frame-side pyramid khi match `template_count` template trên một frame."""
+        return config.FRAME_PYRAMID_ENABLED and template_count >= config.FRAME_PYRAMID_MIN_TEMPLATES
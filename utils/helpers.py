@@ -5,6 +5,8 @@ from PIL import ImageDraw
 import tkinter as tk
 from tkinter import messagebox
 import config
+from utils.match_result import MatchResult
+from utils.ocr_result import OCRResult
 
 class OCRHelper:
     """Helper class cho các thao tác OCR."""
@@ -18,15 +20,21 @@ class OCRHelper:
     
     @staticmethod
     def extract_text_data(image):
-        """Trích xuất text từ image."""
-        return pytesseract.image_to_data(
+        """
+        Trích xuất text từ image (OCRResult dạng cột).
+        
+        Args:
+            image: PIL image hoặc numpy array RGB/grayscale (có thể là view vào frame đã chụp)
+        """
+        import numpy as np
+        
+        if isinstance(image, np.ndarray):
+            from PIL import Image
+            # View cắt từ frame không liền bộ nhớ -> copy đúng một lần khi đưa sang PIL
+            image = Image.fromarray(np.ascontiguousarray(image))
+        return OCRResult.from_tesseract(pytesseract.image_to_data(
             image, output_type=Output.DICT, config=config.OCR_CONFIG
-        )
-    
-    @staticmethod
-    def get_text_words(ocr_data):
-        """Lấy danh sách từ từ OCR data."""
-        return [w.strip() for w in ocr_data["text"] if w.strip()]
+        ))
     
     @staticmethod
     def extract_text_data_from_image(image_array):
@@ -47,7 +55,7 @@ class OCRHelper:
             config='--psm 6'  # Assume uniform block of text
         )
         
-        return ocr_data
+        return OCRResult.from_tesseract(ocr_data)
 
 class ImageHelper:
     """Helper class cho các thao tác với hình ảnh."""
@@ -65,32 +73,27 @@ class ImageHelper:
         except:
             font = ImageFont.load_default()
         
-        for i, txt in enumerate(ocr_data["text"]):
-            if txt and txt.strip():
-                x, y, w, h = (
-                    ocr_data["left"][i], 
-                    ocr_data["top"][i], 
-                    ocr_data["width"][i], 
-                    ocr_data["height"][i]
-                )
-                
-                # Different colors for different text types
-                text_lower = txt.strip().lower()
-                if any(keyword in text_lower for keyword in ["major", "minor"]):
-                    color = "lime"  # Green cho tone buttons
-                elif "send" in text_lower:
-                    color = "cyan"  # Cyan cho send button
-                elif "auto-key" in text_lower:
-                    color = "yellow"  # Yellow cho plugin name
-                else:
-                    color = "red"    # Red cho text khác
-                
-                # Draw rectangle
-                draw.rectangle([x, y, x + w, y + h], outline=color, width=2)
-                
-                # Add text label
-                label_pos = (x, max(0, y - 15))
-                draw.text(label_pos, txt.strip(), fill=color, font=font)
+        for i in ocr_data.indices(ocr_data.non_empty()):
+            txt = str(ocr_data.stripped[i])
+            x, y, w, h = ocr_data.box(i)
+            
+            # Different colors for different text types
+            text_lower = txt.lower()
+            if any(keyword in text_lower for keyword in ["major", "minor"]):
+                color = "lime"  # Green cho tone buttons
+            elif "send" in text_lower:
+                color = "cyan"  # Cyan cho send button
+            elif "auto-key" in text_lower:
+                color = "yellow"  # Yellow cho plugin name
+            else:
+                color = "red"    # Red cho text khác
+            
+            # Draw rectangle
+            draw.rectangle([x, y, x + w, y + h], outline=color, width=2)
+            
+            # Add text label
+            label_pos = (x, max(0, y - 15))
+            draw.text(label_pos, txt, fill=color, font=font)
         
         path = os.path.join(config.RESULT_DIR, filename)
         pil_img.save(path)
@@ -297,105 +300,1143 @@ class TemplateHelper:
     """Helper class cho multi-scale template matching."""
     
     @staticmethod
-    def multi_scale_template_match(screenshot_gray, template, scale_range=(0.6, 1.4), scale_step=0.1):
-        """Thực hiện multi-scale template matching để handle plugin resize."""
+    def load_template(template_path):
+        """Lấy template đã cache (decode một lần cho cả process)."""
+        from utils.template_cache import TemplateCache
+        return TemplateCache.get(template_path)
+    
+    @staticmethod
+    def match_template(image, template, mask=None):
+        """
+        cv2.matchTemplate (TM_CCOEFF_NORMED) với mask tùy chọn.
+        Với mask, vùng ảnh phẳng có thể cho NaN/inf -> đưa về -1 để minMaxLoc bỏ qua.
+        Masked matchTemplate chậm hơn nhiều nên chỉ dùng ở bước xác nhận trên vùng nhỏ
+        (ROI, score_at, _confirm_masked), các sweep toàn frame luôn chạy không mask.
+        
+        Args:
+            mask: uint8 cùng kích thước template (0 = bỏ qua pixel), None = không mask
+        """
         import cv2
         import numpy as np
+        
+        if mask is None:
+            return cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+        result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED, mask=mask)
+        return np.nan_to_num(result, copy=False, nan=-1.0, posinf=-1.0, neginf=-1.0)
+    
+    @staticmethod
+    def _should_use_pyramid(screenshot_gray, pyramid):
+        """Quyết định có dùng pyramid search cho screenshot này không."""
         import config
         
-        best_confidence = 0
+        if pyramid is None:
+            pyramid = config.PYRAMID_SEARCH_ENABLED
+        if not pyramid:
+            return False
+        frame_h, frame_w = screenshot_gray.shape[:2]
+        return frame_w * frame_h >= config.PYRAMID_MIN_FRAME_PIXELS
+    
+    @staticmethod
+    def _top_peaks(result, count, min_distance):
+        """Lấy tối đa `count` đỉnh cao nhất trong correlation map (suppress lân cận)."""
+        import cv2
+        
+        result = result.copy()
+        peaks = []
+        for _ in range(count):
+            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            if peaks and max_val <= -1.0:
+                break
+            peaks.append(max_loc)
+            px, py = max_loc
+            result[max(0, py - min_distance):py + min_distance + 1,
+                   max(0, px - min_distance):px + min_distance + 1] = -1.0
+        return peaks
+    
+    @staticmethod
+    def pyramid_template_match(screenshot_gray, template, small_gray=None, factor=None, mask=None):
+        """
+        Coarse-to-fine matching: tìm ứng viên trên screenshot thu nhỏ,
+        sau đó chỉ refine các cửa sổ nhỏ quanh đỉnh ở full resolution.
+        
+        Args:
+            screenshot_gray: Screenshot grayscale full resolution
+            template: Template (đã scale) grayscale
+            small_gray: Screenshot đã thu nhỏ theo `factor` (tính sẵn để dùng lại)
+            factor: Tỉ lệ thu nhỏ (mặc định config.PYRAMID_DOWNSAMPLE)
+            mask: Mask của template (cùng kích thước), None = không mask
+            
+        Returns:
+            tuple: (confidence, location) - None nếu template quá nhỏ cho pyramid
+        """
+        import cv2
+        import config
+        
+        factor = factor or config.PYRAMID_DOWNSAMPLE
+        template_h, template_w = template.shape[:2]
+        small_w = int(template_w * factor)
+        small_h = int(template_h * factor)
+        if small_w < config.PYRAMID_MIN_TEMPLATE_SIZE or small_h < config.PYRAMID_MIN_TEMPLATE_SIZE:
+            return None
+        
+        if small_gray is None:
+            small_gray = cv2.resize(screenshot_gray, None, fx=factor, fy=factor,
+                                    interpolation=cv2.INTER_AREA)
+        if small_w > small_gray.shape[1] or small_h > small_gray.shape[0]:
+            return None
+        
+        # Coarse pass
+        small_template = cv2.resize(template, (small_w, small_h), interpolation=cv2.INTER_AREA)
+        small_mask = None
+        if mask is not None:
+            small_mask = cv2.resize(mask, (small_w, small_h), interpolation=cv2.INTER_NEAREST)
+        coarse = TemplateHelper.match_template(small_gray, small_template, small_mask)
+        peaks = TemplateHelper._top_peaks(
+            coarse, config.PYRAMID_TOP_PEAKS, max(1, min(small_w, small_h) // 2)
+        )
+        
+        # Fine pass quanh từng đỉnh
+        frame_h, frame_w = screenshot_gray.shape[:2]
+        margin = config.PYRAMID_REFINE_MARGIN + int(round(1.0 / factor))
+        best_confidence = -1.0
         best_location = None
-        best_scale = 1.0
-        best_template_size = None
+        for peak_x, peak_y in peaks:
+            center_x = int(round(peak_x / factor))
+            center_y = int(round(peak_y / factor))
+            x0 = max(0, center_x - margin)
+            y0 = max(0, center_y - margin)
+            x1 = min(frame_w, center_x + margin + template_w)
+            y1 = min(frame_h, center_y + margin + template_h)
+            if x1 - x0 < template_w or y1 - y0 < template_h:
+                continue
+            
+            window = screenshot_gray[y0:y1, x0:x1]
+            result = TemplateHelper.match_template(window, template, mask)
+            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            if max_val > best_confidence:
+                best_confidence = max_val
+                best_location = (x0 + max_loc[0], y0 + max_loc[1])
+        
+        if best_location is None:
+            return None
+        return best_confidence, best_location
+    
+    @staticmethod
+    def _downsample_for_pyramid(screenshot_gray, pyramid, frame_features=None):
+        """Screenshot thu nhỏ cho pyramid search, None nếu không dùng pyramid."""
+        import cv2
+        import config
+        
+        if not TemplateHelper._should_use_pyramid(screenshot_gray, pyramid):
+            return None
+        factor = config.PYRAMID_DOWNSAMPLE
+        if frame_features is not None:
+            return frame_features.get_downsampled(factor)
+        return cv2.resize(screenshot_gray, None, fx=factor, fy=factor,
+                          interpolation=cv2.INTER_AREA)
+    
+    @staticmethod
+    def _prefilter_ratio(screenshot_gray, template_entry, frame_features):
+        """
+        Tỉ lệ độ lệch chuẩn tối thiểu của variance prefilter cho template,
+        None nếu không dùng prefilter (template chưa opt-in, frame nhỏ hoặc không phải frame của FrameFeatures).
+        """
+        import config
+        
+        if not config.VARIANCE_PREFILTER_ENABLED or template_entry is None or frame_features is None:
+            return None
+        if frame_features.gray is not screenshot_gray:
+            return None
+        frame_h, frame_w = screenshot_gray.shape[:2]
+        if frame_w * frame_h < config.VARIANCE_PREFILTER_MIN_FRAME_PIXELS:
+            return None
+        return config.VARIANCE_PREFILTER_TEMPLATES.get(template_entry.key)
+    
+    @staticmethod
+    def variance_prefiltered_match(frame_features, template, mask, min_std_ratio):
+        """
+        Correlation chỉ trên các vùng có thể chứa template: cửa sổ có độ lệch chuẩn
+        < min_std_ratio * độ lệch chuẩn template (nền phẳng) bị loại bằng integral images của frame,
+        các ô VARIANCE_PREFILTER_TILE còn lại được gom thành vùng liên thông rồi mới matchTemplate.
         
-        # Generate scale factors
-        scales = np.arange(scale_range[0], scale_range[1] + scale_step, scale_step)
+        Args:
+            frame_features: FrameFeatures của frame (integral images tính một lần cho mọi template)
+            template: Template (đã scale) grayscale
+            mask: Mask của template (cùng kích thước), None = không mask
+            min_std_ratio: Tỉ lệ trong config.VARIANCE_PREFILTER_TEMPLATES
+            
+        Returns:
+            tuple: (confidence, location) - location None nếu mọi vùng bị loại;
+            None nếu prefilter không có lợi (vùng còn lại quá lớn) -> match toàn frame
+        """
+        import cv2
+        import numpy as np
+        import config
         
-        for scale in scales:
-            # Resize template
+        frame = frame_features.gray
+        template_h, template_w = template.shape[:2]
+        if template_w > frame.shape[1] or template_h > frame.shape[0]:
+            return None
+        
+        template_std = cv2.meanStdDev(template, mask=mask)[1][0][0]
+        window_variance = frame_features.get_window_variance(template_w, template_h)
+        survivors = window_variance >= (min_std_ratio * template_std) ** 2
+        
+        # Gom theo ô: ô còn lại nếu có ít nhất một vị trí còn lại
+        tile = config.VARIANCE_PREFILTER_TILE
+        result_h, result_w = survivors.shape
+        tiles_y = -(-result_h // tile)
+        tiles_x = -(-result_w // tile)
+        padded = np.zeros((tiles_y * tile, tiles_x * tile), dtype=bool)
+        padded[:result_h, :result_w] = survivors
+        tile_mask = padded.reshape(tiles_y, tile, tiles_x, tile).any(axis=(1, 3)).astype(np.uint8)
+        
+        count, labels, stats, centroids = cv2.connectedComponentsWithStats(tile_mask, connectivity=8)
+        regions = []
+        covered = 0
+        for label in range(1, count):
+            tx, ty, tw, th = stats[label][:4]
+            x0, y0 = int(tx) * tile, int(ty) * tile
+            x1, y1 = min(result_w, int(tx + tw) * tile), min(result_h, int(ty + th) * tile)
+            regions.append((x0, y0, x1, y1))
+            covered += (x1 - x0) * (y1 - y0)
+        if covered > config.VARIANCE_PREFILTER_MAX_COVERAGE * result_w * result_h:
+            return None
+        
+        best_confidence = -1.0
+        best_location = None
+        for x0, y0, x1, y1 in regions:
+            result = TemplateHelper.match_template(
+                frame[y0:y1 + template_h - 1, x0:x1 + template_w - 1], template, mask
+            )
+            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            if max_val > best_confidence:
+                best_confidence = max_val
+                best_location = (x0 + max_loc[0], y0 + max_loc[1])
+        return best_confidence, best_location
+    
+    @staticmethod
+    def _scale_order(scale):
+        """Key sắp xếp scale: gần 1.0 trước, cách đều thì scale nhỏ trước."""
+        return round(abs(scale - 1.0), 3), scale
+    
+    @staticmethod
+    def scale_candidates(scale_range=None, scale_step=None, max_attempts=None):
+        """
+        Danh sách scale cho multi-scale matching, giới hạn bởi MAX_SCALE_ATTEMPTS.
+        Thứ tự cố định: gần 1.0 trước (cách đều thì scale nhỏ trước), nên sweep tuần tự
+        và sweep trên thread pool reduce cùng một danh sách, hòa thì giữ scale gần 1.0 hơn.
+        
+        Args:
+            max_attempts: Số scale tối đa (mặc định config.MAX_SCALE_ATTEMPTS, 0 = không giới hạn)
+        """
+        import config
+        from utils.template_cache import TemplateCache
+        
+        if max_attempts is None:
+            max_attempts = config.MAX_SCALE_ATTEMPTS
+        scales = sorted(TemplateCache.scale_values(scale_range, scale_step), key=TemplateHelper._scale_order)
+        if max_attempts:
+            scales = scales[:max_attempts]
+        return scales
+    
+    @staticmethod
+    def _match_single_scale(screenshot_gray, template, scale, template_entry=None, small_gray=None,
+                            frame_features=None):
+        """
+        Match template ở một scale.
+        
+        Returns:
+            tuple: (confidence, location, scale, template_size) hoặc None nếu bỏ qua scale này
+        """
+        import cv2
+        import config
+        
+        # Frame-side chỉ cho scale > 1: frame thu nhỏ (rẻ hơn) và dùng chung cho mọi template;
+        # scale < 1 thì thu nhỏ template vẫn rẻ hơn phóng to frame
+        if (frame_features is not None and frame_features.frame_pyramid and template_entry is not None
+                and scale > 1.0):
+            return TemplateHelper._match_single_scale_on_frame(
+                frame_features, template_entry, scale, use_pyramid=small_gray is not None
+            )
+        
+        # Resize template (dùng bản đã cache nếu có) - sweep không mask, mask chỉ dùng khi xác nhận
+        if template_entry is not None:
+            scaled_template = template_entry.get_scaled(scale)
+            if scaled_template is None:
+                return None
+            new_h, new_w = scaled_template.shape[:2]
+        else:
             template_h, template_w = template.shape[:2]
             new_w = int(template_w * scale)
             new_h = int(template_h * scale)
-            
-            if new_w < 10 or new_h < 10 or new_w > screenshot_gray.shape[1] or new_h > screenshot_gray.shape[0]:
-                continue
-            
+            if new_w < 10 or new_h < 10:
+                return None
+            scaled_template = None
+        
+        if new_w > screenshot_gray.shape[1] or new_h > screenshot_gray.shape[0]:
+            return None
+        
+        if scaled_template is None:
             scaled_template = cv2.resize(template, (new_w, new_h))
-            
-            # Template matching
-            result = cv2.matchTemplate(screenshot_gray, scaled_template, cv2.TM_CCOEFF_NORMED)
+        
+        # Template matching (coarse-to-fine nếu có thể)
+        pyramid_result = None
+        if small_gray is not None:
+            pyramid_result = TemplateHelper.pyramid_template_match(
+                screenshot_gray, scaled_template, small_gray=small_gray
+            )
+        prefilter_ratio = None
+        if pyramid_result is None:
+            prefilter_ratio = TemplateHelper._prefilter_ratio(screenshot_gray, template_entry, frame_features)
+        if pyramid_result is None and prefilter_ratio is not None:
+            pyramid_result = TemplateHelper.variance_prefiltered_match(
+                frame_features, scaled_template, None, prefilter_ratio
+            )
+            if pyramid_result is not None and pyramid_result[1] is None:
+                return None  # Mọi vùng đều phẳng -> bỏ qua scale này
+        if pyramid_result is not None:
+            max_val, max_loc = pyramid_result
+        else:
+            result = TemplateHelper.match_template(screenshot_gray, scaled_template)
             min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-            
-            # Boost confidence for scaled templates (they might be slightly less accurate)
-            if scale != 1.0:
-                max_val += config.SCALE_CONFIDENCE_BOOST
-            
+        
+        # Boost confidence for scaled templates (they might be slightly less accurate)
+        if scale != 1.0:
+            max_val += config.SCALE_CONFIDENCE_BOOST
+        
+        return max_val, max_loc, scale, (new_w, new_h)
+    
+    @staticmethod
+    def _match_single_scale_on_frame(frame_features, template_entry, scale, use_pyramid=False):
+        """
+        Frame-side pyramid: match template gốc (không resize) trên frame đã resize theo 1/scale,
+        rồi đổi tọa độ về frame gốc. Các bản resize của frame được cache trong FrameFeatures
+        nên dùng chung cho mọi template của cùng một lần chụp.
+        
+        Returns:
+            tuple: (confidence, location, scale, template_size) như _match_single_scale, hoặc None
+        """
+        import cv2
+        import config
+        
+        template = template_entry.image
+        template_w, template_h = template_entry.size
+        new_w = int(template_w * scale)
+        new_h = int(template_h * scale)
+        if new_w < 10 or new_h < 10:
+            return None
+        if new_w > frame_features.gray.shape[1] or new_h > frame_features.gray.shape[0]:
+            return None
+        
+        factor = 1.0 / scale
+        scaled_frame = frame_features.get_resized(factor)
+        if template_w > scaled_frame.shape[1] or template_h > scaled_frame.shape[0]:
+            return None
+        
+        pyramid_result = None
+        if use_pyramid:
+            pyramid_result = TemplateHelper.pyramid_template_match(
+                scaled_frame, template,
+                small_gray=frame_features.get_resized(factor * config.PYRAMID_DOWNSAMPLE)
+            )
+        if pyramid_result is not None:
+            max_val, max_loc = pyramid_result
+        else:
+            result = TemplateHelper.match_template(scaled_frame, template)
+            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        
+        if scale != 1.0:
+            max_val += config.SCALE_CONFIDENCE_BOOST
+        
+        location = (int(round(max_loc[0] * scale)), int(round(max_loc[1] * scale)))
+        return max_val, location, scale, (new_w, new_h)
+    
+    @staticmethod
+    def _evaluate_scales(screenshot_gray, template, scales, template_entry=None, small_gray=None,
+                         executor=None, frame_features=None):
+        """
+        Match template ở từng scale trong danh sách.
+        
+        Returns:
+            list kết quả của _match_single_scale theo đúng thứ tự `scales` (None nếu bỏ qua scale)
+        """
+        if executor is not None and len(scales) > 1:
+            return list(executor.map(
+                lambda scale: TemplateHelper._match_single_scale(
+                    screenshot_gray, template, scale, template_entry, small_gray, frame_features
+                ),
+                scales
+            ))
+        return [
+            TemplateHelper._match_single_scale(
+                screenshot_gray, template, scale, template_entry, small_gray, frame_features
+            )
+            for scale in scales
+        ]
+    
+    @staticmethod
+    def _best_match(matches):
+        """Reduce các kết quả theo thứ tự (hòa thì giữ kết quả đầu tiên)."""
+        best_confidence = 0
+        best_location = None
+        best_scale = 1.0
+        best_template_size = None
+        
+        for match in matches:
+            if match is None:
+                continue
+            max_val, max_loc, scale, template_size = match
             if max_val > best_confidence:
                 best_confidence = max_val
                 best_location = max_loc
                 best_scale = scale
-                best_template_size = (new_w, new_h)
+                best_template_size = template_size
         
         return best_confidence, best_location, best_scale, best_template_size
     
     @staticmethod
-    def adaptive_template_match(screenshot_gray, template):
-        """Adaptive template matching với fallback strategies."""
+    def _match_scales(screenshot_gray, template, scales, template_entry=None, small_gray=None,
+                      executor=None, frame_features=None):
+        """
+        Match template ở danh sách scale cho trước, trả về kết quả tốt nhất.
+        
+        Args:
+            executor: ThreadPoolExecutor để match các scale song song (None = tuần tự).
+                Kết quả luôn được reduce theo thứ tự `scales` nên giống hệt chế độ tuần tự.
+            frame_features: Nếu bật frame_pyramid thì resize frame thay vì resize template
+        """
+        return TemplateHelper._best_match(TemplateHelper._evaluate_scales(
+            screenshot_gray, template, scales, template_entry, small_gray, executor, frame_features
+        ))
+    
+    @staticmethod
+    def _parabola_vertex(points):
+        """
+        Đỉnh của parabol qua ba điểm (x, y), None nếu parabol không lõm (không có cực đại).
+        """
+        (x0, y0), (x1, y1), (x2, y2) = points
+        denominator = (x0 - x1) * (x0 - x2) * (x1 - x2)
+        if denominator == 0:
+            return None
+        a = (x2 * (y1 - y0) + x1 * (y0 - y2) + x0 * (y2 - y1)) / denominator
+        b = (x2 * x2 * (y0 - y1) + x1 * x1 * (y2 - y0) + x0 * x0 * (y1 - y2)) / denominator
+        if a >= 0:
+            return None
+        return -b / (2 * a)
+    
+    @staticmethod
+    def _refine_scale(screenshot_gray, template, matches, template_entry=None, iterations=None):
+        """
+        Nội suy parabol trên đường confidence theo scale quanh đỉnh của lưới thưa.
+        Chỉ refine scale thắng (đã đạt TEMPLATE_MATCH_THRESHOLD): mỗi lần nội suy là một lần match
+        ROI nhỏ quanh vị trí của scale thắng ở scale đỉnh parabol, không search lại toàn frame.
+        
+        Args:
+            matches: Kết quả của _evaluate_scales trên lưới thưa
+            iterations: Số lần nội suy (mặc định config.SCALE_REFINE_ITERATIONS)
+            
+        Returns:
+            tuple: (confidence, location, scale, template_size) tốt nhất sau khi nội suy
+        """
+        import config
+        
+        if iterations is None:
+            iterations = config.SCALE_REFINE_ITERATIONS
+        precision = config.SCALE_REFINE_PRECISION
+        
+        # Nội suy trên confidence gốc (bỏ SCALE_CONFIDENCE_BOOST để đường cong liên tục tại 1.0)
+        def raw_confidence(match):
+            return match[0] - (config.SCALE_CONFIDENCE_BOOST if match[2] != 1.0 else 0.0)
+        
+        evaluated = {match[2]: match for match in matches if match is not None}
+        for _ in range(iterations):
+            if len(evaluated) < 3:
+                break
+            best = TemplateHelper._best_match(
+                evaluated[scale] for scale in sorted(evaluated, key=TemplateHelper._scale_order)
+            )
+            if best[1] is None or best[0] < config.TEMPLATE_MATCH_THRESHOLD:
+                break
+            center = best[2]
+            lower = [scale for scale in evaluated if scale < center]
+            upper = [scale for scale in evaluated if scale > center]
+            if not lower or not upper:
+                break  # Đỉnh ở biên SCALE_RANGE
+            bracket = (max(lower), center, min(upper))
+            vertex = TemplateHelper._parabola_vertex(
+                [(scale, raw_confidence(evaluated[scale])) for scale in bracket]
+            )
+            if vertex is None:
+                break
+            vertex = min(max(vertex, bracket[0]), bracket[2])
+            scale = round(round(vertex / precision) * precision, 3)
+            if scale in evaluated:
+                break
+            roi_result = TemplateHelper.roi_template_match(
+                screenshot_gray, template, best[1], scale, template_entry=template_entry, masked=False
+            )
+            if roi_result is None:
+                break
+            evaluated[scale] = (roi_result.confidence, roi_result.location, scale, roi_result.template_size)
+        
+        return TemplateHelper._best_match(
+            evaluated[scale] for scale in sorted(evaluated, key=TemplateHelper._scale_order)
+        )
+    
+    @staticmethod
+    def multi_scale_template_match(screenshot_gray, template, scale_range=(0.6, 1.4), scale_step=0.1,
+                                   template_entry=None, pyramid=None, frame_features=None, parallel=None,
+                                   refine=None):
+        """
+        Thực hiện multi-scale template matching để handle plugin resize.
+        
+        Args:
+            pyramid: True/False để bật/tắt coarse-to-fine search,
+                None = theo config.PYRAMID_SEARCH_ENABLED
+            frame_features: FrameFeatures của screenshot (dùng chung bản thu nhỏ; nếu bật
+                frame_pyramid thì dùng chung cả các bản resize theo scale)
+            parallel: True/False để match các scale trên thread pool,
+                None = theo config.PARALLEL_MATCHING_ENABLED
+            refine: True = sweep lưới thưa (config.SCALE_COARSE_STEP) rồi nội suy scale quanh đỉnh,
+                False = sweep đủ lưới scale_step, None = theo config.SCALE_REFINE_ENABLED
+        """
+        import config
+        from utils.match_executor import MatchExecutor
+        
+        if refine is None:
+            refine = config.SCALE_REFINE_ENABLED
+        
+        # Screenshot thu nhỏ dùng chung cho tất cả scale
+        small_gray = TemplateHelper._downsample_for_pyramid(screenshot_gray, pyramid, frame_features)
+        
+        # Generate scale factors (tối đa MAX_SCALE_ATTEMPTS, gần 1.0 trước)
+        if refine:
+            scale_step = max(scale_step or config.SCALE_STEP, config.SCALE_COARSE_STEP)
+        scales = TemplateHelper.scale_candidates(scale_range, scale_step)
+        
+        matches = TemplateHelper._evaluate_scales(
+            screenshot_gray, template, scales, template_entry=template_entry, small_gray=small_gray,
+            executor=MatchExecutor.get(parallel), frame_features=frame_features
+        )
+        if not refine:
+            return TemplateHelper._best_match(matches)
+        return TemplateHelper._refine_scale(screenshot_gray, template, matches, template_entry=template_entry)
+    
+    @staticmethod
+    def scale_band(center, half_width, step):
+        """Danh sách scale trong [center - half_width, center + half_width], giới hạn bởi SCALE_RANGE."""
+        import config
+        
+        low_limit, high_limit = config.SCALE_RANGE
+        count = int(round(half_width / step))
+        scales = []
+        for i in range(-count, count + 1):
+            scale = round(center + i * step, 3)
+            if low_limit - 1e-9 <= scale <= high_limit + 1e-9:
+                scales.append(scale)
+        return scales
+    
+    @staticmethod
+    def scale_prior_template_match(screenshot_gray, template, expected_scale, template_entry=None,
+                                   pyramid=None, frame_features=None, parallel=None):
+        """
+        Chỉ tìm trong dải scale hẹp quanh scale dự kiến (suy ra từ kích thước cửa sổ).
+        Dải được nới rộng dần theo config.SCALE_PRIOR_BANDS khi confidence thấp.
+        
+        Returns:
+            tuple: (confidence, location, scale, template_size) như multi_scale_template_match
+        """
+        import config
+        from utils.match_executor import MatchExecutor
+        
+        executor = MatchExecutor.get(parallel)
+        small_gray = TemplateHelper._downsample_for_pyramid(screenshot_gray, pyramid, frame_features)
+        searched = set()
+        best = (0, None, expected_scale, None)
+        
+        for half_width in config.SCALE_PRIOR_BANDS:
+            scales = [s for s in TemplateHelper.scale_band(expected_scale, half_width, config.SCALE_PRIOR_STEP)
+                      if s not in searched]
+            searched.update(scales)
+            if not scales:
+                continue
+            
+            result = TemplateHelper._match_scales(
+                screenshot_gray, template, scales, template_entry=template_entry, small_gray=small_gray,
+                executor=executor, frame_features=frame_features
+            )
+            if result[1] is not None and result[0] > best[0]:
+                best = result
+            if best[0] >= config.TEMPLATE_MATCH_THRESHOLD:
+                break
+        
+        return best
+    
+    @staticmethod
+    def _non_max_suppression(xs, ys, scores, width, height, overlap):
+        """
+        NMS cho các box cùng kích thước (vectorized IoU).
+        Thứ tự ổn định: score giảm dần, rồi y, rồi x.
+        
+        Returns:
+            list index được giữ lại theo thứ tự xếp hạng
+        """
+        import numpy as np
+        
+        order = np.lexsort((xs, ys, -scores))
+        area = float(width * height)
+        keep = []
+        while order.size:
+            best = order[0]
+            keep.append(int(best))
+            rest = order[1:]
+            inter_w = np.clip(width - np.abs(xs[rest] - xs[best]), 0, None)
+            inter_h = np.clip(height - np.abs(ys[rest] - ys[best]), 0, None)
+            intersection = inter_w * inter_h
+            iou = intersection / (2 * area - intersection)
+            order = rest[iou <= overlap]
+        return keep
+    
+    @staticmethod
+    def find_all(screenshot_gray, template, threshold=None, scale=1.0, template_entry=None, max_results=None):
+        """
+        Tìm tất cả vị trí khớp template (nhiều instance) ở một scale.
+        
+        Args:
+            threshold: Confidence tối thiểu (mặc định config.TEMPLATE_MATCH_THRESHOLD)
+            scale: Scale của template (ví dụ scale từ kết quả adaptive_template_match)
+            template_entry: CachedTemplate để dùng bản scaled/mask đã cache
+            max_results: Số ứng viên tối đa (mặc định config.FIND_ALL_MAX_RESULTS)
+            
+        Returns:
+            list MatchResult (method 'Find-All'),
+            xếp theo confidence giảm dần (hòa thì theo y, x)
+        """
         import cv2
+        import numpy as np
         import config
         
-        results = []
+        threshold = config.TEMPLATE_MATCH_THRESHOLD if threshold is None else threshold
+        max_results = max_results or config.FIND_ALL_MAX_RESULTS
         
-        # Method 1: Standard template matching
-        result = cv2.matchTemplate(screenshot_gray, template, cv2.TM_CCOEFF_NORMED)
+        if template_entry is not None:
+            scaled_template = template_entry.get_scaled(scale)
+        elif scale == 1.0:
+            scaled_template = template
+        else:
+            template_h, template_w = template.shape[:2]
+            scaled_template = cv2.resize(template, (int(template_w * scale), int(template_h * scale)))
+        if scaled_template is None:
+            return []
+        template_h, template_w = scaled_template.shape[:2]
+        if template_w > screenshot_gray.shape[1] or template_h > screenshot_gray.shape[0]:
+            return []
+        
+        # Sweep không mask; ứng viên của template có mask được chấm lại bằng score_at bên dưới
+        result = TemplateHelper.match_template(screenshot_gray, scaled_template)
+        boost = config.SCALE_CONFIDENCE_BOOST if scale != 1.0 else 0.0
+        
+        # Chỉ giữ đỉnh cục bộ (3x3) vượt ngưỡng rồi NMS theo độ chồng lấn
+        local_max = cv2.dilate(result, np.ones((3, 3), np.uint8))
+        ys, xs = np.nonzero((result >= threshold - boost) & (result >= local_max))
+        if xs.size == 0:
+            return []
+        scores = result[ys, xs] + boost
+        keep = TemplateHelper._non_max_suppression(
+            xs, ys, scores, template_w, template_h, config.FIND_ALL_NMS_OVERLAP
+        )[:max_results]
+        
+        candidates = [
+            MatchResult('Find-All', float(scores[i]), (int(xs[i]), int(ys[i])), scale, (template_w, template_h))
+            for i in keep
+        ]
+        if template_entry is not None and template_entry.mask is not None:
+            for candidate in candidates:
+                confidence = TemplateHelper.score_at(screenshot_gray, template_entry, candidate.location, scale)
+                if confidence is not None:
+                    candidate.confidence = confidence
+            candidates = [c for c in candidates if c.confidence >= threshold]
+            candidates.sort(key=lambda c: (-c.confidence, c.location[1], c.location[0]))
+        return candidates
+    
+    @staticmethod
+    def pick_candidate(candidates, expected_location=None):
+        """
+        Chọn một ứng viên từ find_all một cách xác định.
+        
+        Chỉ xét các ứng viên có confidence trong khoảng config.FIND_ALL_SCORE_MARGIN so với tốt nhất;
+        nếu có expected_location thì chọn ứng viên gần nhất, ngược lại chọn ứng viên xếp hạng đầu.
+        
+        Returns:
+            MatchResult hoặc None nếu không có ứng viên
+        """
+        import config
+        
+        if not candidates:
+            return None
+        best_confidence = candidates[0].confidence
+        close = [c for c in candidates if c.confidence >= best_confidence - config.FIND_ALL_SCORE_MARGIN]
+        if expected_location is None or len(close) == 1:
+            return close[0]
+        
+        expected_x, expected_y = expected_location
+        return min(close, key=lambda c: (
+            (c.location[0] - expected_x) ** 2 + (c.location[1] - expected_y) ** 2,
+            -c.confidence
+        ))
+    
+    @staticmethod
+    def roi_template_match(screenshot_gray, template, location, scale, template_entry=None, padding=None,
+                           masked=True):
+        """
+        Match template ở một scale cố định trong vùng nhỏ quanh vị trí đã biết.
+        
+        Args:
+            location: (x, y) top-left của lần match trước (tọa độ trong screenshot)
+            scale: Scale của lần match trước
+            padding: Số pixel mở rộng mỗi phía (mặc định config.ROI_SEARCH_PADDING)
+            masked: False = bỏ qua mask của template (score so sánh được với kết quả sweep)
+            
+        Returns:
+            MatchResult (như adaptive_template_match) hoặc None nếu vùng không hợp lệ
+        """
+        import cv2
+        import config
+        
+        padding = config.ROI_SEARCH_PADDING if padding is None else padding
+        
+        mask = None
+        if template_entry is not None:
+            scaled_template = template_entry.get_scaled(scale)
+            if masked:
+                mask = template_entry.get_scaled_mask(scale)
+        elif scale == 1.0:
+            scaled_template = template
+        else:
+            template_h, template_w = template.shape[:2]
+            scaled_template = cv2.resize(template, (int(template_w * scale), int(template_h * scale)))
+        if scaled_template is None:
+            return None
+        
+        template_h, template_w = scaled_template.shape[:2]
+        frame_h, frame_w = screenshot_gray.shape[:2]
+        x0 = max(0, location[0] - padding)
+        y0 = max(0, location[1] - padding)
+        x1 = min(frame_w, location[0] + template_w + padding)
+        y1 = min(frame_h, location[1] + template_h + padding)
+        if x1 - x0 < template_w or y1 - y0 < template_h:
+            return None
+        
+        result = TemplateHelper.match_template(screenshot_gray[y0:y1, x0:x1], scaled_template, mask)
         min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-        results.append({
-            'method': 'Standard',
-            'confidence': max_val,
-            'location': max_loc,
-            'scale': 1.0,
-            'template_size': template.shape[:2][::-1]  # (w, h)
-        })
-        
-        # Method 2: Multi-scale matching (if enabled)
-        if config.MULTI_SCALE_ENABLED:
+        if scale != 1.0:
+            max_val += config.SCALE_CONFIDENCE_BOOST
+        
+        return MatchResult('ROI', max_val, (x0 + max_loc[0], y0 + max_loc[1]), scale, (template_w, template_h))
+    
+    @staticmethod
+    def score_at(screenshot_gray, template_entry, location, scale):
+        """
+        Confidence thật của template tại đúng một vị trí (matchTemplate trên vùng bằng kích thước template).
+        Dùng sau khi pixel signature khớp để có score của frame hiện tại thay vì score cũ.
+        
+        Returns:
+            float (đã cộng SCALE_CONFIDENCE_BOOST nếu scale != 1.0 như các strategy khác)
+            hoặc None nếu vị trí nằm ngoài frame
+        """
+        import cv2
+        import config
+        
+        scaled_template = template_entry.get_scaled(scale)
+        if scaled_template is None:
+            return None
+        template_h, template_w = scaled_template.shape[:2]
+        x, y = int(location[0]), int(location[1])
+        frame_h, frame_w = screenshot_gray.shape[:2]
+        if x < 0 or y < 0 or x + template_w > frame_w or y + template_h > frame_h:
+            return None
+        
+        result = TemplateHelper.match_template(
+            screenshot_gray[y:y + template_h, x:x + template_w], scaled_template,
+            template_entry.get_scaled_mask(scale)
+        )
+        confidence = float(cv2.minMaxLoc(result)[1])
+        if scale != 1.0:
+            confidence += config.SCALE_CONFIDENCE_BOOST
+        return confidence
+    
+    @staticmethod
+    def verify_signature(screenshot_gray, template_entry, location, scale):
+        """
+        Kiểm tra nhanh template còn ở vị trí đã biết bằng pixel signature (không correlation).
+        
+        Args:
+            template_entry: CachedTemplate
+            location: (x, y) top-left trong screenshot
+            scale: Scale của template tại vị trí đó
+            
+        Returns:
+            True nếu khớp, False nếu không khớp, None nếu template không có signature
+        """
+        import numpy as np
+        import config
+        
+        signature = template_entry.get_signature(scale)
+        if signature is None:
+            return None
+        xs, ys, expected = signature
+        
+        xs = xs + int(location[0])
+        ys = ys + int(location[1])
+        frame_h, frame_w = screenshot_gray.shape[:2]
+        if xs.min() < 0 or ys.min() < 0 or xs.max() >= frame_w or ys.max() >= frame_h:
+            return False
+        
+        # Template tối/ít tương phản -> tolerance chặt hơn
+        contrast = int(expected.max() - expected.min())
+        tolerance = min(config.SIGNATURE_TOLERANCE, contrast // 3)
+        sampled = screenshot_gray[ys, xs].astype(np.int16)
+        
+        # Vùng đồng màu (ví dụ cửa sổ bị che/đổi nền) không được coi là khớp
+        if int(sampled.max() - sampled.min()) < contrast // 2:
+            return False
+        
+        matched = np.count_nonzero(np.abs(sampled - expected) <= tolerance)
+        return bool(matched >= config.SIGNATURE_MIN_MATCH_RATIO * len(expected))
+    
+    @staticmethod
+    def signature_confidence(screenshot_gray, template_entry, location, scale):
+        """
+        Confidence suy ra từ pixel signature (không correlation): hệ số tương quan giữa các pixel mẫu
+        đọc từ frame hiện tại và cường độ mong đợi, cùng thang với TM_CCOEFF_NORMED.
+        Nếu bật config.SIGNATURE_RESCORE_ENABLED thì thay bằng score_at (một lần matchTemplate tại vị trí).
+        
+        Returns:
+            float (đã cộng SCALE_CONFIDENCE_BOOST nếu scale != 1.0) hoặc None nếu signature không khớp
+        """
+        import numpy as np
+        import config
+        
+        if not TemplateHelper.verify_signature(screenshot_gray, template_entry, location, scale):
+            return None
+        if config.SIGNATURE_RESCORE_ENABLED:
+            return TemplateHelper.score_at(screenshot_gray, template_entry, location, scale)
+        
+        xs, ys, expected = template_entry.get_signature(scale)
+        sampled = screenshot_gray[ys + int(location[1]), xs + int(location[0])].astype(np.float32)
+        expected = expected.astype(np.float32)
+        sampled -= sampled.mean()
+        expected -= expected.mean()
+        denominator = float(np.sqrt(np.dot(sampled, sampled) * np.dot(expected, expected)))
+        confidence = float(np.dot(sampled, expected)) / denominator if denominator else 0.0
+        if scale != 1.0:
+            confidence += config.SCALE_CONFIDENCE_BOOST
+        return confidence
+    
+    @staticmethod
+    def _confirm_masked(screenshot_gray, template_entry, result):
+        """
+        Xác nhận kết quả sweep (không mask) của template có mask: masked matchTemplate chỉ trong
+        vùng nhỏ quanh vị trí tìm được (config.MASK_CONFIRM_PADDING), lấy confidence/location đã mask.
+        Template không có mask (hoặc không có kết quả) thì trả về nguyên kết quả.
+        Chỉ xác nhận strategy grayscale: kết quả Edge-Based giữ nguyên score trên edge map,
+        để method và confidence của kết quả luôn cùng một loại score (telemetry, PluginLayout).
+        """
+        import config
+        
+        if (result is None or result.location is None or template_entry is None
+                or template_entry.mask is None or result.method == 'Edge-Based'):
+            return result
+        confirmed = TemplateHelper.roi_template_match(
+            screenshot_gray, template_entry.image, result.location, result.scale,
+            template_entry=template_entry, padding=config.MASK_CONFIRM_PADDING
+        )
+        if confirmed is None:
+            return result
+        return result.copy(confidence=confirmed.confidence, location=confirmed.location)
+    
+    @staticmethod
+    def _run_strategy(method, screenshot_gray, template, template_entry=None, frame_features=None):
+        """
+        Chạy một strategy của adaptive matching.
+        
+        Returns:
+            MatchResult hoặc None nếu strategy lỗi/không áp dụng được
+        """
+        import cv2
+        import config
+        
+        # Các strategy đều chạy không mask; template có mask được xác nhận lại bằng _confirm_masked
+        if method == 'Standard':
+            prefiltered = None
+            prefilter_ratio = TemplateHelper._prefilter_ratio(screenshot_gray, template_entry, frame_features)
+            if prefilter_ratio is not None:
+                prefiltered = TemplateHelper.variance_prefiltered_match(
+                    frame_features, template, None, prefilter_ratio
+                )
+            if prefiltered is not None:
+                max_val, max_loc = prefiltered
+                if max_loc is None:
+                    return MatchResult.not_found(template.shape[:2][::-1])
+            else:
+                result = TemplateHelper.match_template(screenshot_gray, template)
+                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            return MatchResult('Standard', max_val, max_loc, 1.0, template.shape[:2][::-1])  # size (w, h)
+        
+        if method == 'Multi-Scale':
             confidence, location, scale, template_size = TemplateHelper.multi_scale_template_match(
-                screenshot_gray, template, config.SCALE_RANGE, config.SCALE_STEP
+                screenshot_gray, template, config.SCALE_RANGE, config.SCALE_STEP,
+                template_entry=template_entry, frame_features=frame_features
             )
-            results.append({
-                'method': 'Multi-Scale',
-                'confidence': confidence,
-                'location': location,
-                'scale': scale,
-                'template_size': template_size
-            })
-        
-        # Method 3: Edge-based matching (for very different scales)
-        try:
-            # Convert to edges
-            screenshot_edges = cv2.Canny(screenshot_gray, 50, 150)
-            template_edges = cv2.Canny(template, 50, 150)
-            
-            result = cv2.matchTemplate(screenshot_edges, template_edges, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-            
-            results.append({
-                'method': 'Edge-Based',
-                'confidence': max_val * 0.9,  # Slightly lower weight for edge matching
-                'location': max_loc,
-                'scale': 1.0,
-                'template_size': template.shape[:2][::-1]
-            })
-        except Exception as e:
-            print(f"Edge-based matching failed: {e}")
+            return MatchResult('Multi-Scale', confidence, location, scale, template_size)
+        
+        if method == 'Edge-Based':
+            # Edge-based matching (for very different scales)
+            try:
+                if frame_features is not None:
+                    screenshot_edges = frame_features.edges
+                else:
+                    screenshot_edges = cv2.Canny(screenshot_gray, 50, 150)
+                if template_entry is not None:
+                    template_edges = template_entry.edges
+                else:
+                    template_edges = cv2.Canny(template, 50, 150)
+                
+                result = TemplateHelper.match_template(screenshot_edges, template_edges)
+                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+                # Slightly lower weight for edge matching
+                return MatchResult('Edge-Based', max_val * 0.9, max_loc, 1.0, template.shape[:2][::-1])
+            except Exception as e:
+                print(f"Edge-based matching failed: {e}")
+                return None
+        
+        print(f"⚠️ Unknown matching strategy: {method}")
+        return None
+    
+    @staticmethod
+    def _timed_strategy(method, screenshot_gray, template, template_entry=None, frame_features=None):
+        """_run_strategy + ghi nhận thời gian chạy vào MatchTelemetry."""
+        import time
+        from utils.match_telemetry import MatchTelemetry
+        
+        start = time.perf_counter()
+        result = TemplateHelper._run_strategy(method, screenshot_gray, template, template_entry, frame_features)
+        if template_entry is not None:
+            MatchTelemetry.record_run(template_entry.key, method, time.perf_counter() - start)
+        return result
+    
+    @staticmethod
+    def _run_strategies_parallel(methods, screenshot_gray, template, template_entry, frame_features, executor):
+        """
+        Chạy nhiều strategy đồng thời: strategy một lần matchTemplate (Standard, Edge-Based)
+        chạy trên pool, Multi-Scale chạy ở thread hiện tại (tự fan-out các scale lên pool).
+        
+        Returns:
+            dict method -> kết quả của _run_strategy
+        """
+        futures = {}
+        for method in methods:
+            if method != 'Multi-Scale':
+                futures[method] = executor.submit(
+                    TemplateHelper._timed_strategy, method, screenshot_gray, template,
+                    template_entry, frame_features
+                )
+        results = {}
+        for method in methods:
+            if method == 'Multi-Scale':
+                results[method] = TemplateHelper._timed_strategy(
+                    method, screenshot_gray, template, template_entry, frame_features
+                )
+        for method, future in futures.items():
+            results[method] = future.result()
+        return results
+    
+    @staticmethod
+    def adaptive_template_match(screenshot_gray, template, template_entry=None, window_size=None,
+                                frame_features=None):
+        """
+        Adaptive template matching với fallback strategies.
+        
+        Args:
+            template_entry: CachedTemplate (từ TemplateCache) để dùng lại scaled/edge variants
+            window_size: (width, height) của cửa sổ plugin - nếu template có reference window
+                thì chỉ search dải scale hẹp quanh scale dự kiến trước khi sweep toàn bộ
+            frame_features: FrameFeatures của screenshot (dùng chung edge map/bản thu nhỏ
+                khi match nhiều template trên cùng frame)
+        
+        Returns:
+            MatchResult (method 'None' nếu không strategy nào tìm thấy)
+        """
+        import time
+        from utils.match_telemetry import MatchTelemetry
+        
+        start = time.perf_counter()
+        result = TemplateHelper._adaptive_match(
+            screenshot_gray, template, template_entry, window_size, frame_features
+        )
+        if template_entry is not None:
+            MatchTelemetry.record_run(template_entry.key, 'Total', time.perf_counter() - start)
+        return result
+    
+    @staticmethod
+    def _adaptive_match(screenshot_gray, template, template_entry, window_size, frame_features):
+        """Thân của adaptive_template_match (không tính thời gian tổng)."""
+        import time
+        import config
+        from utils.frame_features import FrameFeatures
+        from utils.match_executor import MatchExecutor
+        from utils.match_telemetry import MatchTelemetry
+        from utils.template_metadata import TemplateMetadata
+        
+        template_key = template_entry.key if template_entry is not None else None
+        if frame_features is None:
+            # Edge map/bản resize của frame chỉ tính một lần dù nhiều template được locate riêng lẻ
+            frame_features = FrameFeatures.for_frame(screenshot_gray)
+        
+        # Method 0: Scale prior từ kích thước cửa sổ plugin
+        expected_scale = None
+        if config.SCALE_PRIOR_ENABLED and template_key and window_size:
+            expected_scale = TemplateMetadata.expected_scale(template_key, window_size)
+        if expected_scale is not None:
+            start = time.perf_counter()
+            confidence, location, scale, template_size = TemplateHelper.scale_prior_template_match(
+                screenshot_gray, template, expected_scale, template_entry=template_entry,
+                frame_features=frame_features
+            )
+            MatchTelemetry.record_run(template_key, 'Scale-Prior', time.perf_counter() - start)
+            prior_result = TemplateHelper._confirm_masked(
+                screenshot_gray, template_entry,
+                MatchResult('Scale-Prior', confidence, location, scale, template_size)
+            )
+            if prior_result.location is not None and prior_result.confidence >= config.TEMPLATE_MATCH_THRESHOLD:
+                MatchTelemetry.record_resolution(template_key, 'Scale-Prior', scale=scale)
+                return prior_result
+        
+        # Cascade: chạy strategy rẻ trước, dừng khi đã "chắc chắn"
+        default_order = config.MATCH_CASCADE_ORDER
+        if not config.MULTI_SCALE_ENABLED:
+            default_order = [method for method in default_order if method != 'Multi-Scale']
+        strategy_order, skipped = MatchTelemetry.plan_strategies(template_key, default_order)
+        
+        results = []
+        early_exit = False
+        executor = MatchExecutor.get()
+        prefetched = None
+        for index, method in enumerate(strategy_order):
+            if prefetched is not None:
+                result = prefetched[method]
+            elif executor is not None and index > 0:
+                # Stage đầu chưa chắc chắn: chạy đồng thời các stage còn lại,
+                # vẫn reduce theo đúng thứ tự cascade nên kết quả giống chế độ tuần tự
+                prefetched = TemplateHelper._run_strategies_parallel(
+                    strategy_order[index:], screenshot_gray, template, template_entry, frame_features, executor
+                )
+                result = prefetched[method]
+            else:
+                result = TemplateHelper._timed_strategy(
+                    method, screenshot_gray, template, template_entry, frame_features
+                )
+            result = TemplateHelper._confirm_masked(screenshot_gray, template_entry, result)
+            if result is None or result.location is None:
+                continue
+            results.append(result)
+            if config.MATCH_CASCADE_ENABLED and result.confidence >= config.MATCH_CERTAIN_THRESHOLD:
+                early_exit = True
+                break
+        
+        # Strategy bị bỏ qua theo telemetry chỉ chạy khi các strategy còn lại không đạt threshold
+        if skipped and max((r.confidence for r in results), default=0) < config.TEMPLATE_MATCH_THRESHOLD:
+            for method in skipped:
+                result = TemplateHelper._timed_strategy(
+                    method, screenshot_gray, template, template_entry, frame_features
+                )
+                result = TemplateHelper._confirm_masked(screenshot_gray, template_entry, result)
+                if result is not None and result.location is not None:
+                    results.append(result)
+        
+        if not results:
+            return MatchResult.not_found(template.shape[:2][::-1])
         
         # Select best result
-        best_result = max(results, key=lambda x: x['confidence'])
+        best_result = max(results, key=lambda x: x.confidence)
+        MatchTelemetry.record_resolution(template_key, best_result.method, early_exit, scale=best_result.scale)
+        
+        # Học reference window từ match đáng tin cậy (cho lần sau dùng scale prior)
+        if (template_key and window_size and best_result.method != 'Edge-Based'
+                and best_result.confidence >= config.TEMPLATE_MATCH_THRESHOLD):
+            TemplateMetadata.record_reference_window(template_key, window_size, best_result.scale)
         
         return best_result
+    
+    @staticmethod
+    def match_many(screenshot_gray, template_ids, window_size=None, plugin_key=None, window_origin=None):
+        """
+        Match nhiều template trên cùng một frame grayscale trong một lượt.
+        Edge map và bản thu nhỏ của frame được tính một lần và dùng chung.
+        
+        Args:
+            screenshot_gray: Screenshot grayscale của cửa sổ plugin
+            template_ids: List key trong config.TEMPLATE_PATHS
+            window_size: (width, height) của cửa sổ plugin
+            plugin_key: Nếu có, locate qua TemplateLocator (location memory của plugin đó);
+                template có trong config.PLUGIN_LAYOUTS[plugin_key] được locate qua PluginLayout
+            window_origin: (left, top) của cửa sổ plugin trên màn hình (khi locate qua plugin_key)
+            
+        Returns:
+            dict: template_id -> MatchResult, None nếu không load được template
+        """
+        import config
+        from utils.frame_features import FrameFeatures
+        from utils.template_cache import TemplateCache
+        from utils.template_locator import TemplateLocator
+        
+        frame_features = FrameFeatures.for_frame(
+            screenshot_gray, frame_pyramid=FrameFeatures.use_frame_pyramid(len(template_ids))
+        )
+        
+        results = {}
+        if plugin_key:
+            from utils.plugin_layout import PluginLayout
+            # Chỉ control thuộc layout mới qua anchor (template khác không tốn thêm lần search anchor)
+            layout_ids = [template_id for template_id in template_ids
+                          if PluginLayout.has_layout(plugin_key)
+                          and template_id in config.PLUGIN_LAYOUTS[plugin_key]]
+            if layout_ids:
+                templates = {template_id: TemplateCache.get_by_id(template_id) for template_id in layout_ids}
+                results.update(PluginLayout.solve(
+                    plugin_key, screenshot_gray, templates, window_size=window_size,
+                    frame_features=frame_features, window_origin=window_origin
+                ))
+        
+        for template_id in template_ids:
+            if template_id in results:
+                continue
+            template_entry = TemplateCache.get_by_id(template_id)
+            if template_entry is None:
+                results[template_id] = None
+                continue
+            
+            if plugin_key:
+                results[template_id] = TemplateLocator.locate(
+                    plugin_key, screenshot_gray, template_entry, window_size=window_size,
+                    frame_features=frame_features, window_origin=window_origin
+                )
+            else:
+                results[template_id] = TemplateHelper.adaptive_template_match(
+                    screenshot_gray, template_entry.image, template_entry=template_entry,
+                    window_size=window_size, frame_features=frame_features
+                )
+        return {template_id: results[template_id] for template_id in template_ids}
 
 class MouseHelper:
-    """Helper class cho các thao tác chuột an toàn."""
+    """Helper class cho các thao tác chuột an toàn (mỗi click bỏ frame đã cache - xem FrameCache)."""
+    
+    @staticmethod
+    def _after_input():
+        """Input làm UI thay đổi -> frame đã chụp trong session không còn đúng."""
+        from utils.frame_cache import FrameCache
+        FrameCache.invalidate()
     
     @staticmethod
     def _restore_cursor_position(original_pos, return_mode, delay):
@@ -442,6 +1483,7 @@ class MouseHelper:
         
         # Thực hiện click
         pyautogui.click(x, y, _pause=False)
+        MouseHelper._after_input()
         
         # Restore cursor position
         MouseHelper._restore_cursor_position(original_pos, return_mode, delay)
@@ -453,6 +1495,7 @@ class MouseHelper:
         
         original_pos = pyautogui.position()
         pyautogui.doubleClick(x, y, _pause=False)
+        MouseHelper._after_input()
         
         # Restore cursor position
         MouseHelper._restore_cursor_position(original_pos, return_mode, delay)
@@ -464,6 +1507,7 @@ class MouseHelper:
         
         original_pos = pyautogui.position()
         pyautogui.rightClick(x, y, _pause=False)
+        MouseHelper._after_input()
         
         # Restore cursor position
         MouseHelper._restore_cursor_position(original_pos, return_mode, delay)
@@ -480,6 +1524,7 @@ class MouseHelper:
         import pyautogui
         import time
         pyautogui.click(x, y, _pause=False)
+        MouseHelper._after_input()
         time.sleep(delay)
     
     @staticmethod  
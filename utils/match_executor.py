@@ -0,0 +1,58 @@
+"""
+Match executor - thread pool dùng chung cho template matching song song.
+cv2.matchTemplate/cv2.resize nhả GIL nên các scale có thể chạy trên nhiều core.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+
+class MatchExecutor:
+    """Thread pool giới hạn (config.MATCH_THREAD_WORKERS), tạo lazy một lần cho cả process."""
+
+    THREAD_NAME_PREFIX = "match-worker"
+
+    _executor = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get(parallel=None):
+        """
+        Lấy executor dùng chung.
+
+        Args:
+            parallel: True/False để bật/tắt, None = theo config.PARALLEL_MATCHING_ENABLED
+
+        Returns:
+            ThreadPoolExecutor hoặc None nếu không chạy song song
+            (tắt, chỉ 1 worker, hoặc đang ở trong một worker - tránh deadlock khi lồng nhau)
+        """
+        if parallel is None:
+            parallel = config.PARALLEL_MATCHING_ENABLED
+        if not parallel or config.MATCH_THREAD_WORKERS < 2:
+            return None
+        if MatchExecutor.in_worker():
+            return None
+
+        with MatchExecutor._lock:
+            if MatchExecutor._executor is None:
+                MatchExecutor._executor = ThreadPoolExecutor(
+                    max_workers=config.MATCH_THREAD_WORKERS,
+                    thread_name_prefix=MatchExecutor.THREAD_NAME_PREFIX
+                )
+            return MatchExecutor._executor
+
+    @staticmethod
+    def in_worker():
+        """True nếu thread hiện tại là worker của pool."""
+        return threading.current_thread().name.startswith(MatchExecutor.THREAD_NAME_PREFIX)
+
+    @staticmethod
+    def shutdown():
+        """Đóng pool (gọi khi thoát ứng dụng)."""
+        with MatchExecutor._lock:
+            executor = MatchExecutor._executor
+            MatchExecutor._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False)
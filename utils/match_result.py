@@ -0,0 +1,68 @@
+"""
+Match result - kết quả template matching dùng chung cho TemplateHelper, TemplateLocator và detectors.
+"""
+
+
+class MatchResult:
+    """
+    Kết quả match của một template (gọn, không có __dict__).
+
+    Attributes:
+        method: Strategy tìm ra kết quả ('Standard', 'Multi-Scale', 'ROI', 'Signature', ..., 'None')
+        confidence: Confidence (TM_CCOEFF_NORMED, có thể đã cộng SCALE_CONFIDENCE_BOOST)
+        location: (x, y) góc trên trái trong screenshot, None nếu không tìm thấy
+        scale: Scale của template
+        template_size: (width, height) của template sau khi scale
+    """
+
+    __slots__ = ('method', 'confidence', 'location', 'scale', 'template_size')
+
+    def __init__(self, method, confidence, location, scale, template_size):
+        self.method = method
+        self.confidence = confidence
+        self.location = location
+        self.scale = scale
+        self.template_size = template_size
+
+    @staticmethod
+    def not_found(template_size):
+        """Kết quả rỗng (method 'None') cho template có kích thước template_size."""
+        return MatchResult('None', 0, None, 1.0, template_size)
+
+    @property
+    def found(self):
+        """Có vị trí match hay không (chưa xét threshold)."""
+        return self.location is not None
+
+    def center(self, offset_x=0, offset_y=0, y_ratio=None, x_ratio=None):
+        """
+        Tâm template (cộng offset, ví dụ vị trí cửa sổ plugin).
+
+        Args:
+            y_ratio: Nếu có thì lấy điểm theo tỉ lệ chiều cao thay vì chính giữa
+            x_ratio: Nếu có thì lấy điểm theo tỉ lệ chiều rộng thay vì chính giữa
+
+        Returns:
+            tuple: (x, y)
+        """
+        width, height = self.template_size
+        if x_ratio is None:
+            x = offset_x + self.location[0] + width // 2
+        else:
+            x = offset_x + self.location[0] + int(width * x_ratio)
+        if y_ratio is None:
+            y = offset_y + self.location[1] + height // 2
+        else:
+            y = offset_y + self.location[1] + int(height * y_ratio)
+        return x, y
+
+    def copy(self, **changes):
+        """Bản sao với một số field thay đổi (ví dụ copy(method='Layout'))."""
+        result = MatchResult(self.method, self.confidence, self.location, self.scale, self.template_size)
+        for name, value in changes.items():
+            setattr(result, name, value)
+        return result
+
+    def __repr__(self):
+        return (f"MatchResult(method={self.method!r}, confidence={self.confidence:.3f}, "
+                f"location={self.location}, scale={self.scale}, template_size={self.template_size})")
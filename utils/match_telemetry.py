@@ -0,0 +1,188 @@
+"""
+Match telemetry - ghi nhận strategy nào resolve mỗi template, thời gian chạy và scale tìm được
+để cascade trong adaptive_template_match tự sắp xếp lại thứ tự và bỏ qua strategy không bao giờ thắng.
+"""
+import bisect
+import threading
+
+import config
+
+
+class MatchTelemetry:
+    """Thống kê theo template: strategy thắng, số lần early-exit, latency histogram, phân bố scale."""
+
+    # template_key -> {'wins': {method: count}, 'early_exits': int, 'total': int,
+    #                  'runs': {method: count}, 'latency': {method: [count mỗi bucket]}, 'scales': {scale: count}}
+    _templates = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _entry(template_key):
+        """Thống kê của template (tạo mới nếu chưa có - gọi khi đang giữ lock)."""
+        return MatchTelemetry._templates.setdefault(template_key, {
+            'wins': {}, 'early_exits': 0, 'total': 0, 'runs': {}, 'latency': {}, 'scales': {}
+        })
+
+    @staticmethod
+    def record_resolution(template_key, method, early_exit=False, scale=None):
+        """
+        Ghi nhận strategy đã resolve template.
+
+        Args:
+            template_key: Tên template
+            method: Tên strategy ('Standard', 'Multi-Scale', 'Edge-Based', ...)
+            early_exit: True nếu cascade dừng sớm nhờ strategy này
+            scale: Scale của kết quả (cho phân bố scale)
+        """
+        if not template_key:
+            return
+        with MatchTelemetry._lock:
+            stats = MatchTelemetry._entry(template_key)
+            stats['wins'][method] = stats['wins'].get(method, 0) + 1
+            stats['total'] += 1
+            if early_exit:
+                stats['early_exits'] += 1
+            if scale is not None:
+                step = config.MATCH_TELEMETRY_SCALE_BIN
+                scale_bin = round(round(scale / step) * step, 2)
+                stats['scales'][scale_bin] = stats['scales'].get(scale_bin, 0) + 1
+
+    @staticmethod
+    def record_run(template_key, method, seconds):
+        """
+        Ghi nhận một lần chạy strategy (kể cả khi không thắng) và thời gian chạy.
+
+        Args:
+            seconds: Thời gian chạy (giây); 'Total' = cả lượt adaptive_template_match
+        """
+        if not template_key:
+            return
+        buckets = config.MATCH_LATENCY_BUCKETS_MS
+        index = bisect.bisect_left(buckets, seconds * 1000.0)
+        with MatchTelemetry._lock:
+            stats = MatchTelemetry._entry(template_key)
+            stats['runs'][method] = stats['runs'].get(method, 0) + 1
+            histogram = stats['latency'].setdefault(method, [0] * (len(buckets) + 1))
+            histogram[index] += 1
+
+    @staticmethod
+    def plan_strategies(template_key, default_order):
+        """
+        Thứ tự strategy cho template và các strategy tạm bỏ qua.
+
+        Strategy chưa từng thắng sau config.MATCH_CASCADE_SKIP_MIN_SAMPLES lần resolve bị bỏ qua
+        (luôn giữ ít nhất một strategy); adaptive_template_match vẫn chạy chúng khi
+        các strategy còn lại không đạt threshold.
+
+        Returns:
+            tuple: (strategy_order, skipped)
+        """
+        order = MatchTelemetry.get_strategy_order(template_key, default_order)
+        if not template_key or not config.MATCH_CASCADE_SKIP_ENABLED:
+            return order, []
+        with MatchTelemetry._lock:
+            stats = MatchTelemetry._templates.get(template_key)
+            if not stats or stats['total'] < config.MATCH_CASCADE_SKIP_MIN_SAMPLES:
+                return order, []
+            wins = dict(stats['wins'])
+        kept = [method for method in order if wins.get(method, 0) > 0]
+        if not kept:
+            return order, []
+        return kept, [method for method in order if method not in kept]
+
+    @staticmethod
+    def get_strategy_order(template_key, default_order):
+        """
+        Thứ tự strategy cho template: strategy thắng nhiều nhất chạy trước.
+        Giữ nguyên default_order khi chưa đủ config.MATCH_CASCADE_MIN_SAMPLES mẫu.
+        """
+        default_order = list(default_order)
+        if not template_key or not config.MATCH_CASCADE_ADAPTIVE:
+            return default_order
+        with MatchTelemetry._lock:
+            stats = MatchTelemetry._templates.get(template_key)
+            if not stats or stats['total'] < config.MATCH_CASCADE_MIN_SAMPLES:
+                return default_order
+            wins = dict(stats['wins'])
+        # sorted() ổn định: hòa thì giữ thứ tự mặc định (rẻ trước)
+        return sorted(default_order, key=lambda method: -wins.get(method, 0))
+
+    @staticmethod
+    def _copy_stats(stats):
+        return {
+            'wins': dict(stats['wins']),
+            'early_exits': stats['early_exits'],
+            'total': stats['total'],
+            'runs': dict(stats['runs']),
+            'latency': {method: list(histogram) for method, histogram in stats['latency'].items()},
+            'scales': dict(stats['scales'])
+        }
+
+    @staticmethod
+    def get_stats(template_key=None):
+        """Lấy thống kê (một template hoặc tất cả)."""
+        with MatchTelemetry._lock:
+            if template_key is not None:
+                stats = MatchTelemetry._templates.get(template_key)
+                return MatchTelemetry._copy_stats(stats) if stats else None
+            return {
+                key: MatchTelemetry._copy_stats(stats)
+                for key, stats in MatchTelemetry._templates.items()
+            }
+
+    @staticmethod
+    def _histogram_percentile(histogram, fraction):
+        """Cận trên (ms) của bucket chứa percentile, None nếu chưa có mẫu."""
+        buckets = config.MATCH_LATENCY_BUCKETS_MS
+        count = sum(histogram)
+        if not count:
+            return None
+        target = fraction * count
+        running = 0
+        for index, bucket_count in enumerate(histogram):
+            running += bucket_count
+            if running >= target:
+                return buckets[index] if index < len(buckets) else float('inf')
+        return float('inf')
+
+    @staticmethod
+    def format_report():
+        """
+        Báo cáo thống kê dạng text (cho debug window).
+
+        Returns:
+            list dòng text
+        """
+        stats_by_template = MatchTelemetry.get_stats()
+        if not stats_by_template:
+            return ["📊 Match telemetry: chưa có dữ liệu"]
+
+        def format_ms(value):
+            if value is None:
+                return "-"
+            return ">max" if value == float('inf') else f"≤{value:g}ms"
+
+        lines = [f"📊 Match telemetry ({len(stats_by_template)} templates)"]
+        for template_key in sorted(stats_by_template):
+            stats = stats_by_template[template_key]
+            wins = ", ".join(f"{method} {count}" for method, count in
+                             sorted(stats['wins'].items(), key=lambda item: -item[1]))
+            lines.append(f"• {template_key}: {stats['total']} matches, "
+                         f"{stats['early_exits']} early exits | wins: {wins or '-'}")
+            for method in sorted(stats['latency']):
+                histogram = stats['latency'][method]
+                lines.append(
+                    f"    {method}: {stats['runs'].get(method, 0)} runs, "
+                    f"p50 {format_ms(MatchTelemetry._histogram_percentile(histogram, 0.5))}, "
+                    f"p90 {format_ms(MatchTelemetry._histogram_percentile(histogram, 0.9))}"
+                )
+            if stats['scales']:
+                scales = ", ".join(f"{scale:.2f}×{count}" for scale, count in sorted(stats['scales'].items()))
+                lines.append(f"    scales: {scales}")
+        return lines
+
+    @staticmethod
+    def reset():
+        """Xóa toàn bộ thống kê."""
+        with MatchTelemetry._lock:
+            MatchTelemetry._templates.clear()
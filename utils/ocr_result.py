@@ -0,0 +1,97 @@
+"""
+OCR result - dữ liệu pytesseract.image_to_data dạng cột NumPy, lọc vectorized thay vì vòng lặp Python.
+"""
+import numpy as np
+
+
+class OCRResult:
+    """
+    Kết quả OCR theo cột: text/left/top/width/height/conf là NumPy arrays cùng độ dài,
+    giữ nguyên thứ tự (và index) như output của Tesseract.
+    """
+
+    __slots__ = ('text', 'left', 'top', 'width', 'height', 'conf', '_stripped', '_upper')
+
+    def __init__(self, text, left, top, width, height, conf):
+        self.text = np.asarray(text, dtype=str)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.top = np.asarray(top, dtype=np.int32)
+        self.width = np.asarray(width, dtype=np.int32)
+        self.height = np.asarray(height, dtype=np.int32)
+        self.conf = np.asarray(conf, dtype=np.float32)
+        self._stripped = None
+        self._upper = None
+
+    @staticmethod
+    def from_tesseract(data):
+        """Tạo từ dict-of-lists của pytesseract (Output.DICT)."""
+        return OCRResult(
+            data.get('text', []), data.get('left', []), data.get('top', []),
+            data.get('width', []), data.get('height', []), data.get('conf', [])
+        )
+
+    def __len__(self):
+        return len(self.text)
+
+    @property
+    def stripped(self):
+        """Text đã strip (tính một lần)."""
+        if self._stripped is None:
+            self._stripped = np.char.strip(self.text)
+        return self._stripped
+
+    @property
+    def upper(self):
+        """Text đã strip + upper (tính một lần, dùng cho so khớp không phân biệt hoa thường)."""
+        if self._upper is None:
+            self._upper = np.char.upper(self.stripped)
+        return self._upper
+
+    def non_empty(self):
+        """Mask các từ có nội dung."""
+        return np.char.str_len(self.stripped) > 0
+
+    def contains(self, keywords):
+        """Mask các từ chứa một trong các keyword (không phân biệt hoa thường)."""
+        if isinstance(keywords, str):
+            keywords = (keywords,)
+        mask = np.zeros(len(self), dtype=bool)
+        for keyword in keywords:
+            mask |= np.char.find(self.upper, keyword.upper()) >= 0
+        return mask & self.non_empty()
+
+    def equals(self, values, case_sensitive=True):
+        """Mask các từ (đã strip) bằng đúng một trong các giá trị."""
+        if case_sensitive:
+            return np.isin(self.stripped, list(values))
+        return np.isin(self.upper, [value.upper() for value in values])
+
+    def confident(self, min_conf):
+        """Mask các từ có confidence >= min_conf (Tesseract dùng -1 cho dòng/block)."""
+        return self.conf >= min_conf
+
+    @staticmethod
+    def first(mask):
+        """Index đầu tiên thỏa mask, None nếu không có."""
+        indices = np.flatnonzero(mask)
+        return int(indices[0]) if indices.size else None
+
+    @staticmethod
+    def indices(mask):
+        """Danh sách index thỏa mask."""
+        return np.flatnonzero(mask).tolist()
+
+    def words(self):
+        """Danh sách từ có nội dung (đã strip)."""
+        return self.stripped[self.non_empty()].tolist()
+
+    def center(self, index, offset_x=0, offset_y=0):
+        """Tâm box của từ tại index (cộng offset, ví dụ vị trí vùng OCR trên màn hình)."""
+        return (
+            int(offset_x + self.left[index] + self.width[index] // 2),
+            int(offset_y + self.top[index] + self.height[index] // 2)
+        )
+
+    def box(self, index):
+        """(left, top, width, height) của từ tại index."""
+        return int(self.left[index]), int(self.top[index]), int(self.width[index]), int(self.height[index])
@@ -0,0 +1,224 @@
+"""
+Plugin layout - mô hình vị trí tương đối giữa các control trong cùng một cửa sổ plugin.
+Locate một anchor template, suy ra vị trí các control còn lại từ offset đã học
+(nhân theo scale của anchor), chỉ verify bằng ROI nhỏ thay vì search toàn cửa sổ.
+"""
+import json
+import os
+import threading
+
+import config
+from utils.helpers import TemplateHelper
+from utils.match_result import MatchResult
+from utils.template_cache import TemplateCache
+from utils.template_locator import TemplateLocator
+
+
+class PluginLayout:
+    """
+    Layout solver theo plugin.
+
+    Offsets được lưu trong config.PLUGIN_LAYOUTS_FILE theo dạng:
+        {plugin_key: {anchor_key: {template_key: {'offset': [dx, dy], 'scale_ratio': r}}}}
+    với offset tính ở scale 1.0 của anchor.
+    """
+
+    _layouts = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _load():
+        """Load offsets đã học (lazy, một lần)."""
+        if PluginLayout._layouts is None:
+            layouts = {}
+            try:
+                if os.path.exists(config.PLUGIN_LAYOUTS_FILE):
+                    with open(config.PLUGIN_LAYOUTS_FILE, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        layouts = data
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"⚠️ Error loading plugin layouts: {e}")
+            PluginLayout._layouts = layouts
+        return PluginLayout._layouts
+
+    @staticmethod
+    def _save():
+        """Ghi offsets ra file (gọi khi đang giữ lock)."""
+        try:
+            os.makedirs(os.path.dirname(config.PLUGIN_LAYOUTS_FILE) or '.', exist_ok=True)
+            with open(config.PLUGIN_LAYOUTS_FILE, 'w', encoding='utf-8') as f:
+                json.dump(PluginLayout._layouts, f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            print(f"⚠️ Error saving plugin layouts: {e}")
+
+    @staticmethod
+    def has_layout(plugin_key):
+        """Plugin có khai báo anchor trong config.PLUGIN_LAYOUTS không."""
+        return config.PLUGIN_LAYOUT_ENABLED and bool(config.PLUGIN_LAYOUTS.get(plugin_key))
+
+    @staticmethod
+    def get_offset(plugin_key, anchor_key, template_key):
+        """Lấy offset đã học của template so với anchor, None nếu chưa có."""
+        with PluginLayout._lock:
+            offset = PluginLayout._load().get(plugin_key, {}).get(anchor_key, {}).get(template_key)
+            return dict(offset) if offset else None
+
+    @staticmethod
+    def learn_offset(plugin_key, anchor_key, anchor_result, template_key, result):
+        """
+        Học offset của template so với anchor từ hai match đáng tin cậy trên cùng frame.
+
+        Args:
+            anchor_result, result: MatchResult của anchor và template
+        """
+        anchor_scale = anchor_result.scale or 1.0
+        offset = {
+            'offset': [
+                round((result.location[0] - anchor_result.location[0]) / anchor_scale, 1),
+                round((result.location[1] - anchor_result.location[1]) / anchor_scale, 1)
+            ],
+            'scale_ratio': round(result.scale / anchor_scale, 3)
+        }
+        with PluginLayout._lock:
+            anchors = PluginLayout._load().setdefault(plugin_key, {}).setdefault(anchor_key, {})
+            if anchors.get(template_key) == offset:
+                return
+            anchors[template_key] = offset
+            PluginLayout._save()
+
+    @staticmethod
+    def forget(plugin_key=None):
+        """Xóa offsets đã học (theo plugin hoặc toàn bộ)."""
+        with PluginLayout._lock:
+            layouts = PluginLayout._load()
+            if plugin_key is None:
+                layouts.clear()
+            else:
+                layouts.pop(plugin_key, None)
+            PluginLayout._save()
+
+    @staticmethod
+    def _locate_anchor(plugin_key, screenshot_gray, window_size, frame_features, window_origin=None):
+        """
+        Locate anchor đầu tiên tìm được theo thứ tự trong config.PLUGIN_LAYOUTS.
+
+        Returns:
+            tuple: (anchor_key, anchor_result) hoặc (None, None)
+        """
+        for anchor_id in config.PLUGIN_LAYOUTS.get(plugin_key, []):
+            anchor_entry = TemplateCache.get_by_id(anchor_id)
+            if anchor_entry is None:
+                continue
+            anchor_result = TemplateLocator.locate(
+                plugin_key, screenshot_gray, anchor_entry, window_size=window_size,
+                frame_features=frame_features, window_origin=window_origin
+            )
+            if (anchor_result.location is not None
+                    and anchor_result.confidence >= config.TEMPLATE_MATCH_THRESHOLD):
+                return anchor_entry.key, anchor_result
+        return None, None
+
+    @staticmethod
+    def _predict(plugin_key, anchor_key, anchor_result, template_entry, screenshot_gray):
+        """Tính vị trí template từ anchor + offset rồi verify bằng ROI nhỏ."""
+        offset = PluginLayout.get_offset(plugin_key, anchor_key, template_entry.key)
+        if not offset:
+            return None
+
+        anchor_scale = anchor_result.scale or 1.0
+        location = (
+            int(round(anchor_result.location[0] + offset['offset'][0] * anchor_scale)),
+            int(round(anchor_result.location[1] + offset['offset'][1] * anchor_scale))
+        )
+        scale = round(anchor_scale * offset['scale_ratio'], 3)
+
+        # Khớp pixel signature tại đúng vị trí dự đoán -> không cần correlation
+        # (confidence từ pixel mẫu của chính control trên frame này, không lấy của anchor)
+        if config.SIGNATURE_CHECK_ENABLED:
+            confidence = TemplateHelper.signature_confidence(screenshot_gray, template_entry, location, scale)
+            if confidence is not None and confidence >= config.TEMPLATE_MATCH_THRESHOLD:
+                scaled = template_entry.get_scaled(scale)
+                return MatchResult('Layout', confidence, location, scale, scaled.shape[:2][::-1])
+
+        result = TemplateHelper.roi_template_match(
+            screenshot_gray, template_entry.image, location, scale, template_entry=template_entry,
+            padding=config.PLUGIN_LAYOUT_VERIFY_PADDING
+        )
+        if result is None or result.confidence < config.TEMPLATE_MATCH_THRESHOLD:
+            return None
+        result.method = 'Layout'
+        return result
+
+    @staticmethod
+    def solve(plugin_key, screenshot_gray, templates, window_size=None, frame_features=None,
+              window_origin=None):
+        """
+        Locate nhiều control của một plugin trên cùng frame qua anchor.
+
+        1. Locate anchor (TemplateLocator - có location memory)
+        2. Với mỗi control: tính vị trí từ offset đã học và verify bằng ROI nhỏ
+        3. Chưa có offset hoặc verify thất bại: locate đầy đủ và học lại offset
+
+        Args:
+            plugin_key: Key plugin trong config.PLUGIN_LAYOUTS ('autotune', ...)
+            screenshot_gray: Screenshot grayscale của cửa sổ plugin
+            templates: dict name -> CachedTemplate (None nếu không load được)
+            window_size: (width, height) của cửa sổ plugin
+            frame_features: FrameFeatures dùng chung của frame
+            window_origin: (left, top) của cửa sổ plugin trên màn hình
+
+        Returns:
+            dict: name -> MatchResult, None nếu template không load được
+        """
+        from utils.frame_features import FrameFeatures
+
+        if frame_features is None:
+            frame_features = FrameFeatures.for_frame(
+                screenshot_gray, frame_pyramid=FrameFeatures.use_frame_pyramid(len(templates))
+            )
+
+        anchor_key, anchor_result = PluginLayout._locate_anchor(
+            plugin_key, screenshot_gray, window_size, frame_features, window_origin
+        )
+
+        results = {}
+        predicted = 0
+        for name, template_entry in templates.items():
+            if template_entry is None:
+                results[name] = None
+                continue
+
+            if anchor_key is not None and template_entry.key == anchor_key:
+                results[name] = anchor_result.copy()
+                continue
+
+            if anchor_key is not None:
+                result = PluginLayout._predict(
+                    plugin_key, anchor_key, anchor_result, template_entry, screenshot_gray
+                )
+                if result is not None:
+                    TemplateLocator.remember(
+                        plugin_key, template_entry.key, result, window_size, template_hash=template_entry.hash
+                    )
+                    results[name] = result
+                    predicted += 1
+                    continue
+
+            # Recover: locate đầy đủ
+            result = TemplateLocator.locate(
+                plugin_key, screenshot_gray, template_entry, window_size=window_size,
+                frame_features=frame_features, window_origin=window_origin
+            )
+            # Không học offset từ kết quả fallback Edge-Based/Multi-Scale (khớp nhầm sẽ bị lưu lại lâu dài)
+            if (anchor_key is not None and result.location is not None
+                    and anchor_result.method not in config.PLUGIN_LAYOUT_NO_LEARN_METHODS
+                    and result.method not in config.PLUGIN_LAYOUT_NO_LEARN_METHODS
+                    and anchor_result.confidence >= config.PLUGIN_LAYOUT_LEARN_THRESHOLD
+                    and result.confidence >= config.PLUGIN_LAYOUT_LEARN_THRESHOLD):
+                PluginLayout.learn_offset(plugin_key, anchor_key, anchor_result, template_entry.key, result)
+            results[name] = result
+
+        if anchor_key is not None:
+            print(f"🧭 Layout {plugin_key}: anchor {anchor_key} -> {predicted}/{len(templates)} controls from offsets")
+        return results
@@ -0,0 +1,93 @@
+"""
+Region change detector - so sánh bản thu nhỏ của một vùng màn hình với frame đã OCR gần nhất
+để bỏ qua OCR khi vùng đó không thay đổi (auto-detect poll AUTO-KEY liên tục).
+"""
+import time
+
+import cv2
+import numpy as np
+
+import config
+
+
+class RegionChangeDetector:
+    """
+    Phát hiện thay đổi của một vùng grayscale giữa các lần poll.
+
+    Frame được so với frame tham chiếu là frame của lần OCR gần nhất (không phải frame poll trước),
+    nên thay đổi chậm qua nhiều lần poll vẫn cộng dồn và kích hoạt OCR.
+    """
+
+    def __init__(self, name="region"):
+        """
+        Args:
+            name: Tên vùng (dùng cho log/thống kê)
+        """
+        self.name = name
+        self._reference = None  # Bản thu nhỏ của frame đã OCR gần nhất
+        self._reference_shape = None  # Shape của vùng gốc lúc lấy tham chiếu
+        self._reference_time = 0.0
+        self._stats = {'checks': 0, 'skipped': 0}
+
+    @staticmethod
+    def _thumbnail(region_gray):
+        """Bản thu nhỏ INTER_AREA của vùng (buffer của FrameBufferPool, hợp lệ đến lần gọi sau)."""
+        from utils.buffer_pool import FrameBufferPool
+
+        factor = max(1, int(config.REGION_CHANGE_DOWNSAMPLE))
+        height, width = region_gray.shape[:2]
+        size = (max(1, width // factor), max(1, height // factor))
+        dst = FrameBufferPool.get('change_thumbnail', (size[1], size[0]))
+        return cv2.resize(region_gray, size, dst=dst, interpolation=cv2.INTER_AREA)
+
+    def has_changed(self, region_gray):
+        """
+        Vùng có thay đổi so với frame tham chiếu không (luôn True nếu chưa có tham chiếu,
+        kích thước vùng đổi hoặc đã bỏ qua quá REGION_CHANGE_MAX_SKIP_SECONDS).
+
+        Args:
+            region_gray: numpy array grayscale của vùng
+
+        Returns:
+            bool: True = cần OCR lại (gọi mark_processed sau khi OCR xong)
+        """
+        self._stats['checks'] += 1
+        if not config.REGION_CHANGE_DETECTION_ENABLED:
+            return True
+        if self._reference is None or self._reference_shape != region_gray.shape:
+            return True
+        if time.perf_counter() - self._reference_time > config.REGION_CHANGE_MAX_SKIP_SECONDS:
+            return True
+
+        thumbnail = self._thumbnail(region_gray)
+        changed_pixels = np.count_nonzero(
+            cv2.absdiff(thumbnail, self._reference) > config.REGION_CHANGE_PIXEL_DELTA
+        )
+        if changed_pixels >= config.REGION_CHANGE_MIN_PIXELS:
+            return True
+
+        self._stats['skipped'] += 1
+        return False
+
+    def mark_processed(self, region_gray):
+        """Đặt vùng vừa OCR làm frame tham chiếu cho các lần so sánh sau."""
+        if not config.REGION_CHANGE_DETECTION_ENABLED:
+            return
+        thumbnail = self._thumbnail(region_gray)
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            self._reference = thumbnail.copy()
+        else:
+            np.copyto(self._reference, thumbnail)
+        self._reference_shape = region_gray.shape
+        self._reference_time = time.perf_counter()
+
+    def reset(self):
+        """Bỏ frame tham chiếu (lần kiểm tra tiếp theo luôn OCR)."""
+        self._reference = None
+        self._reference_shape = None
+
+    def get_stats(self):
+        """Thống kê số lần kiểm tra / bỏ qua OCR."""
+        stats = dict(self._stats)
+        stats['skip_rate'] = stats['skipped'] / stats['checks'] if stats['checks'] else 0.0
+        return stats
@@ -0,0 +1,327 @@
+"""
+Screen capture backends - chụp một vùng màn hình thẳng ra NumPy array.
+
+Backends:
+    - PyAutoGUICaptureBackend: pyautogui.screenshot (mặc định)
+    - Win32CaptureBackend: BitBlt từ desktop DC (pywin32), đọc bits BGRA không qua PIL (opt-in)
+    - ReplayCaptureBackend: phát lại các frame đã lưu thành file ảnh
+    - FakeCaptureBackend: "màn hình" trong bộ nhớ (chạy detector trên Linux/không có màn hình)
+"""
+import glob
+import os
+import threading
+
+import cv2
+import numpy as np
+
+import config
+
+
+class CaptureBackend:
+    """
+    Interface của capture backend.
+
+    Subclass cài đặt grab_raw(); grab() chuyển frame gốc sang RGB/grayscale,
+    mỗi output chỉ tốn đúng một lần convert (không convert nếu frame gốc đã đúng định dạng).
+    Với pooled=True các output được ghi vào buffer của FrameBufferPool thay vì cấp phát mới.
+    """
+
+    name = None
+
+    # Layout frame gốc -> (code convert sang RGB, code convert sang grayscale)
+    _CONVERSIONS = {
+        'RGB': (None, cv2.COLOR_RGB2GRAY),
+        'BGR': (cv2.COLOR_BGR2RGB, cv2.COLOR_BGR2GRAY),
+        'BGRA': (cv2.COLOR_BGRA2RGB, cv2.COLOR_BGRA2GRAY),
+        'GRAY': (cv2.COLOR_GRAY2RGB, None),
+    }
+
+    def grab_raw(self, region, pooled=False):
+        """
+        Chụp vùng màn hình.
+
+        Args:
+            region: (x, y, width, height) theo tọa độ màn hình
+            pooled: True = được phép đọc bits vào buffer của FrameBufferPool
+
+        Returns:
+            tuple: (numpy array, layout) với layout trong 'RGB', 'BGR', 'BGRA', 'GRAY'
+        """
+        raise NotImplementedError
+
+    def grab(self, region, gray_only=False, pooled=False):
+        """
+        Chụp vùng màn hình ra RGB + grayscale.
+
+        Args:
+            region: (x, y, width, height)
+            gray_only: True = chỉ tạo bản grayscale (bỏ qua bước convert RGB)
+            pooled: True = ghi output vào buffer của FrameBufferPool (bị ghi đè ở lần chụp pooled
+                tiếp theo trên cùng thread)
+
+        Returns:
+            tuple: (rgb hoặc None nếu gray_only, gray)
+        """
+        from utils.buffer_pool import FrameBufferPool
+
+        frame, layout = self.grab_raw(region, pooled=pooled)
+        to_rgb, to_gray = CaptureBackend._CONVERSIONS[layout]
+        height, width = frame.shape[:2]
+
+        gray = frame
+        if to_gray is not None:
+            dst = FrameBufferPool.get('capture_gray', (height, width)) if pooled else None
+            gray = cv2.cvtColor(frame, to_gray, dst=dst)
+        if gray_only:
+            return None, gray
+
+        rgb = frame
+        if to_rgb is not None:
+            dst = FrameBufferPool.get('capture_rgb', (height, width, 3)) if pooled else None
+            rgb = cv2.cvtColor(frame, to_rgb, dst=dst)
+        return rgb, gray
+
+    def close(self):
+        """Giải phóng tài nguyên của backend (nếu có)."""
+
+
+class Win32CaptureBackend(CaptureBackend):
+    """
+    BitBlt vùng màn hình vào bitmap rồi đọc bits BGRA trực tiếp vào NumPy.
+
+    Opt-in (config.CAPTURE_BACKEND = 'win32'): BitBlt dùng SRCCOPY | CAPTUREBLT để lấy cả cửa sổ
+    layered/overlay, và process được đặt DPI-aware như pyautogui làm khi import, để tọa độ cửa sổ
+    (pygetwindow) và tọa độ BitBlt cùng là pixel vật lý trên màn hình có scale > 100%.
+    """
+
+    name = 'win32'
+
+    def __init__(self):
+        import win32con
+        import win32gui
+        import win32ui
+
+        self._win32con = win32con
+        self._win32gui = win32gui
+        self._win32ui = win32ui
+        self._rop = win32con.SRCCOPY | getattr(win32con, 'CAPTUREBLT', 0x40000000)
+        Win32CaptureBackend._set_dpi_aware()
+
+    @staticmethod
+    def _set_dpi_aware():
+        """Đặt process DPI-aware (giống pyautogui trên Windows); không làm gì nếu đã đặt hoặc không hỗ trợ."""
+        import ctypes
+
+        try:
+            ctypes.windll.user32.SetProcessDPIAware()
+        except (AttributeError, OSError):
+            pass
+
+    def grab_raw(self, region, pooled=False):
+        x, y, width, height = region
+        win32gui = self._win32gui
+        frame = None
+
+        desktop = win32gui.GetDesktopWindow()
+        desktop_dc = win32gui.GetWindowDC(desktop)
+        source_dc = self._win32ui.CreateDCFromHandle(desktop_dc)
+        memory_dc = source_dc.CreateCompatibleDC()
+        bitmap = self._win32ui.CreateBitmap()
+        try:
+            bitmap.CreateCompatibleBitmap(source_dc, width, height)
+            memory_dc.SelectObject(bitmap)
+            memory_dc.BitBlt((0, 0), (width, height), source_dc, (x, y), self._rop)
+            if pooled:
+                frame = self._read_bits_into_pool(bitmap, width, height)
+            else:
+                bits = bitmap.GetBitmapBits(True)
+        finally:
+            win32gui.DeleteObject(bitmap.GetHandle())
+            memory_dc.DeleteDC()
+            source_dc.DeleteDC()
+            win32gui.ReleaseDC(desktop, desktop_dc)
+
+        if frame is None:
+            frame = np.frombuffer(bits, dtype=np.uint8).reshape(height, width, 4)
+        return frame, 'BGRA'
+
+    @staticmethod
+    def _read_bits_into_pool(bitmap, width, height):
+        """Đọc bits BGRA của bitmap thẳng vào buffer của pool (gdi32.GetBitmapBits qua ctypes, không tạo bytes)."""
+        import ctypes
+        from utils.buffer_pool import FrameBufferPool
+
+        frame = FrameBufferPool.get('capture_raw', (height, width, 4))
+        copied = ctypes.windll.gdi32.GetBitmapBits(
+            bitmap.GetHandle(), frame.nbytes, frame.ctypes.data_as(ctypes.c_void_p)
+        )
+        if copied != frame.nbytes:
+            raise OSError(f"GetBitmapBits copied {copied}/{frame.nbytes} bytes")
+        return frame
+
+
+class PyAutoGUICaptureBackend(CaptureBackend):
+    """pyautogui.screenshot -> NumPy (backend mặc định, dự phòng khi win32 lỗi/không có pywin32)."""
+
+    name = 'pyautogui'
+
+    def grab_raw(self, region, pooled=False):
+        import pyautogui
+
+        screenshot = pyautogui.screenshot(region=tuple(region))
+        return np.asarray(screenshot), 'RGB'
+
+
+class FakeCaptureBackend(CaptureBackend):
+    """
+    Màn hình giả trong bộ nhớ: grab() cắt vùng từ `screen` (RGB hoặc grayscale).
+    Dùng để chạy detectors không cần Windows/màn hình thật.
+    """
+
+    name = 'fake'
+
+    def __init__(self, screen=None, size=(1920, 1080)):
+        """
+        Args:
+            screen: numpy array (H, W, 3) RGB hoặc (H, W) grayscale, None = màn hình đen `size`
+            size: (width, height) của màn hình đen mặc định
+        """
+        if screen is None:
+            screen = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+        self.screen = screen
+        self.grab_count = 0
+
+    def set_screen(self, screen):
+        """Đổi nội dung màn hình giả (frame tiếp theo)."""
+        self.screen = screen
+
+    def grab_raw(self, region, pooled=False):
+        x, y, width, height = region
+        screen_h, screen_w = self.screen.shape[:2]
+        frame = np.zeros((height, width) + self.screen.shape[2:], dtype=np.uint8)
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(screen_w, x + width), min(screen_h, y + height)
+        if x1 > x0 and y1 > y0:
+            frame[y0 - y:y1 - y, x0 - x:x1 - x] = self.screen[y0:y1, x0:x1]
+        self.grab_count += 1
+        return frame, 'GRAY' if frame.ndim == 2 else 'RGB'
+
+
+class ReplayCaptureBackend(FakeCaptureBackend):
+    """
+    Phát lại các frame đã lưu (PNG/BMP/JPG trong một thư mục, theo thứ tự tên file).
+    Mỗi lần grab() dùng frame kế tiếp (lặp lại từ đầu khi hết). Frame có đúng kích thước
+    vùng chụp được trả về nguyên vẹn, frame lớn hơn được coi là toàn màn hình và cắt theo vùng.
+    """
+
+    name = 'replay'
+    EXTENSIONS = ('*.png', '*.bmp', '*.jpg')
+
+    def __init__(self, source=None):
+        """
+        Args:
+            source: Thư mục chứa frame hoặc list đường dẫn file, None = config.CAPTURE_REPLAY_DIR
+        """
+        source = source or config.CAPTURE_REPLAY_DIR
+        if isinstance(source, str):
+            paths = []
+            for pattern in ReplayCaptureBackend.EXTENSIONS:
+                paths.extend(glob.glob(os.path.join(source, pattern)))
+            source = sorted(paths)
+        self.paths = list(source)
+        if not self.paths:
+            raise ValueError("Replay capture backend has no frames")
+        self.position = 0
+        super().__init__(self._read(self.paths[0]))
+
+    @staticmethod
+    def _read(path):
+        image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Cannot read replay frame: {path}")
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    def grab_raw(self, region, pooled=False):
+        self.set_screen(self._read(self.paths[self.position]))
+        self.position = (self.position + 1) % len(self.paths)
+        if self.screen.shape[1] == region[2] and self.screen.shape[0] == region[3]:
+            self.grab_count += 1
+            return self.screen, 'RGB'
+        return super().grab_raw(region, pooled=pooled)
+
+
+class ScreenCapture:
+    """Backend chụp màn hình dùng chung cho cả process (chọn theo config.CAPTURE_BACKEND, tạo lazy)."""
+
+    BACKENDS = {
+        'win32': Win32CaptureBackend,
+        'pyautogui': PyAutoGUICaptureBackend,
+        'replay': ReplayCaptureBackend,
+        'fake': FakeCaptureBackend,
+    }
+
+    _backend = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _create(name):
+        """Tạo backend theo tên; 'auto' = win32 nếu có pywin32, ngược lại pyautogui."""
+        if name != 'auto':
+            return ScreenCapture.BACKENDS[name]()
+        try:
+            return Win32CaptureBackend()
+        except ImportError:
+            return PyAutoGUICaptureBackend()
+
+    @staticmethod
+    def get():
+        """Lấy backend hiện tại."""
+        with ScreenCapture._lock:
+            if ScreenCapture._backend is None:
+                try:
+                    ScreenCapture._backend = ScreenCapture._create(config.CAPTURE_BACKEND)
+                except (ImportError, KeyError, ValueError) as e:
+                    print(f"⚠️ Capture backend '{config.CAPTURE_BACKEND}' unavailable ({e}) - using pyautogui")
+                    ScreenCapture._backend = PyAutoGUICaptureBackend()
+            return ScreenCapture._backend
+
+    @staticmethod
+    def set_backend(backend):
+        """
+        Dùng backend chỉ định (ví dụ FakeCaptureBackend khi chạy không có màn hình).
+
+        Returns:
+            CaptureBackend: backend trước đó (None nếu chưa tạo)
+        """
+        with ScreenCapture._lock:
+            previous = ScreenCapture._backend
+            ScreenCapture._backend = backend
+            return previous
+
+    @staticmethod
+    def grab(region, gray_only=False, pooled=False):
+        """
+        Chụp vùng màn hình bằng backend hiện tại.
+        Backend native lỗi (ví dụ màn hình bị khóa) thì chụp lại bằng pyautogui.
+        pooled=True: output nằm trong buffer của FrameBufferPool (xem CaptureBackend.grab).
+
+        Returns:
+            tuple: (rgb hoặc None nếu gray_only, gray)
+        """
+        backend = ScreenCapture.get()
+        try:
+            return backend.grab(region, gray_only=gray_only, pooled=pooled)
+        except Exception as e:
+            if not isinstance(backend, Win32CaptureBackend):
+                raise
+            print(f"⚠️ Win32 capture failed ({e}) - falling back to pyautogui")
+            return PyAutoGUICaptureBackend().grab(region, gray_only=gray_only, pooled=pooled)
+
+    @staticmethod
+    def reset():
+        """Đóng backend hiện tại (lần chụp sau tạo lại theo config)."""
+        with ScreenCapture._lock:
+            backend = ScreenCapture._backend
+            ScreenCapture._backend = None
+        if backend is not None:
+            backend.close()
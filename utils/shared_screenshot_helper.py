@@ -1,32 +1,47 @@
 """
 Shared screenshot utilities để loại bỏ code trùng lặp.
 """
-import pyautogui
-import numpy as np
-import cv2
 
 
 class SharedScreenshotHelper:
     """Unified screenshot handling cho tất cả plugins."""
     
     @staticmethod
-    def capture_plugin_region(plugin_win):
+    def capture_plugin_region(plugin_win, gray_only=False, pooled=False):
         """
-        Chụp ảnh plugin window và convert sang numpy arrays.
+        Chụp ảnh plugin window thẳng ra numpy arrays (qua capture backend, xem ScreenCapture).
+        Trong FrameCache.session() frame của cùng cửa sổ được dùng lại cho đến khi có input.
         
         Args:
             plugin_win: Plugin window object
+            gray_only: True = chỉ cần bản grayscale (screenshot_np trả về None)
+            pooled: True = chụp vào buffer của FrameBufferPool (dùng cho vòng lặp chụp liên tục);
+                frame bị ghi đè ở lần chụp pooled tiếp theo trên cùng thread.
+                Bị bỏ qua trong FrameCache.session() vì frame đã cache phải giữ nguyên
             
         Returns:
-            tuple: (x, y, w, h, screenshot_np, screenshot_gray)
+            tuple: (x, y, w, h, screenshot_np, screenshot_gray) - screenshot_np là RGB
         """
         # Get window dimensions
         x, y, w, h = plugin_win.left, plugin_win.top, plugin_win.width, plugin_win.height
         
-        # Capture screenshot
-        screenshot = pyautogui.screenshot(region=(x, y, w, h))
-        screenshot_np = np.array(screenshot)
-        screenshot_gray = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2GRAY)
+        from utils.frame_cache import FrameCache
+        from utils.frame_features import FrameFeatures
+        from utils.screen_capture import ScreenCapture
+        
+        # Frame đã chụp trong thao tác này (cùng object -> FrameFeatures của frame cũng được dùng lại)
+        cached = FrameCache.get(plugin_win, (x, y, w, h), need_rgb=not gray_only)
+        if cached is not None:
+            screenshot_np, screenshot_gray = cached
+            return x, y, w, h, screenshot_np, screenshot_gray
+        
+        # Capture screenshot (frame mới -> bỏ edge map/bản resize của frame cũ,
+        # bắt buộc cả khi buffer pooled vẫn là cùng object với frame trước)
+        FrameFeatures.invalidate()
+        screenshot_np, screenshot_gray = ScreenCapture.grab(
+            (x, y, w, h), gray_only=gray_only, pooled=pooled and not FrameCache.active()
+        )
+        FrameCache.put(plugin_win, (x, y, w, h), screenshot_np, screenshot_gray)
         
         return x, y, w, h, screenshot_np, screenshot_gray
     
@@ -47,4 +62,21 @@ class SharedScreenshotHelper:
         click_x = x + location[0] + template_w // 2
         click_y = y + location[1] + template_h // 2
         
-        return click_x, click_y
\ No newline at end of file
+        return click_x, click_y
+    
+    @staticmethod
+    def region_view(screenshot, location, size):
+        """
+        Lấy vùng con của frame đã chụp dưới dạng numpy view (không chụp lại, không copy).
+        
+        Args:
+            screenshot: Frame đã chụp (RGB hoặc grayscale)
+            location: (x, y) của vùng trong frame (ví dụ template match location)
+            size: (width, height) của vùng - phần vượt ra ngoài frame bị cắt bỏ
+            
+        Returns:
+            numpy array: View vào `screenshot` (tọa độ trong view tính từ `location`)
+        """
+        region_x, region_y = max(0, int(location[0])), max(0, int(location[1]))
+        region_w, region_h = size
+        return screenshot[region_y:region_y + int(region_h), region_x:region_x + int(region_w)]
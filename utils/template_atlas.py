@@ -0,0 +1,222 @@
+"""
+Template atlas - gói toàn bộ templates vào một file nhị phân (build.py tạo ra).
+Mỗi template gồm pixels, mask, edge map, các bản scale tính sẵn và metadata
+(reference window, điểm click). Khi chạy chỉ mở một file và memory-map,
+không đọc/decode từng file PNG.
+
+Định dạng file:
+    MAGIC (8 bytes) | độ dài header (uint32 little-endian) | header JSON (utf-8)
+    | padding tới bội số DATA_ALIGN | khối dữ liệu uint8
+Header: {'version', 'scales', 'templates': {key: {'file', 'image', 'mask', 'edges',
+'scaled': {scale: block}, 'metadata'}}}, mỗi block là {'offset', 'shape'} tính từ đầu khối dữ liệu.
+"""
+import json
+import os
+import struct
+import sys
+import threading
+
+import cv2
+import numpy as np
+
+import config
+
+
+class TemplateAtlas:
+    """Đọc/ghi template atlas; entries đã load là CachedTemplate dùng view trên memory map."""
+
+    MAGIC = b'CTATLAS1'
+    VERSION = 1
+    DATA_ALIGN = 64
+
+    _entries = None  # key -> CachedTemplate
+    _metadata = {}  # key -> metadata đóng gói trong atlas
+    _buffer = None  # np.memmap của file atlas
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _align(value):
+        return (value + TemplateAtlas.DATA_ALIGN - 1) // TemplateAtlas.DATA_ALIGN * TemplateAtlas.DATA_ALIGN
+
+    @staticmethod
+    def build(output_path=None, template_paths=None):
+        """
+        Tạo file atlas từ các template PNG (gọi từ build.py).
+
+        Args:
+            output_path: File atlas, mặc định config.TEMPLATE_ATLAS_FILE
+            template_paths: dict id -> path, mặc định config.TEMPLATE_PATHS
+
+        Returns:
+            int: Số template đã đóng gói
+        """
+        from utils.template_cache import CachedTemplate, TemplateCache
+        from utils.template_metadata import TemplateMetadata
+
+        output_path = output_path or config.TEMPLATE_ATLAS_FILE
+        template_paths = template_paths or config.TEMPLATE_PATHS
+        scales = TemplateCache.scale_values()
+        packaged_metadata = TemplateMetadata._read_json(config.TEMPLATE_METADATA_FILE)
+
+        blocks = []
+        data_size = 0
+
+        def add_block(array):
+            nonlocal data_size
+            array = np.ascontiguousarray(array, dtype=np.uint8)
+            block = {'offset': data_size, 'shape': list(array.shape)}
+            blocks.append((data_size, array))
+            data_size = TemplateAtlas._align(data_size + array.nbytes)
+            return block
+
+        templates = {}
+        for path in template_paths.values():
+            image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE) \
+                if os.path.exists(path) else None
+            if image is None:
+                print(f"⚠️ Atlas: cannot load template {path}")
+                continue
+
+            entry = CachedTemplate(path, None, image)
+            record = {
+                'file': os.path.basename(path),
+                'image': add_block(entry.image),
+                'mask': add_block(entry.mask) if entry.mask is not None else None,
+                'edges': add_block(entry.edges),
+                'scaled': {}
+            }
+            for scale in scales:
+                scaled = entry.get_scaled(scale)
+                if scaled is not None and scale != 1.0:
+                    record['scaled'][str(scale)] = add_block(scaled)
+
+            metadata = dict(packaged_metadata.get(entry.key, {}))
+            if entry.key in config.TEMPLATE_CLICK_POINTS:
+                metadata['click'] = dict(config.TEMPLATE_CLICK_POINTS[entry.key])
+            record['metadata'] = metadata
+            templates[entry.key] = record
+
+        header = json.dumps({
+            'version': TemplateAtlas.VERSION,
+            'scales': scales,
+            'templates': templates
+        }, ensure_ascii=False).encode('utf-8')
+        data_start = TemplateAtlas._align(len(TemplateAtlas.MAGIC) + 4 + len(header))
+
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with open(output_path, 'wb') as f:
+            f.write(TemplateAtlas.MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for offset, array in blocks:
+                f.seek(data_start + offset)
+                f.write(array.tobytes())
+            f.truncate(data_start + data_size)
+        return len(templates)
+
+    @staticmethod
+    def _read_header(path):
+        """Đọc header, trả về (header dict, vị trí khối dữ liệu) hoặc (None, 0) nếu file không hợp lệ."""
+        with open(path, 'rb') as f:
+            if f.read(len(TemplateAtlas.MAGIC)) != TemplateAtlas.MAGIC:
+                return None, 0
+            header_size = struct.unpack('<I', f.read(4))[0]
+            header = json.loads(f.read(header_size).decode('utf-8'))
+        if header.get('version') != TemplateAtlas.VERSION:
+            return None, 0
+        return header, TemplateAtlas._align(len(TemplateAtlas.MAGIC) + 4 + header_size)
+
+    @staticmethod
+    def _view(buffer, data_start, block):
+        """View (read-only, không copy) của một block trong memory map."""
+        height, width = block['shape']
+        start = data_start + block['offset']
+        return buffer[start:start + height * width].view(np.ndarray).reshape(height, width)
+
+    @staticmethod
+    def _load():
+        """Memory-map file atlas và dựng CachedTemplate cho mỗi template (lazy, một lần - gọi khi đang giữ lock)."""
+        if TemplateAtlas._entries is not None:
+            return TemplateAtlas._entries
+
+        from utils.template_cache import CachedTemplate
+
+        entries = {}
+        metadata = {}
+        path = config.TEMPLATE_ATLAS_FILE
+        if config.TEMPLATE_ATLAS_ENABLED and os.path.exists(path):
+            try:
+                header, data_start = TemplateAtlas._read_header(path)
+                if header is None:
+                    print(f"⚠️ Template atlas has unsupported format: {path}")
+                else:
+                    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+                    atlas_mtime = os.path.getmtime(path)
+                    # Khi chạy từ source: bỏ template có PNG mới hơn atlas (chưa chạy lại build)
+                    check_sources = not hasattr(sys, "_MEIPASS")
+                    stale = []
+
+                    for key, record in header['templates'].items():
+                        template_path = config.get_template_path(record['file'])
+                        if check_sources and os.path.exists(template_path) \
+                                and os.path.getmtime(template_path) > atlas_mtime:
+                            stale.append(key)
+                            continue
+
+                        entry = CachedTemplate(template_path, None, TemplateAtlas._view(buffer, data_start, record['image']))
+                        scaled = {
+                            round(float(scale), 3): TemplateAtlas._view(buffer, data_start, block)
+                            for scale, block in record['scaled'].items()
+                        }
+                        mask = TemplateAtlas._view(buffer, data_start, record['mask']) if record['mask'] else None
+                        entry.preload_variants(
+                            edges=TemplateAtlas._view(buffer, data_start, record['edges']),
+                            mask=mask, scaled=scaled
+                        )
+                        entries[key] = entry
+                        metadata[key] = record.get('metadata', {})
+
+                    TemplateAtlas._buffer = buffer
+                    if stale:
+                        print(f"⚠️ Template atlas outdated for {', '.join(stale)} - decoding PNG instead")
+                    print(f"🗂 Template atlas: {len(entries)} templates mapped from {os.path.basename(path)}")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Error loading template atlas: {e}")
+                entries, metadata = {}, {}
+
+        TemplateAtlas._entries = entries
+        TemplateAtlas._metadata = metadata
+        return entries
+
+    @staticmethod
+    def get(path):
+        """
+        Lấy template từ atlas theo path của file PNG gốc.
+
+        Returns:
+            CachedTemplate hoặc None nếu atlas không có template này
+        """
+        key = os.path.splitext(os.path.basename(path))[0]
+        with TemplateAtlas._lock:
+            return TemplateAtlas._load().get(key)
+
+    @staticmethod
+    def get_metadata():
+        """Metadata đóng gói trong atlas: dict key -> metadata (rỗng nếu không có atlas)."""
+        with TemplateAtlas._lock:
+            TemplateAtlas._load()
+            return {key: dict(values) for key, values in TemplateAtlas._metadata.items()}
+
+    @staticmethod
+    def count():
+        """Số template có trong atlas."""
+        with TemplateAtlas._lock:
+            return len(TemplateAtlas._load())
+
+    @staticmethod
+    def unload():
+        """Bỏ atlas đã load (lần truy cập sau sẽ map lại file)."""
+        with TemplateAtlas._lock:
+            TemplateAtlas._entries = None
+            TemplateAtlas._metadata = {}
+            TemplateAtlas._buffer = None
@@ -0,0 +1,324 @@
+"""
+Template cache dùng chung cho toàn bộ process.
+Decode mỗi template PNG một lần, giữ sẵn grayscale, các bản scale và edge map.
+Nếu có template atlas (build.py tạo ra) thì lấy template từ atlas, không decode PNG.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+import config
+
+
+class CachedTemplate:
+    """Một template đã được decode và tiền xử lý."""
+
+    def __init__(self, path, mtime, image):
+        self.path = path
+        self.mtime = mtime
+        self.key = os.path.splitext(os.path.basename(path))[0]
+        self.image = image
+        self.size = image.shape[:2][::-1]  # (w, h)
+        self._edges = None
+        self._hash = None
+        self._scaled = {}
+        self._signatures = {}
+        self._mask = False  # False = chưa load, None = không có mask
+        self._scaled_masks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def edges(self):
+        """Canny edge map của template (tính một lần)."""
+        if self._edges is None:
+            self._edges = cv2.Canny(self.image, 50, 150)
+        return self._edges
+
+    @property
+    def mask(self):
+        """
+        Mask của template (255 = so khớp, 0 = bỏ qua), None nếu không có.
+
+        Nguồn (theo thứ tự):
+            - File `<tên template>_mask.png` cạnh template
+            - Vùng bỏ qua khai báo trong config.TEMPLATE_MASK_REGIONS
+        """
+        if self._mask is False:
+            self._mask = self._load_mask() if config.TEMPLATE_MASKS_ENABLED else None
+        return self._mask
+
+    def _load_mask(self):
+        """Load mask từ file sidecar hoặc dựng từ config.TEMPLATE_MASK_REGIONS."""
+        template_h, template_w = self.image.shape[:2]
+
+        mask_path = os.path.splitext(self.path)[0] + "_mask.png"
+        if os.path.exists(mask_path):
+            mask = cv2.imdecode(np.fromfile(mask_path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+            if mask is None or mask.shape[:2] != (template_h, template_w):
+                print(f"⚠️ Invalid template mask (size must match template): {mask_path}")
+                return None
+            return np.where(mask > 0, 255, 0).astype(np.uint8)
+
+        regions = config.TEMPLATE_MASK_REGIONS.get(self.key)
+        if not regions:
+            return None
+        mask = np.full((template_h, template_w), 255, dtype=np.uint8)
+        for x0, y0, x1, y1 in regions:
+            mask[int(y0 * template_h):int(round(y1 * template_h)),
+                 int(x0 * template_w):int(round(x1 * template_w))] = 0
+        return mask
+
+    def get_scaled_mask(self, scale):
+        """Mask đã resize theo scale (INTER_NEAREST), None nếu template không có mask."""
+        if self.mask is None:
+            return None
+        scale_key = round(float(scale), 3)
+        scaled_mask = self._scaled_masks.get(scale_key)
+        if scaled_mask is None:
+            scaled = self.get_scaled(scale_key)
+            if scaled is None:
+                return None
+            if scale_key == 1.0:
+                scaled_mask = self.mask
+            else:
+                scaled_mask = cv2.resize(self.mask, scaled.shape[:2][::-1], interpolation=cv2.INTER_NEAREST)
+            with self._lock:
+                self._scaled_masks[scale_key] = scaled_mask
+        return scaled_mask
+
+    @property
+    def hash(self):
+        """Hash nội dung template (đổi khi template được cập nhật)."""
+        if self._hash is None:
+            self._hash = hashlib.sha1(self.image.tobytes()).hexdigest()[:16]
+        return self._hash
+
+    def get_scaled(self, scale):
+        """
+        Lấy template đã resize theo scale.
+
+        Returns:
+            numpy array hoặc None nếu kích thước sau scale < 10px
+        """
+        scale_key = round(float(scale), 3)
+        scaled = self._scaled.get(scale_key)
+        if scaled is not None or scale_key in self._scaled:
+            return scaled
+
+        with self._lock:
+            if scale_key not in self._scaled:
+                template_w, template_h = self.size
+                new_w = int(template_w * scale_key)
+                new_h = int(template_h * scale_key)
+                if new_w < 10 or new_h < 10:
+                    self._scaled[scale_key] = None
+                elif scale_key == 1.0:
+                    self._scaled[scale_key] = self.image
+                else:
+                    self._scaled[scale_key] = cv2.resize(self.image, (new_w, new_h))
+            return self._scaled[scale_key]
+
+    def get_signature(self, scale=1.0):
+        """
+        Pixel signature của template ở một scale: vài điểm mẫu (x, y) nằm trong vùng phẳng
+        (ít nhạy với lệch sub-pixel) cùng cường độ mong đợi, trải đều các mức sáng/tối.
+
+        Returns:
+            tuple (xs, ys, values) numpy arrays hoặc None nếu template quá đồng màu để kiểm tra
+        """
+        scale_key = round(float(scale), 3)
+        if scale_key in self._signatures:
+            return self._signatures[scale_key]
+
+        signature = None
+        scaled = self.get_scaled(scale_key)
+        if scaled is not None:
+            signature = self._derive_signature(scaled, self.get_scaled_mask(scale_key))
+        with self._lock:
+            self._signatures[scale_key] = signature
+        return signature
+
+    @staticmethod
+    def _derive_signature(image, mask=None):
+        """
+        Chọn điểm mẫu: trong mỗi ô lưới lấy pixel phẳng (độ lệch chuẩn 3x3 nhỏ) khác nền nhất,
+        rồi chọn đều theo cường độ để signature có cả điểm sáng lẫn tối.
+        """
+        grid = config.SIGNATURE_GRID_SIZE
+        probe_count = config.SIGNATURE_PROBE_COUNT
+        height, width = image.shape[:2]
+        if width < grid or height < grid:
+            return None
+
+        image_f = image.astype(np.float32)
+        local_mean = cv2.blur(image_f, (3, 3))
+        local_std = np.sqrt(cv2.blur((image_f - local_mean) ** 2, (3, 3)))
+
+        # Độ khác biệt so với nền; loại điểm không phẳng và viền 1px
+        deviation = np.abs(image_f - np.median(image))
+        deviation[local_std > config.SIGNATURE_FLAT_STD] = -1
+        if mask is not None:
+            # Không lấy mẫu trong vùng bị mask (giá trị hiển thị thay đổi)
+            deviation[cv2.erode(mask, np.ones((3, 3), np.uint8)) == 0] = -1
+        deviation[0, :] = deviation[-1, :] = -1
+        deviation[:, 0] = deviation[:, -1] = -1
+
+        candidates = []
+        for cell_y in range(grid):
+            y0, y1 = cell_y * height // grid, (cell_y + 1) * height // grid
+            for cell_x in range(grid):
+                x0, x1 = cell_x * width // grid, (cell_x + 1) * width // grid
+                cell = deviation[y0:y1, x0:x1]
+                if cell.size == 0:
+                    continue
+                cy, cx = np.unravel_index(np.argmax(cell), cell.shape)
+                if cell[cy, cx] >= 0:
+                    candidates.append((int(image[y0 + cy, x0 + cx]), x0 + cx, y0 + cy))
+
+        if len(candidates) < probe_count:
+            return None
+        candidates.sort()
+        if candidates[-1][0] - candidates[0][0] < config.SIGNATURE_MIN_CONTRAST:
+            return None
+
+        picks = np.linspace(0, len(candidates) - 1, probe_count).round().astype(int)
+        chosen = [candidates[i] for i in picks]
+        xs = np.array([c[1] for c in chosen], dtype=np.intp)
+        ys = np.array([c[2] for c in chosen], dtype=np.intp)
+        expected = np.array([c[0] for c in chosen], dtype=np.int16)
+        return xs, ys, expected
+
+    def preload_variants(self, edges=None, mask=None, scaled=None):
+        """
+        Gán sẵn các biến thể đã tính trước (ví dụ đọc từ template atlas).
+
+        Args:
+            edges: Canny edge map
+            mask: Mask của template (None = không có mask)
+            scaled: dict scale -> template đã resize
+        """
+        with self._lock:
+            if edges is not None:
+                self._edges = edges
+            if config.TEMPLATE_MASKS_ENABLED:
+                self._mask = mask
+            for scale, image in (scaled or {}).items():
+                self._scaled[round(float(scale), 3)] = image
+
+    def precompute_scales(self, scale_range=None, scale_step=None):
+        """Tính trước tất cả các bản scale theo SCALE_RANGE/SCALE_STEP."""
+        scale_range = scale_range or config.SCALE_RANGE
+        scale_step = scale_step or config.SCALE_STEP
+        for scale in TemplateCache.scale_values(scale_range, scale_step):
+            self.get_scaled(scale)
+        _ = self.edges
+
+
+class TemplateCache:
+    """Process-wide LRU cache cho template, key theo (path, mtime)."""
+
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+    _hits = 0
+    _misses = 0
+
+    @staticmethod
+    def scale_values(scale_range=None, scale_step=None):
+        """Danh sách scale (đã làm tròn) cho multi-scale matching."""
+        scale_range = scale_range or config.SCALE_RANGE
+        scale_step = scale_step or config.SCALE_STEP
+        scales = np.arange(scale_range[0], scale_range[1] + scale_step, scale_step)
+        return [round(float(s), 3) for s in scales if s <= scale_range[1] + 1e-9]
+
+    @staticmethod
+    def get(path):
+        """
+        Lấy template đã cache theo path (ưu tiên template atlas nếu có).
+
+        Args:
+            path: Đường dẫn file template PNG
+
+        Returns:
+            CachedTemplate hoặc None nếu không load được
+        """
+        from utils.template_atlas import TemplateAtlas
+
+        entry = TemplateAtlas.get(path)
+        if entry is not None:
+            with TemplateCache._lock:
+                TemplateCache._hits += 1
+            return entry
+
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        with TemplateCache._lock:
+            entry = TemplateCache._entries.get(path)
+            if entry is not None and entry.mtime == mtime:
+                TemplateCache._entries.move_to_end(path)
+                TemplateCache._hits += 1
+                return entry
+            TemplateCache._misses += 1
+
+        # Decode ngoài lock để không block các thread khác
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            return None
+
+        entry = CachedTemplate(path, mtime, image)
+        entry.precompute_scales()
+
+        with TemplateCache._lock:
+            TemplateCache._entries[path] = entry
+            TemplateCache._entries.move_to_end(path)
+            while len(TemplateCache._entries) > config.TEMPLATE_CACHE_MAX_ENTRIES:
+                TemplateCache._entries.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def get_by_id(template_id):
+        """Lấy template theo key trong config.TEMPLATE_PATHS."""
+        path = config.TEMPLATE_PATHS.get(template_id)
+        if not path:
+            return None
+        return TemplateCache.get(path)
+
+    @staticmethod
+    def preload():
+        """Decode trước tất cả template trong config.TEMPLATE_PATHS."""
+        loaded = 0
+        for template_id in config.TEMPLATE_PATHS:
+            if TemplateCache.get_by_id(template_id) is not None:
+                loaded += 1
+        return loaded
+
+    @staticmethod
+    def clear():
+        """Xóa toàn bộ cache (atlas được map lại ở lần truy cập sau)."""
+        from utils.template_atlas import TemplateAtlas
+
+        TemplateAtlas.unload()
+        with TemplateCache._lock:
+            TemplateCache._entries.clear()
+            TemplateCache._hits = 0
+            TemplateCache._misses = 0
+
+    @staticmethod
+    def get_stats():
+        """Thống kê cache (entries, atlas_entries, hits, misses)."""
+        from utils.template_atlas import TemplateAtlas
+
+        atlas_entries = TemplateAtlas.count()
+        with TemplateCache._lock:
+            return {
+                'entries': len(TemplateCache._entries),
+                'atlas_entries': atlas_entries,
+                'hits': TemplateCache._hits,
+                'misses': TemplateCache._misses
+            }
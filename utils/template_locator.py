@@ -0,0 +1,278 @@
+"""
+Template locator - lớp locate dùng chung cho tất cả detectors.
+Nhớ vị trí match gần nhất theo (plugin, template) để lần sau chỉ search vùng nhỏ.
+Vị trí được nhớ tương đối với góc trên trái cửa sổ plugin: kéo cửa sổ đi chỗ khác chỉ dịch
+gốc tọa độ (không search lại), chỉ khi kích thước cửa sổ đổi mới search lại.
+Vị trí được lưu ra config.LOCATION_CACHE_FILE để dùng lại sau khi khởi động lại app.
+"""
+import json
+import os
+import threading
+
+import config
+from utils.helpers import TemplateHelper
+from utils.match_result import MatchResult
+
+
+class TemplateLocator:
+    """Locate template với location memory + fallback adaptive search toàn cửa sổ."""
+
+    _locations = {}  # (plugin_key, template_key) -> {'location', 'scale', 'template_size', 'window_size', 'confidence'}
+    _persisted = None  # "plugin|template|WxH" -> {'template_hash', 'location', 'scale', 'template_size'}
+    _windows = {}  # plugin_key -> (origin, size) của cửa sổ plugin lần locate gần nhất
+    _lock = threading.Lock()
+    _stats = {'hits': 0, 'signature_hits': 0, 'misses': 0, 'window_moves': 0, 'window_resizes': 0}
+
+    @staticmethod
+    def _persist_key(plugin_key, template_key, window_size):
+        return f"{plugin_key}|{template_key}|{window_size[0]}x{window_size[1]}"
+
+    @staticmethod
+    def _load_persisted():
+        """Load location cache từ đĩa (lazy, một lần - gọi khi đang giữ lock)."""
+        if TemplateLocator._persisted is None:
+            persisted = {}
+            try:
+                if os.path.exists(config.LOCATION_CACHE_FILE):
+                    with open(config.LOCATION_CACHE_FILE, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        persisted = data
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"⚠️ Error loading location cache: {e}")
+            TemplateLocator._persisted = persisted
+        return TemplateLocator._persisted
+
+    @staticmethod
+    def _save_persisted():
+        """Ghi location cache ra đĩa (gọi khi đang giữ lock)."""
+        try:
+            os.makedirs(os.path.dirname(config.LOCATION_CACHE_FILE) or '.', exist_ok=True)
+            with open(config.LOCATION_CACHE_FILE, 'w', encoding='utf-8') as f:
+                json.dump(TemplateLocator._persisted, f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            print(f"⚠️ Error saving location cache: {e}")
+
+    @staticmethod
+    def load():
+        """
+        Load location cache đã lưu (gọi khi khởi động app).
+
+        Returns:
+            int: Số vị trí đã load
+        """
+        if not config.LOCATION_CACHE_ENABLED:
+            return 0
+        with TemplateLocator._lock:
+            count = len(TemplateLocator._load_persisted())
+        print(f"📍 Location cache: {count} saved positions loaded")
+        return count
+
+    @staticmethod
+    def _recall_persisted(plugin_key, template_entry, window_size):
+        """Lấy vị trí đã lưu trên đĩa cho đúng plugin, kích thước cửa sổ và nội dung template."""
+        if not config.LOCATION_CACHE_ENABLED or not window_size:
+            return None
+        key = TemplateLocator._persist_key(plugin_key, template_entry.key, window_size)
+        with TemplateLocator._lock:
+            saved = TemplateLocator._load_persisted().get(key)
+        if not saved or saved.get('template_hash') != template_entry.hash:
+            return None
+        return {
+            'location': tuple(saved['location']),
+            'scale': saved['scale'],
+            'template_size': tuple(saved['template_size']),
+            'window_size': tuple(window_size),
+            'confidence': None  # Chưa verify trong phiên này -> bắt buộc verify bằng ROI
+        }
+
+    @staticmethod
+    def remember(plugin_key, template_key, result, window_size, template_hash=None):
+        """
+        Lưu vị trí match đáng tin cậy.
+
+        Args:
+            template_hash: Hash nội dung template (CachedTemplate.hash) - nếu có thì
+                vị trí cũng được lưu ra đĩa cho lần mở app sau
+        """
+        memory = {
+            'location': tuple(result.location),
+            'scale': result.scale,
+            'template_size': tuple(result.template_size),
+            'window_size': tuple(window_size) if window_size else None,
+            'confidence': result.confidence
+        }
+        with TemplateLocator._lock:
+            TemplateLocator._locations[(plugin_key, template_key)] = memory
+
+            if not config.LOCATION_CACHE_ENABLED or not window_size or not template_hash:
+                return
+            saved = {
+                'template_hash': template_hash,
+                'location': list(memory['location']),
+                'scale': memory['scale'],
+                'template_size': list(memory['template_size'])
+            }
+            persisted = TemplateLocator._load_persisted()
+            key = TemplateLocator._persist_key(plugin_key, template_key, window_size)
+            if persisted.get(key) != saved:
+                persisted[key] = saved
+                TemplateLocator._save_persisted()
+
+    @staticmethod
+    def recall(plugin_key, template_key):
+        """Lấy vị trí đã nhớ, None nếu chưa có."""
+        with TemplateLocator._lock:
+            memory = TemplateLocator._locations.get((plugin_key, template_key))
+            return dict(memory) if memory else None
+
+    @staticmethod
+    def forget(plugin_key=None, template_key=None, window_size=None):
+        """
+        Xóa location memory (theo plugin/template hoặc toàn bộ).
+        Vị trí đã lưu trên đĩa cũng bị xóa (chỉ của window_size nếu có truyền vào).
+        """
+        with TemplateLocator._lock:
+            for key in list(TemplateLocator._locations):
+                if plugin_key is not None and key[0] != plugin_key:
+                    continue
+                if template_key is not None and key[1] != template_key:
+                    continue
+                del TemplateLocator._locations[key]
+
+            if not config.LOCATION_CACHE_ENABLED:
+                return
+            persisted = TemplateLocator._load_persisted()
+            removed = False
+            for key in list(persisted):
+                saved_plugin, saved_template, saved_size = key.split('|', 2)
+                if plugin_key is not None and saved_plugin != plugin_key:
+                    continue
+                if template_key is not None and saved_template != template_key:
+                    continue
+                if window_size and saved_size != f"{window_size[0]}x{window_size[1]}":
+                    continue
+                del persisted[key]
+                removed = True
+            if removed:
+                TemplateLocator._save_persisted()
+
+    @staticmethod
+    def get_stats():
+        """Thống kê ROI hit/miss."""
+        with TemplateLocator._lock:
+            stats = dict(TemplateLocator._stats)
+            stats['entries'] = len(TemplateLocator._locations)
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / total if total else 0.0
+        return stats
+
+    @staticmethod
+    def reset_stats():
+        """Reset bộ đếm hit/miss."""
+        with TemplateLocator._lock:
+            TemplateLocator._stats = {'hits': 0, 'signature_hits': 0, 'misses': 0, 'window_moves': 0, 'window_resizes': 0}
+
+    @staticmethod
+    def _count(name):
+        with TemplateLocator._lock:
+            TemplateLocator._stats[name] += 1
+
+    @staticmethod
+    def track_window(plugin_key, window_origin, window_size):
+        """
+        Theo dõi vị trí/kích thước cửa sổ plugin giữa các lần locate.
+
+        Vị trí đã nhớ là tọa độ trong cửa sổ nên khi chỉ gốc cửa sổ đổi thì vẫn dùng được nguyên vẹn
+        (tọa độ màn hình = gốc mới + vị trí tương đối); khi kích thước đổi thì locate() search lại.
+
+        Returns:
+            str: 'moved', 'resized' hoặc None (không đổi / lần đầu)
+        """
+        if window_origin is None or window_size is None:
+            return None
+        window = (tuple(window_origin), tuple(window_size))
+        with TemplateLocator._lock:
+            previous = TemplateLocator._windows.get(plugin_key)
+            TemplateLocator._windows[plugin_key] = window
+            if previous is None or previous == window:
+                return None
+            change = 'resized' if previous[1] != window[1] else 'moved'
+            TemplateLocator._stats['window_resizes' if change == 'resized' else 'window_moves'] += 1
+
+        if change == 'moved':
+            dx = window[0][0] - previous[0][0]
+            dy = window[0][1] - previous[0][1]
+            print(f"🪟 {plugin_key} window moved by ({dx:+d}, {dy:+d}) - reusing window-relative positions")
+        else:
+            print(f"🪟 {plugin_key} window resized {previous[1][0]}x{previous[1][1]} -> "
+                  f"{window[1][0]}x{window[1][1]} - controls will be searched again")
+        return change
+
+    @staticmethod
+    def locate(plugin_key, screenshot_gray, template_entry, window_size=None, frame_features=None,
+               window_origin=None):
+        """
+        Tìm template trong screenshot của cửa sổ plugin.
+
+        1. Nếu đã nhớ vị trí trong phiên này: kiểm tra pixel signature tại đúng vị trí đó,
+           khớp thì confidence lấy từ chính các pixel mẫu (không correlation)
+        2. Nếu signature không khớp / vị trí lấy từ đĩa: search vùng nhỏ quanh vị trí cũ ở scale cũ
+        3. Nếu confidence < TEMPLATE_MATCH_THRESHOLD: adaptive search toàn cửa sổ
+
+        Args:
+            plugin_key: Key plugin ('autotune', 'xvox', ...)
+            screenshot_gray: Screenshot grayscale của cửa sổ plugin
+            template_entry: CachedTemplate từ TemplateCache
+            window_size: (width, height) của cửa sổ plugin
+            frame_features: FrameFeatures dùng chung khi locate nhiều template trên một frame
+            window_origin: (left, top) của cửa sổ plugin trên màn hình (để theo dõi cửa sổ bị kéo đi)
+
+        Returns:
+            MatchResult
+        """
+        template_key = template_entry.key
+        TemplateLocator.track_window(plugin_key, window_origin, window_size)
+
+        if config.ROI_SEARCH_ENABLED:
+            memory = TemplateLocator.recall(plugin_key, template_key)
+            if memory and window_size is not None and memory['window_size'] != tuple(window_size):
+                memory = None
+            if memory is None:
+                memory = TemplateLocator._recall_persisted(plugin_key, template_entry, window_size)
+            if memory and memory['confidence'] is not None and config.SIGNATURE_CHECK_ENABLED:
+                # Confidence đọc từ pixel mẫu của frame hiện tại (không dùng lại confidence cũ)
+                confidence = TemplateHelper.signature_confidence(
+                    screenshot_gray, template_entry, memory['location'], memory['scale']
+                )
+                if confidence is not None and confidence >= config.TEMPLATE_MATCH_THRESHOLD:
+                    TemplateLocator._count('hits')
+                    TemplateLocator._count('signature_hits')
+                    return MatchResult(
+                        'Signature', confidence, memory['location'], memory['scale'],
+                        memory['template_size']
+                    )
+            if memory:
+                roi_result = TemplateHelper.roi_template_match(
+                    screenshot_gray, template_entry.image, memory['location'], memory['scale'],
+                    template_entry=template_entry
+                )
+                if roi_result and roi_result.confidence >= config.TEMPLATE_MATCH_THRESHOLD:
+                    TemplateLocator._count('hits')
+                    TemplateLocator.remember(
+                        plugin_key, template_key, roi_result, window_size, template_hash=template_entry.hash
+                    )
+                    return roi_result
+            TemplateLocator._count('misses')
+
+        best_result = TemplateHelper.adaptive_template_match(
+            screenshot_gray, template_entry.image, template_entry=template_entry, window_size=window_size,
+            frame_features=frame_features
+        )
+        if best_result.location is not None and best_result.confidence >= config.TEMPLATE_MATCH_THRESHOLD:
+            TemplateLocator.remember(
+                plugin_key, template_key, best_result, window_size, template_hash=template_entry.hash
+            )
+        else:
+            TemplateLocator.forget(plugin_key, template_key, window_size=window_size)
+        return best_result
@@ -0,0 +1,159 @@
+"""
+Template metadata - kích thước cửa sổ plugin tham chiếu khi chụp mỗi template
+và điểm click của control. Dùng để suy ra scale dự kiến từ kích thước cửa sổ hiện tại.
+"""
+import json
+import os
+import threading
+
+import config
+
+
+class TemplateMetadata:
+    """
+    Quản lý metadata của template, key theo tên template (không có đuôi .png).
+
+    Nguồn dữ liệu (nguồn sau ghi đè nguồn trước):
+        - Template atlas (config.TEMPLATE_ATLAS_FILE): metadata đóng gói lúc build
+        - config.TEMPLATE_METADATA_FILE: metadata đóng gói cùng templates (tùy chọn)
+        - config.LEARNED_TEMPLATE_METADATA_FILE: metadata học được khi chạy (DATA_DIR)
+    """
+
+    _entries = None
+    _pending = {}  # Reference window học được, chưa ghi ra LEARNED_TEMPLATE_METADATA_FILE
+    _flush_registered = False
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _read_json(path):
+        """Đọc file JSON, trả về dict rỗng nếu không có hoặc lỗi."""
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    return data
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️ Error loading template metadata {path}: {e}")
+        return {}
+
+    @staticmethod
+    def _load():
+        """Load metadata (lazy, một lần)."""
+        if TemplateMetadata._entries is None:
+            from utils.template_atlas import TemplateAtlas
+
+            entries = TemplateAtlas.get_metadata()
+            for path in (config.TEMPLATE_METADATA_FILE, config.LEARNED_TEMPLATE_METADATA_FILE):
+                for key, values in TemplateMetadata._read_json(path).items():
+                    entries.setdefault(key, {}).update(values)
+            TemplateMetadata._entries = entries
+        return TemplateMetadata._entries
+
+    @staticmethod
+    def get(template_key):
+        """Lấy metadata dict của template (có thể rỗng)."""
+        with TemplateMetadata._lock:
+            return dict(TemplateMetadata._load().get(template_key, {}))
+
+    @staticmethod
+    def get_reference_window(template_key):
+        """
+        Lấy kích thước cửa sổ plugin khi template được chụp.
+
+        Returns:
+            tuple (width, height) hoặc None nếu chưa biết
+        """
+        reference = TemplateMetadata.get(template_key).get('reference_window')
+        if reference and len(reference) == 2 and reference[0] > 0 and reference[1] > 0:
+            return int(reference[0]), int(reference[1])
+        return None
+
+    @staticmethod
+    def get_click_point(template_key):
+        """
+        Điểm click của control theo tỉ lệ kích thước template (xem config.TEMPLATE_CLICK_POINTS).
+
+        Returns:
+            dict: ít nhất có 'x_ratio' và 'y_ratio' (mặc định tâm template)
+        """
+        point = {'x_ratio': config.VALUE_CLICK_OFFSET_X_RATIO, 'y_ratio': 0.5}
+        point.update(config.TEMPLATE_CLICK_POINTS.get(template_key, {}))
+        point.update(TemplateMetadata.get(template_key).get('click', {}))
+        return point
+
+    @staticmethod
+    def expected_scale(template_key, window_size):
+        """
+        Scale dự kiến = kích thước cửa sổ hiện tại / kích thước tham chiếu.
+
+        Returns:
+            float (làm tròn 0.01) hoặc None nếu chưa có reference window
+        """
+        reference = TemplateMetadata.get_reference_window(template_key)
+        if not reference or not window_size:
+            return None
+        ratio_w = window_size[0] / reference[0]
+        ratio_h = window_size[1] / reference[1]
+        return round((ratio_w + ratio_h) / 2.0, 2)
+
+    @staticmethod
+    def record_reference_window(template_key, window_size, scale):
+        """
+        Ghi nhận reference window từ một match đáng tin cậy.
+        Chỉ cập nhật trong bộ nhớ (không ghi file trên luồng match); flush() ghi ra đĩa
+        khi app đóng (đăng ký atexit ở lần ghi nhận đầu tiên).
+
+        Args:
+            template_key: Tên template
+            window_size: (width, height) của cửa sổ plugin lúc match
+            scale: Scale của template tại match đó
+        """
+        import atexit
+
+        if not window_size or not scale:
+            return
+        reference = [int(round(window_size[0] / scale)), int(round(window_size[1] / scale))]
+
+        with TemplateMetadata._lock:
+            entries = TemplateMetadata._load()
+            if entries.get(template_key, {}).get('reference_window') == reference:
+                return
+            entries.setdefault(template_key, {})['reference_window'] = reference
+            TemplateMetadata._pending.setdefault(template_key, {})['reference_window'] = reference
+            if not TemplateMetadata._flush_registered:
+                atexit.register(TemplateMetadata.flush)
+                TemplateMetadata._flush_registered = True
+
+    @staticmethod
+    def flush():
+        """
+        Ghi các reference window đã học ra config.LEARNED_TEMPLATE_METADATA_FILE (gộp với nội dung file).
+
+        Returns:
+            int: Số template đã ghi
+        """
+        with TemplateMetadata._lock:
+            pending = TemplateMetadata._pending
+            if not pending:
+                return 0
+            learned = TemplateMetadata._read_json(config.LEARNED_TEMPLATE_METADATA_FILE)
+            for template_key, values in pending.items():
+                learned.setdefault(template_key, {}).update(values)
+            try:
+                os.makedirs(os.path.dirname(config.LEARNED_TEMPLATE_METADATA_FILE) or '.', exist_ok=True)
+                with open(config.LEARNED_TEMPLATE_METADATA_FILE, 'w', encoding='utf-8') as f:
+                    json.dump(learned, f, indent=2, ensure_ascii=False)
+            except OSError as e:
+                print(f"⚠️ Error saving template metadata: {e}")
+                return 0
+            count = len(pending)
+            TemplateMetadata._pending = {}
+            return count
+
+    @staticmethod
+    def reload():
+        """Bỏ cache để đọc lại metadata từ file (ghi các thay đổi chưa flush trước)."""
+        TemplateMetadata.flush()
+        with TemplateMetadata._lock:
+            TemplateMetadata._entries = None
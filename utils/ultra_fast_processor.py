@@ -4,6 +4,7 @@ Tối ưu hóa cực kỳ để set nhiều giá trị AutoTune cùng lúc
 """
 import time
 import config
+from utils.frame_cache import FrameCache
 from utils.helpers import MouseHelper
 from utils.process_finder import CubaseProcessFinder
 from utils.window_manager import WindowManager
@@ -78,28 +79,37 @@ class UltraFastAutoTuneProcessor:
             
             print(f"🚀 Starting ultra fast batch for {total_count} parameters")
             
-            # Phase 1: Find all templates at once (parallel preparation)
-            template_positions = {}
-            for param in parameters_list:
-                try:
-                    detector = param['detector']
-                    name = param['name']
+            # Phase 1: Find all templates at once (parallel preparation) - dùng chung một frame
+            with FrameCache.session():
+                template_positions = self._locate_with_layout(parameters_list)
+                for param in parameters_list:
+                    if param['name'] in template_positions:
+                        continue
+                    try:
+                        detector = param['detector']
+                        name = param['name']
                     
-                    # Find template position
-                    click_pos, confidence = detector._find_template_match(self.plugin_window)
-                    if click_pos:
-                        template_positions[name] = {
-                            'click_pos': click_pos,
-                            'detector': detector,
-                            'value': param['value'],
-                            'confidence': confidence
-                        }
-                        print(f"📍 {name} template found at {click_pos} (confidence: {confidence:.3f})")
-                    else:
-                        print(f"❌ {name} template not found")
+                        # Find template position
+                        click_pos, confidence = detector._find_template_match(self.plugin_window)
+                        if click_pos:
+                            template_positions[name] = {
+                                'click_pos': click_pos,
+                                'detector': detector,
+                                'value': param['value'],
+                                'confidence': confidence
+                            }
+                            print(f"📍 {name} template found at {click_pos} (confidence: {confidence:.3f})")
+                        else:
+                            print(f"❌ {name} template not found")
                         
-                except Exception as e:
-                    print(f"❌ Error finding template for {param['name']}: {e}")
+                    except Exception as e:
+                        print(f"❌ Error finding template for {param['name']}: {e}")
+            
+            # Giữ thứ tự thao tác theo parameters_list
+            template_positions = {
+                param['name']: template_positions[param['name']]
+                for param in parameters_list if param['name'] in template_positions
+            }
             
             # Phase 2: Execute all operations super fast
             fast_delay = config.UI_DELAYS.get('auto_tune_input_delay', 0.05)
@@ -146,6 +156,60 @@ class UltraFastAutoTuneProcessor:
         finally:
             self.cleanup_batch_session()
     
+    def _locate_with_layout(self, parameters_list):
+        """
+        Locate tất cả controls trên một screenshot qua PluginLayout:
+        một lần search anchor, các control còn lại tính từ offset và chỉ verify ROI nhỏ.
+        
+        Returns:
+            dict: name -> template_info (như Phase 1), thiếu name nếu không tìm được
+        """
+        from utils.helpers import TemplateHelper
+        from utils.plugin_layout import PluginLayout
+        from utils.shared_screenshot_helper import SharedScreenshotHelper
+        
+        template_positions = {}
+        if not PluginLayout.has_layout('autotune'):
+            return template_positions
+        
+        try:
+            # Chụp cả RGB: control không locate được qua layout sẽ fallback sang
+            # detector._find_template_match trong cùng FrameCache.session (cần RGB cho debug image),
+            # frame gray-only sẽ không dùng lại được và phải chụp lại
+            x, y, w, h, screenshot_np, screenshot_gray = SharedScreenshotHelper.capture_plugin_region(
+                self.plugin_window
+            )
+            templates = {
+                param['name']: TemplateHelper.load_template(param['detector'].template_path)
+                for param in parameters_list
+            }
+            results = PluginLayout.solve(
+                'autotune', screenshot_gray, templates, window_size=(w, h), window_origin=(x, y)
+            )
+        except Exception as e:
+            print(f"⚠️ Layout locate failed, falling back to per-template search: {e}")
+            return template_positions
+        
+        for param in parameters_list:
+            name = param['name']
+            best_result = results.get(name)
+            if (not best_result or best_result.location is None
+                    or best_result.confidence < config.TEMPLATE_MATCH_THRESHOLD):
+                continue
+            
+            detector = param['detector']
+            click_pos = detector._click_position(x, y, best_result)
+            template_positions[name] = {
+                'click_pos': click_pos,
+                'detector': detector,
+                'value': param['value'],
+                'confidence': best_result.confidence
+            }
+            print(f"📍 {name} template found at {click_pos} "
+                  f"(confidence: {best_result.confidence:.3f}, {best_result.method})")
+        
+        return template_positions
+    
     def cleanup_batch_session(self):
         """Dọn dẹp sau batch session."""
         try: